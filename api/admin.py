@@ -8,7 +8,10 @@ Provides a user-friendly interface for administrators to manage the system.
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.utils.html import format_html
-from .models import User, Movie, Theater, Seat, Show, Booking, BookingSeat, Payment
+from .models import User, Movie, Theater, Seat, SeatLayoutTemplate, Show, Booking, BookingSeat, Payment, SalesRollup
+from .inventory import recompute_show_counters
+from .layout_cache import layout_changed
+from .layouts import seats_changed
 
 
 # ==================== USER ADMIN ====================
@@ -94,6 +97,10 @@ class TheaterAdmin(admin.ModelAdmin):
     def seats_count(self, obj):
         return obj.seats.filter(is_active=True).count()
     seats_count.short_description = 'Active Seats'
+    
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        layout_changed(obj)
 
 
 # ==================== SEAT ADMIN ====================
@@ -109,6 +116,32 @@ class SeatAdmin(admin.ModelAdmin):
     ordering = ('theater', 'row', 'seat_number')
     
     autocomplete_fields = ['theater']
+    
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        seats_changed(obj.theater)
+    
+    def delete_model(self, request, obj):
+        theater = obj.theater
+        super().delete_model(request, obj)
+        seats_changed(theater)
+    
+    def delete_queryset(self, request, queryset):
+        theaters = list(Theater.objects.filter(pk__in=queryset.values('theater_id')))
+        super().delete_queryset(request, queryset)
+        for theater in theaters:
+            seats_changed(theater)
+
+
+# ==================== SEAT LAYOUT ADMIN ====================
+
+@admin.register(SeatLayoutTemplate)
+class SeatLayoutTemplateAdmin(admin.ModelAdmin):
+    """Admin configuration for SeatLayoutTemplate model"""
+    
+    list_display = ('name', 'rows', 'seats_per_row', 'vip_rows', 'premium_rows', 'updated_at')
+    search_fields = ('name',)
+    ordering = ('name',)
 
 
 # ==================== SHOW ADMIN ====================
@@ -125,12 +158,17 @@ class ShowAdmin(admin.ModelAdmin):
     date_hierarchy = 'show_date'
     
     autocomplete_fields = ['movie', 'theater']
+    readonly_fields = ('total_seats_count', 'held_seats_count', 'sold_seats_count',
+                       'regular_seats_remaining', 'premium_seats_remaining',
+                       'vip_seats_remaining')
     
     def available_seats(self, obj):
-        total = obj.theater.seats.filter(is_active=True).count()
-        booked = obj.get_booked_seats().count()
-        return f"{total - booked}/{total}"
+        return f"{obj.available_seats_count}/{obj.total_seats_count}"
     available_seats.short_description = 'Available/Total'
+    
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        recompute_show_counters(Show.objects.filter(pk=obj.pk))
 
 
 # ==================== BOOKING ADMIN ====================
@@ -199,6 +237,27 @@ class PaymentAdmin(admin.ModelAdmin):
     booking_reference.short_description = 'Booking Ref'
 
 
+# ==================== SALES ROLLUP ADMIN ====================
+
+@admin.register(SalesRollup)
+class SalesRollupAdmin(admin.ModelAdmin):
+    """Read-only view of the dashboard rollups (maintained by api.rollups)"""
+    
+    list_display = ('granularity', 'bucket', 'theater', 'movie', 'bookings',
+                    'seats_sold', 'revenue', 'refunds', 'refunded_seats')
+    list_filter = ('granularity', 'theater', 'movie')
+    ordering = ('granularity', '-bucket')
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
 # ==================== ADMIN SITE CUSTOMIZATION ====================
 
 admin.site.site_header = "Movie Ticket Booking System Admin"
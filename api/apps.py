@@ -3,3 +3,8 @@ from django.apps import AppConfig
 
 class ApiConfig(AppConfig):
     name = 'api'
+
+    def ready(self):
+        from . import catalog_cache, rollups
+        catalog_cache.connect_signals()
+        rollups.connect_signals()
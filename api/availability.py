@@ -0,0 +1,56 @@
+"""
+Movie Ticket Booking System - Seat Availability Engine
+
+DAR ES SALAAM INSTITUTE OF TECHNOLOGY
+MODULE CODE: COU 07503
+MODULE NAME: WEB APPLICATION DEVELOPMENT
+
+Seat maps used to ask the database "is this seat booked?" once per seat.
+This module loads the booked seat IDs of a show in a single query and keeps
+them in a set that is shared by the whole serialization, so rendering a
+show's seat map costs the same number of queries for 50 or 2,000 seats.
+
+``SeatAvailability.version`` identifies the booked state for conditional
+GET: taken booking-seat rows are only ever added (with a new, higher ID)
+or released, so the row count and the highest ID together change on
+every booking, cancellation and lapsed hold.
+"""
+
+from .models import BookingSeat
+
+
+def booked_seat_ids_query(show):
+    """Returns a values_list queryset of seat IDs taken for a show"""
+    return BookingSeat.objects.taken().filter(show=show).values_list('seat_id', flat=True)
+
+
+class SeatAvailability:
+    """
+    Booked-seat snapshot for a single show.
+
+    Build one per request with ``SeatAvailability.for_show(show)`` and pass
+    it to ``SeatAvailabilitySerializer`` through the ``availability``
+    context key. Lookups are O(1) set membership tests.
+    """
+
+    def __init__(self, show, booked_ids, version=None):
+        self.show = show
+        self.booked_ids = frozenset(booked_ids)
+        self.version = version
+
+    @classmethod
+    def for_show(cls, show):
+        """Load the booked seat IDs for a show with one query"""
+        rows = list(booked_seat_ids_query(show).values_list('pk', 'seat_id'))
+        version = (len(rows), max((pk for pk, _ in rows), default=0))
+        return cls(show, (seat_id for _, seat_id in rows), version)
+
+    def is_booked(self, seat_id):
+        return seat_id in self.booked_ids
+
+    def is_available(self, seat_id):
+        return seat_id not in self.booked_ids
+
+    @property
+    def booked_count(self):
+        return len(self.booked_ids)
@@ -0,0 +1,211 @@
+"""
+Movie Ticket Booking System - Booking Commit Path
+
+DAR ES SALAAM INSTITUTE OF TECHNOLOGY
+MODULE CODE: COU 07503
+MODULE NAME: WEB APPLICATION DEVELOPMENT
+
+Creates bookings atomically without locking the show, one at a time or as
+an all-or-nothing group across several shows. Seat uniqueness is
+enforced by the ``unique_active_seat_per_show`` partial unique index on
+booking_seats, so concurrent bookers only wait on each other when they race
+for the same seat, and the loser gets the exact conflicting seats back.
+
+Statement order inside the transaction keeps lock hold time short:
+booking row, one bulk INSERT for the seats, then the rows shared with other
+bookers last, right before commit: the show counter UPDATE and the sales
+rollup upsert.
+"""
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, OuterRef, Prefetch, Subquery
+from django.db.models.functions import Coalesce
+
+from .holds import hold_expiry, release_expired_holds
+from .inventory import adjust_show_counters
+from .models import Booking, BookingSeat
+from .rollups import record_booking
+from .streams import notify_seats_changed
+
+
+class SeatConflictError(Exception):
+    """
+    Raised when requested seats are already taken for the show.
+    Seats found at commit time also carry their ``show_id``.
+    """
+
+    def __init__(self, seats):
+        self.seats = seats
+        numbers = ', '.join(seat['seat_number'] for seat in seats)
+        super().__init__(f"Seats {numbers} are already booked.")
+
+    @property
+    def seat_ids(self):
+        return [seat['id'] for seat in self.seats]
+
+
+class ShowNotActiveError(Exception):
+    """
+    Raised when a show was deactivated (e.g. cancelled) while a booking for
+    it was being committed.
+    """
+
+    def __init__(self, show_id):
+        self.show_id = show_id
+        super().__init__(f"Show {show_id} is no longer active.")
+
+
+def find_conflicting_seats(show, seat_ids):
+    """Returns id/seat_number dicts for requested seats already taken for a show"""
+    taken = (
+        BookingSeat.objects.taken().filter(show=show, seat_id__in=seat_ids)
+        .order_by('seat_id')
+        .values_list('seat_id', 'seat__seat_number')
+    )
+    return [{'id': seat_id, 'seat_number': seat_number} for seat_id, seat_number in taken]
+
+
+def find_group_conflicts(groups):
+    """
+    Requested seats already taken, across every (show, seat IDs) group,
+    with one query.
+
+    Returns:
+        show_id/id/seat_number dicts
+    """
+    wanted = {(show.id, seat_id) for show, seat_ids in groups for seat_id in seat_ids}
+    taken = (
+        BookingSeat.objects.taken()
+        .filter(show_id__in={show_id for show_id, _ in wanted}, seat_id__in={seat_id for _, seat_id in wanted})
+        .order_by('show_id', 'seat_id')
+        .values_list('show_id', 'seat_id', 'seat__seat_number')
+    )
+    return [
+        {'show_id': show_id, 'id': seat_id, 'seat_number': seat_number}
+        for show_id, seat_id, seat_number in taken
+        if (show_id, seat_id) in wanted
+    ]
+
+
+def commit_booking(user, show, seats, notes=''):
+    """
+    Create a pending booking for seats of a show in one transaction.
+    The booking holds its seats until settings.SEAT_HOLD_TTL from now.
+
+    Args:
+        user: Customer making the booking
+        show: Show instance
+        seats: Seat instances (already validated to belong to the show's theater)
+        notes: Optional booking notes
+
+    Returns:
+        The created Booking
+
+    Raises:
+        SeatConflictError: if any seat is already taken for the show
+        ShowNotActiveError: if the show was deactivated meanwhile
+    """
+    return commit_group_booking(user, [(show, seats)], notes)[0]
+
+
+def commit_group_booking(user, groups, notes=''):
+    """
+    Create one pending booking per (show, seats) group, all or nothing.
+
+    The bookings and all of their seats are written with one bulk INSERT
+    each; a seat taken in any show rolls the whole group back.
+
+    Args:
+        user: Customer making the bookings
+        groups: (Show, Seat instances) pairs, one per show; seats already
+            validated to belong to the show's theater
+        notes: Optional notes stored on every booking
+
+    Returns:
+        The created Bookings, in the order of ``groups``
+
+    Raises:
+        SeatConflictError: if any seat is already taken for its show
+        ShowNotActiveError: if a show was deactivated meanwhile
+    """
+    prices = [
+        {seat.id: show.base_price * seat.price_multiplier for seat in seats}
+        for show, seats in groups
+    ]
+    # Counter rows are updated in show order, so concurrent group bookings
+    # sharing shows lock them in the same order
+    counter_order = sorted(range(len(groups)), key=lambda index: groups[index][0].id)
+
+    for attempt in range(2):
+        try:
+            with transaction.atomic():
+                expires_at = hold_expiry()
+                bookings = Booking.objects.bulk_create([
+                    Booking(
+                        user=user,
+                        show=show,
+                        total_amount=sum(group_prices.values()),
+                        notes=notes,
+                        hold_expires_at=expires_at,
+                        booking_reference=Booking.generate_reference()
+                    )
+                    for (show, _), group_prices in zip(groups, prices)
+                ])
+                BookingSeat.objects.bulk_create([
+                    BookingSeat(booking=booking, show=show, seat=seat, price=group_prices[seat.id])
+                    for booking, (show, seats), group_prices in zip(bookings, groups, prices)
+                    for seat in seats
+                ])
+                # Move the seats from the free pool to held. The UPDATE waits
+                # for a show cancellation in progress and then skips the
+                # deactivated show, which rolls the booking back
+                for index in counter_order:
+                    show, seats = groups[index]
+                    if not adjust_show_counters(
+                        show.id, [seat.seat_type for seat in seats], None, 'held', active_only=True
+                    ):
+                        raise ShowNotActiveError(show.id)
+                for booking in bookings:
+                    record_booking(booking)
+                    notify_seats_changed(booking.show_id)
+            return bookings
+        except IntegrityError:
+            requested = [(show, list(group_prices)) for (show, _), group_prices in zip(groups, prices)]
+            conflicts = find_group_conflicts(requested)
+            if conflicts:
+                raise SeatConflictError(conflicts)
+            # Only lapsed holds block the seats: release them and retry once
+            released = sum(
+                release_expired_holds(show=show, seat_ids=seat_ids) for show, seat_ids in requested
+            )
+            if attempt or not released:
+                raise
+
+
+def with_seats_count(queryset):
+    """
+    Annotate bookings with ``booking_seats_count``.
+
+    A correlated subquery rather than Count('booking_seats'): the JOIN +
+    GROUP BY of an aggregate keeps ``ORDER BY booking_date ... LIMIT`` from
+    walking the booking date index, so every page would aggregate the whole
+    table first.
+    """
+    seats = (
+        BookingSeat.objects.filter(booking=OuterRef('pk')).order_by()
+        .values('booking').annotate(count=Count('id')).values('count')
+    )
+    return queryset.annotate(booking_seats_count=Coalesce(Subquery(seats), 0))
+
+
+def with_booking_details(queryset):
+    """
+    Load everything BookingDetailSerializer reads in two queries: the
+    booking joined to its user, show, movie, theater and payment, and its
+    booking seats joined to their seats.
+    """
+    return queryset.select_related(
+        'user', 'show__movie', 'show__theater', 'payment'
+    ).defer('show__movie__search_vector').prefetch_related(
+        Prefetch('booking_seats', queryset=BookingSeat.objects.select_related('seat').order_by('id'))
+    )
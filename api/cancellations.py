@@ -0,0 +1,110 @@
+"""
+Movie Ticket Booking System - Show Cancellation
+
+DAR ES SALAAM INSTITUTE OF TECHNOLOGY
+MODULE CODE: COU 07503
+MODULE NAME: WEB APPLICATION DEVELOPMENT
+
+Cancels whole shows, e.g. when a screen breaks down: one show, or every
+show of a theater within a date range. ``cancel_shows`` runs as one
+transaction of set-based statements, whatever the number of bookings:
+
+1. cancel every pending and confirmed booking of the shows
+   (api.transitions: seats freed, completed payments refunded, payments in
+   flight failed, rollups and show counters updated)
+2. deactivate the shows with one UPDATE
+3. cancel again the bookings committed while step 1 ran; the UPDATE of
+   step 2 holds the show rows, so later bookings roll back
+   (api.bookings.ShowNotActiveError)
+
+``notification_rows`` then yields the affected bookings with their
+customer's contact details in chunks, so callers can stream them out
+(``POST /api/admin/shows/cancel/``, ``manage.py cancel_shows``).
+"""
+
+from decimal import Decimal
+from typing import NamedTuple
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.utils import timezone
+
+from .catalog_cache import invalidate
+from .models import Booking, Payment, Show
+from .transitions import cancel_bookings
+
+
+class ShowCancellation(NamedTuple):
+    show_ids: list
+    booking_ids: list
+    refunds: int
+    refunded_amount: Decimal
+    cancelled_at: object
+
+    def summary(self):
+        return {
+            'shows_cancelled': len(self.show_ids),
+            'bookings_cancelled': len(self.booking_ids),
+            'payments_refunded': self.refunds,
+            'refunded_amount': str(self.refunded_amount),
+            'cancelled_at': self.cancelled_at.isoformat(),
+        }
+
+
+def select_shows(show_ids=None, theater_id=None, date_from=None, date_to=None):
+    """Shows by ID, or every show of a theater from date_from to date_to"""
+    if show_ids is not None:
+        return Show.objects.filter(pk__in=show_ids)
+    return Show.objects.filter(
+        theater_id=theater_id, show_date__gte=date_from, show_date__lte=date_to or date_from
+    )
+
+
+def cancel_shows(shows, reason='', now=None):
+    """
+    Cancel shows with all their bookings and refund completed payments.
+
+    Args:
+        shows: Show queryset (see select_shows)
+        reason: Stored in the notes of every cancelled booking
+        now: Reference time (defaults to timezone.now())
+
+    Returns:
+        ShowCancellation
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        show_ids = list(shows.order_by('pk').values_list('pk', flat=True))
+        bookings = Booking.objects.filter(show_id__in=show_ids)
+
+        booking_ids = cancel_bookings(bookings, reason, now)
+        Show.objects.filter(pk__in=show_ids, is_active=True).update(is_active=False, updated_at=now)
+        booking_ids += cancel_bookings(bookings, reason, now)
+
+        refunds = Payment.objects.filter(
+            booking_id__in=booking_ids, payment_status='refunded', updated_at=now
+        ).aggregate(count=Count('id'), amount=Sum('amount'))
+        # Bulk updates send no signals
+        invalidate('shows')
+
+    return ShowCancellation(
+        show_ids, sorted(booking_ids), refunds['count'], refunds['amount'] or Decimal('0.00'), now
+    )
+
+
+def notification_rows(cancellation, chunk_size=500):
+    """Yields one dict per cancelled booking, read in chunks of ``chunk_size``"""
+    rows = (
+        Booking.objects.filter(pk__in=cancellation.booking_ids)
+        .order_by('pk')
+        .values(
+            'booking_reference', 'total_amount', 'show_id',
+            movie=F('show__movie__title'), theater=F('show__theater__name'),
+            show_date=F('show__show_date'), show_time=F('show__show_time'),
+            username=F('user__username'), email=F('user__email'), phone=F('user__phone'),
+            payment_status=F('payment__payment_status'),
+        )
+    )
+    for row in rows.iterator(chunk_size=chunk_size):
+        row['refunded'] = row.pop('payment_status') == 'refunded'
+        yield row
@@ -0,0 +1,329 @@
+"""
+Movie Ticket Booking System - Catalog Response Cache
+
+DAR ES SALAAM INSTITUTE OF TECHNOLOGY
+MODULE CODE: COU 07503
+MODULE NAME: WEB APPLICATION DEVELOPMENT
+
+Movie, theater and show listings are read far more often than they
+change. Their response payloads are cached in two tiers:
+
+- a small in-process LRU (settings.CATALOG_CACHE_LOCAL_SIZE entries)
+- the shared ``catalog`` cache (settings.CACHES), so every worker process
+  benefits from one miss. It is a file cache by default and can be
+  pointed at Redis through the environment.
+
+Entries are keyed by endpoint (absolute URL with its sorted query
+parameters), the requesting role (admins see inactive rows), the current
+date (upcoming-show filters move at midnight) and the generation of every
+tag the payload depends on:
+
+    movies / theaters       the movie or theater list
+    movie:<id> / theater:<id>
+                            one movie or theater (its detail and shows)
+    shows                   catalog fields of shows (and movie / theater
+                            names shown with them)
+    seat-counts             the seat counters of every show (bulk
+                            recomputes after layout or schedule changes)
+
+Show lists also depend on ``show:<id>``, the seat counters of each show
+they render. Those tags are only known once the page is read, so their
+generations are stored with the entry and checked on every hit. A
+booking, cancellation or payment then drops only the lists showing its
+show.
+
+Invalidation bumps a tag's generation in the shared cache, so older
+entries are never read again and age out. ``post_save``/``post_delete`` on
+Movie, Theater, Show and Seat bump the tags of the changed row (connected
+in ``ApiConfig.ready``); set-based updates that bypass signals call
+``invalidate`` themselves (seat layouts, show counters). Tags are bumped
+immediately and again when the transaction commits, so a request that
+read the old rows while the transaction was open cannot leave them cached
+under the new generation.
+
+Show lists count the seats of lapsed holds as available before the
+sweeper releases them (api.inventory.lapsed_holds). Those entries expire
+when the next hold on their shows lapses (``Validators.expires_at``)
+instead of after the full timeout.
+
+Hit and miss counters are kept per worker process and served at
+``GET /api/admin/cache/metrics/``. Responses say which tier served them in
+the ``X-Catalog-Cache`` header.
+"""
+
+import hashlib
+import math
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.response import Response
+
+from .conditional import conditional_get
+
+
+GENERATION_KEY = 'catalog-cache:gen:{}'
+ENTRY_KEY = 'catalog-cache:entry:{}'
+
+
+def shared_cache():
+    return caches[settings.CATALOG_CACHE_ALIAS]
+
+
+class LocalLRU:
+    """Thread-safe in-process LRU of (expires_at, value) entries"""
+
+    def __init__(self, size):
+        self.size = size
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value, timeout):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + timeout, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class CacheStats:
+    """Thread-safe hit/miss counters of this worker process"""
+
+    FIELDS = ['local_hits', 'shared_hits', 'misses', 'invalidations']
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def add(self, field):
+        with self.lock:
+            self.counts[field] += 1
+
+    def reset(self):
+        with self.lock:
+            self.counts = dict.fromkeys(self.FIELDS, 0)
+
+    def snapshot(self):
+        with self.lock:
+            counts = dict(self.counts)
+        lookups = counts['local_hits'] + counts['shared_hits'] + counts['misses']
+        counts['hit_ratio'] = round((lookups - counts['misses']) / lookups, 3) if lookups else None
+        return counts
+
+
+local_cache = LocalLRU(settings.CATALOG_CACHE_LOCAL_SIZE)
+stats = CacheStats()
+
+
+# ==================== KEYS AND INVALIDATION ====================
+
+def generations(tags):
+    """Current generation of each tag, creating missing ones"""
+    cache = shared_cache()
+    keys = {tag: GENERATION_KEY.format(tag) for tag in tags}
+    found = cache.get_many(keys.values())
+    result = {}
+    for tag, key in keys.items():
+        if key not in found:
+            # Start from the clock, not 1, so a generation evicted from the
+            # cache can never come back to a value older entries used
+            cache.add(key, time.time_ns(), None)
+            found[key] = cache.get(key)
+        result[tag] = found[key]
+    return result
+
+
+def _bump(tags):
+    cache = shared_cache()
+    for tag in tags:
+        key = GENERATION_KEY.format(tag)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), None)
+
+
+def invalidate(*tags):
+    """Invalidate every entry depending on any of ``tags``"""
+    for _ in tags:
+        stats.add('invalidations')
+    _bump(tags)
+    transaction.on_commit(lambda: _bump(tags))
+
+
+def entry_key(request, tags):
+    """Cache key for a request's payload under the current tag generations"""
+    user = request.user
+    role = user.role if user.is_authenticated else 'anonymous'
+    params = sorted(request.query_params.lists())
+    source = repr((
+        request.build_absolute_uri(request.path), params, role,
+        timezone.localdate().isoformat(), sorted(generations(tags).items()),
+    ))
+    return ENTRY_KEY.format(hashlib.sha256(source.encode()).hexdigest())
+
+
+# ==================== LOOKUPS ====================
+
+def get_or_set(key, compute, timeout=None, current=None):
+    """
+    Returns (value, tier) for an entry key, computing and storing the
+    value on a miss. ``compute`` may return None to skip storing;
+    ``timeout(value)`` may shorten how long a computed value is kept and
+    a stored value failing ``current(value)`` is computed again.
+    """
+    if not settings.CATALOG_CACHE_TIMEOUT:
+        return compute(), 'off'
+
+    def lifetime(value):
+        if timeout is None:
+            return settings.CATALOG_CACHE_TIMEOUT
+        return min(settings.CATALOG_CACHE_TIMEOUT, timeout(value))
+
+    value = local_cache.get(key)
+    if value is not None and (current is None or current(value)):
+        stats.add('local_hits')
+        return value, 'hit-local'
+
+    value = shared_cache().get(key)
+    if value is not None and (current is None or current(value)):
+        stats.add('shared_hits')
+        local_cache.set(key, value, lifetime(value))
+        return value, 'hit-shared'
+
+    stats.add('misses')
+    value = compute()
+    if value is not None:
+        seconds = lifetime(value)
+        shared_cache().set(key, value, seconds)
+        local_cache.set(key, value, seconds)
+    return value, 'miss'
+
+
+def _entry_current(entry):
+    """Whether the row tags a payload was read under are unchanged"""
+    tags = entry['validators'].tags
+    return not tags or generations(tags) == tags
+
+
+def _entry_timeout(entry):
+    """Seconds until a payload's validators go stale, if they do"""
+    expires_at = entry['validators'].expires_at
+    if expires_at is None:
+        return settings.CATALOG_CACHE_TIMEOUT
+    return max(math.ceil((expires_at - timezone.now()).total_seconds()), 1)
+
+
+def cached_response(request, tags, respond):
+    """
+    Serve a catalog GET from the cache, or through ``respond()`` on a miss.
+
+    ``respond`` returns the view's response; full 200 responses carrying
+    conditional GET validators are stored as (payload, validators), and
+    hits go through conditional_get again, so cached responses still
+    revalidate to 304.
+    """
+    if not settings.CATALOG_CACHE_TIMEOUT:
+        return respond()
+
+    responses = []
+
+    def compute():
+        response = respond()
+        responses.append(response)
+        validators = getattr(response, 'validators', None)
+        if response.status_code != 200 or validators is None:
+            return None
+        return {'data': response.data, 'validators': validators}
+
+    entry, tier = get_or_set(entry_key(request, tags), compute, _entry_timeout, _entry_current)
+    if responses:
+        response = responses[0]
+    else:
+        response = conditional_get(request, entry['validators'], lambda: Response(entry['data']))
+    response['X-Catalog-Cache'] = tier
+    return response
+
+
+def catalog_cached(*tags):
+    """
+    View method decorator: serve the action through ``cached_response``.
+    Tags may refer to URL keyword arguments, e.g. ``'movie:{pk}'``.
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(view, request, *args, **kwargs):
+            resolved = [tag.format(**kwargs) for tag in tags]
+            return cached_response(request, resolved, lambda: method(view, request, *args, **kwargs))
+        return wrapper
+    return decorator
+
+
+def clear():
+    """Drop every entry (both tiers) and reset the counters"""
+    local_cache.clear()
+    shared_cache().clear()
+    stats.reset()
+
+
+def cache_stats():
+    """Counters of this worker process plus the local tier's size"""
+    return {
+        **stats.snapshot(),
+        'local_entries': len(local_cache),
+        'local_size': local_cache.size,
+        'shared_backend': settings.CACHES[settings.CATALOG_CACHE_ALIAS]['BACKEND'],
+        'timeout_seconds': settings.CATALOG_CACHE_TIMEOUT,
+    }
+
+
+# ==================== SIGNAL RECEIVERS ====================
+
+def movie_changed(sender, instance, **kwargs):
+    invalidate('movies', f'movie:{instance.pk}', 'shows')
+
+
+def theater_changed(sender, instance, **kwargs):
+    invalidate('theaters', f'theater:{instance.pk}', 'shows')
+
+
+def show_changed(sender, instance, **kwargs):
+    invalidate('shows')
+
+
+def seat_changed(sender, instance, **kwargs):
+    invalidate('theaters', f'theater:{instance.theater_id}')
+
+
+def connect_signals():
+    """Connect the invalidation receivers; called from ApiConfig.ready()"""
+    from django.db.models.signals import post_delete, post_save
+    from .models import Movie, Theater, Show, Seat
+
+    receivers = [(Movie, movie_changed), (Theater, theater_changed), (Show, show_changed), (Seat, seat_changed)]
+    for model, receiver in receivers:
+        post_save.connect(receiver, sender=model, dispatch_uid=f'catalog-cache-save-{model.__name__}')
+        post_delete.connect(receiver, sender=model, dispatch_uid=f'catalog-cache-delete-{model.__name__}')
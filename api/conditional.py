@@ -0,0 +1,143 @@
+"""
+Movie Ticket Booking System - Conditional GET
+
+DAR ES SALAAM INSTITUTE OF TECHNOLOGY
+MODULE CODE: COU 07503
+MODULE NAME: WEB APPLICATION DEVELOPMENT
+
+Catalog, show and seat-map responses carry an ETag and a Last-Modified
+header. A client that sends the ETag back in ``If-None-Match`` gets
+``304 Not Modified`` when nothing it depends on has changed; the
+validators are computed before the body is serialized, so a 304 costs
+only the queries that fetch what the body is made of (a list page, or an
+object plus the taken seats of a show) and no serialization at all.
+
+Validators are built from version stamps that change on every write that
+affects the body:
+
+- IDs and ``updated_at`` of the rows and of the related rows shown with
+  them (counter updates and seat layout changes stamp the row as well)
+- the count and links of a page, which catch rows added or removed
+  elsewhere in the list
+- ``SeatAvailability.version`` for the booked state of a show
+- the seats of lapsed holds in show lists; these change with time alone,
+  so such validators also carry ``expires_at``, when the next hold lapses
+
+Validators of show lists also carry the ``show:<id>`` catalog cache tags
+of their rows (api.catalog_cache), so a cached list is dropped when the
+seat counters of one of its shows move.
+
+The requesting role is part of every ETag, since admins see inactive rows.
+Last-Modified is always sent, but ``If-Modified-Since`` is only honoured
+where the timestamp alone covers every change; elsewhere a deletion would
+not move it, so the ETag decides.
+"""
+
+import hashlib
+
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+
+class Validators:
+    """ETag and Last-Modified for one response"""
+
+    def __init__(self, request, parts, last_modified=None, exact_last_modified=False, expires_at=None,
+                 tags=None):
+        user = request.user
+        role = user.role if user.is_authenticated else 'anonymous'
+        digest = hashlib.md5(repr((role, *parts)).encode(), usedforsecurity=False).hexdigest()
+        self.etag = f'"{digest}"'
+        self.last_modified = int(last_modified.timestamp()) if last_modified else None
+        self.exact_last_modified = exact_last_modified
+        # When the parts go stale without a write (cached payloads expire then)
+        self.expires_at = expires_at
+        # {catalog cache tag: generation} the rows were read under
+        self.tags = tags or {}
+
+    def apply(self, response):
+        response['ETag'] = self.etag
+        if self.last_modified is not None:
+            response['Last-Modified'] = http_date(self.last_modified)
+        patch_vary_headers(response, ('Authorization',))
+        return response
+
+
+def latest(*timestamps):
+    """The most recent of some optional timestamps"""
+    return max((value for value in timestamps if value is not None), default=None)
+
+
+def rows_validators(request, rows, related=(), extra=(), expires_at=None, tags=None):
+    """
+    Validators for a list of fetched rows, from their IDs and stamps.
+
+    Args:
+        related: Forward relations rendered with each row (e.g. 'movie');
+            their ``updated_at`` is included
+        extra: Other values the body depends on (page count and links)
+        expires_at: When ``extra`` goes stale without a write
+        tags: {catalog cache tag: generation} of the rows
+    """
+    parts, timestamps = [*extra], []
+    for row in rows:
+        stamps = [row.updated_at, *(getattr(row, name).updated_at for name in related)]
+        parts.append((row.pk, *stamps))
+        timestamps.extend(stamps)
+    return Validators(request, parts, last_modified=latest(*timestamps), expires_at=expires_at, tags=tags)
+
+
+def conditional_get(request, validators, render):
+    """
+    Returns 304 Not Modified when the client's copy is current, otherwise
+    ``render()``; both carry the validators.
+    """
+    response = get_conditional_response(
+        request,
+        etag=validators.etag,
+        last_modified=validators.last_modified if validators.exact_last_modified else None,
+    )
+    if response is None:
+        response = render()
+        if not 200 <= response.status_code < 300:
+            return response
+    # Kept with cached payloads (api.catalog_cache)
+    response.validators = validators
+    return validators.apply(response)
+
+
+class ConditionalListMixin:
+    """
+    ViewSet mixin: conditional GET for ``list``. The page is fetched as
+    usual (the validators need its rows and links) but only serialized
+    when the client's copy is out of date.
+    """
+
+    # Forward relations rendered with each row, for rows_validators
+    conditional_related = ()
+
+    def list_state(self, rows):
+        """
+        What a page renders beyond its rows' own fields, as (rows_validators
+        keyword arguments, serializer context). Nothing by default.
+        """
+        return {}, {}
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        if page is None:
+            rows, extra = list(queryset), ()
+        else:
+            rows, extra = page, self.paginator.get_page_metadata()
+        options, context = self.list_state(rows)
+
+        def render():
+            serializer = self.get_serializer(rows, many=True, context={**self.get_serializer_context(), **context})
+            data = serializer.data
+            return Response(data) if page is None else self.get_paginated_response(data)
+
+        options['extra'] = (*extra, *options.get('extra', ()))
+        validators = rows_validators(request, rows, self.conditional_related, **options)
+        return conditional_get(request, validators, render)
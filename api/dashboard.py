@@ -0,0 +1,141 @@
+"""
+Movie Ticket Booking System - Admin Dashboard Snapshot
+
+DAR ES SALAAM INSTITUTE OF TECHNOLOGY
+MODULE CODE: COU 07503
+MODULE NAME: WEB APPLICATION DEVELOPMENT
+
+Every open admin tab polls the dashboard, and the payload is the same for
+all of them. It is built once into a snapshot that is shared by every
+worker process through the settings.DASHBOARD_CACHE_ALIAS cache:
+
+- For settings.DASHBOARD_SNAPSHOT_TTL seconds after it was built the
+  snapshot is fresh and served as is.
+- After that it is stale. The first request to see it takes a lock in the
+  same cache (``add``; atomic on Redis) and rebuilds it; every other request keeps getting the stale snapshot
+  until the new one is stored (stale-while-revalidate).
+- After settings.DASHBOARD_SNAPSHOT_MAX_AGE seconds the snapshot drops out
+  of the cache and the next request rebuilds it before responding.
+
+The snapshot carries ``generated_at`` so clients can see how old it is.
+"""
+
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+
+from .bookings import with_seats_count
+from .models import Show, Booking
+from .rollups import catalog_totals, sales_summary
+
+
+SNAPSHOT_KEY = 'admin-dashboard:snapshot'
+REBUILD_LOCK_KEY = 'admin-dashboard:rebuild'
+
+# Every revenue figure is completed payments minus the refunds made in the
+# same period (refunds are dated when they happen, not by the sale)
+REVENUE_BASIS = 'net_of_refunds'
+
+# How long a request without a snapshot waits for another request's rebuild
+COLD_WAIT_SECONDS = 2.0
+COLD_POLL_SECONDS = 0.05
+
+
+def build_dashboard_snapshot(now=None):
+    """Compute the dashboard payload from the database"""
+    from .serializers import BookingListSerializer, ShowListSerializer
+
+    now = now or timezone.now()
+    today = timezone.localdate(now)
+
+    # Booking and sales figures come from the pre-aggregated rollups, and
+    # the catalog sizes from their maintained totals
+    sales = sales_summary(now)
+    totals = catalog_totals()
+
+    recent_bookings = with_seats_count(
+        Booking.objects.select_related('user', 'show__movie', 'show__theater')
+        .defer('show__movie__search_vector')
+    ).order_by('-booking_date')[:10]
+
+    upcoming_shows = Show.objects.filter(
+        is_active=True,
+        show_date__gte=today
+    ).select_related('movie', 'theater').defer('movie__search_vector').order_by(
+        'show_date', 'show_time'
+    )[:10]
+
+    return {
+        'generated_at': now.isoformat(),
+        'statistics': {
+            'total_users': totals['customers'],
+            'total_movies': totals['movies'],
+            'total_theaters': totals['theaters'],
+            'total_bookings': sales['total']['bookings'],
+            'today_bookings': sales['today']['bookings'],
+            'revenue_basis': REVENUE_BASIS,
+            'today_revenue': _net_revenue(sales['today']),
+            'today_seats_sold': sales['today']['seats_sold'],
+            'today_refunds': float(sales['today']['refunds']),
+            'total_revenue': _net_revenue(sales['total']),
+        },
+        'today_by_hour': [
+            {
+                'hour': row['bucket'].isoformat(),
+                'bookings': row['bookings'],
+                'seats_sold': row['seats_sold'],
+                'revenue': _net_revenue(row),
+                'refunds': float(row['refunds']),
+            }
+            for row in sales['today_by_hour']
+        ],
+        'recent_bookings': list(BookingListSerializer(recent_bookings, many=True).data),
+        'upcoming_shows': list(ShowListSerializer(upcoming_shows, many=True).data),
+    }
+
+
+def _net_revenue(measures):
+    return float(measures['revenue'] - measures['refunds'])
+
+
+def shared_cache():
+    return caches[settings.DASHBOARD_CACHE_ALIAS]
+
+
+def get_dashboard_snapshot():
+    """
+    Returns the shared dashboard snapshot, rebuilding it when it is stale
+    and no other request is already doing so.
+    """
+    cache = shared_cache()
+    entry = cache.get(SNAPSHOT_KEY)
+    if entry is not None and entry['fresh_until'] > time.time():
+        return entry['snapshot']
+
+    if cache.add(REBUILD_LOCK_KEY, True, settings.DASHBOARD_REBUILD_LOCK_TIMEOUT):
+        try:
+            return _rebuild()
+        finally:
+            cache.delete(REBUILD_LOCK_KEY)
+
+    # Another request is rebuilding
+    if entry is not None:
+        return entry['snapshot']
+    deadline = time.monotonic() + COLD_WAIT_SECONDS
+    while time.monotonic() < deadline:
+        time.sleep(COLD_POLL_SECONDS)
+        entry = cache.get(SNAPSHOT_KEY)
+        if entry is not None:
+            return entry['snapshot']
+    return build_dashboard_snapshot()
+
+
+def _rebuild():
+    snapshot = build_dashboard_snapshot()
+    shared_cache().set(SNAPSHOT_KEY, {
+        'snapshot': snapshot,
+        'fresh_until': time.time() + settings.DASHBOARD_SNAPSHOT_TTL,
+    }, settings.DASHBOARD_SNAPSHOT_MAX_AGE)
+    return snapshot
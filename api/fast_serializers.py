@@ -0,0 +1,120 @@
+"""
+Movie Ticket Booking System - Fast Read Serialization
+
+DAR ES SALAAM INSTITUTE OF TECHNOLOGY
+MODULE CODE: COU 07503
+MODULE NAME: WEB APPLICATION DEVELOPMENT
+
+Catalog lists (movies, shows, theaters, seat layouts) spend most of their
+CPU time in DRF's per-field machinery rather than in the database: for
+every object and field ``Serializer.to_representation`` calls
+``get_attribute`` through a try/except, wraps foreign keys in
+``PKOnlyObject`` and dispatches ``to_representation`` even for plain
+integers and strings.
+
+Read serializers opt out of that loop with ``FastReadMixin``. The first
+object a serializer instance renders compiles its fields into a list of
+(name, getter, converter) accessors; after that each object is a single
+pass over the list. Fields are converted exactly as DRF would
+convert them, so the JSON is byte-identical, which
+``drf_serializer_class`` lets tests and ``bench_serializers`` check.
+
+Only read-only output goes through the fast path. Sources must be plain
+attributes (no callables) and fields must not raise ``SkipField``.
+"""
+
+from operator import attrgetter
+
+from django.db.models import ForeignKey
+from rest_framework import fields as drf_fields
+from rest_framework import serializers
+from rest_framework.relations import PKOnlyObject, PrimaryKeyRelatedField
+
+
+# Field types whose to_representation is a plain type conversion
+_SIMPLE_CONVERTERS = {
+    drf_fields.IntegerField: int,
+    drf_fields.CharField: str,
+    drf_fields.URLField: str,
+    drf_fields.EmailField: str,
+    drf_fields.SlugField: str,
+}
+
+
+def _identity(value):
+    return value
+
+
+def _drf_getter(field):
+    """Getter with DRF's own attribute resolution, for fields without a fast accessor"""
+    def get(instance):
+        attribute = field.get_attribute(instance)
+        if isinstance(attribute, PKOnlyObject):
+            return None if attribute.pk is None else attribute
+        return attribute
+    return get
+
+
+def _compile_field(serializer, field):
+    """Returns (getter, converter) for one readable field"""
+    if isinstance(field, serializers.SerializerMethodField):
+        # The method gets the object itself; None results stay None
+        return getattr(serializer, field.method_name), _identity
+
+    if isinstance(field, PrimaryKeyRelatedField) and len(field.source_attrs) == 1:
+        model = getattr(getattr(serializer, 'Meta', None), 'model', None)
+        model_field = model._meta.get_field(field.source) if model else None
+        if isinstance(model_field, ForeignKey) and model_field.target_field.primary_key:
+            # Same value as DRF's pk-only optimization, without the join
+            return attrgetter(model_field.attname), _identity
+        return _drf_getter(field), field.to_representation
+
+    if field.source_attrs:
+        getter = attrgetter('.'.join(field.source_attrs))
+    else:
+        # source='*'
+        getter = _identity
+
+    converter = _SIMPLE_CONVERTERS.get(type(field))
+    if converter is not None:
+        return getter, converter
+    if type(field) is drf_fields.ChoiceField:
+        choices = field.choice_strings_to_values
+        return getter, lambda value: choices.get(str(value), value)
+    return getter, field.to_representation
+
+
+def compile_accessors(serializer):
+    """
+    Precompute the (field name, getter, converter) accessors of a serializer
+    instance, in output order.
+    """
+    return [
+        (field.field_name, *_compile_field(serializer, field))
+        for field in serializer._readable_fields
+    ]
+
+
+class FastReadMixin:
+    """
+    Serializer mixin: render objects through precomputed field accessors
+    instead of DRF's generic field loop. The output is the same.
+    """
+
+    def to_representation(self, instance):
+        accessors = self.__dict__.get('_fast_accessors')
+        if accessors is None:
+            accessors = self._fast_accessors = compile_accessors(self)
+
+        data = {}
+        for name, get, convert in accessors:
+            value = get(instance)
+            data[name] = None if value is None else convert(value)
+        return data
+
+
+def drf_serializer_class(serializer_class):
+    """The same serializer on DRF's regular to_representation, for comparison"""
+    return type(serializer_class.__name__, (serializer_class,), {
+        'to_representation': serializers.Serializer.to_representation,
+    })
@@ -0,0 +1,120 @@
+"""
+Movie Ticket Booking System - Seat Holds
+
+DAR ES SALAAM INSTITUTE OF TECHNOLOGY
+MODULE CODE: COU 07503
+MODULE NAME: WEB APPLICATION DEVELOPMENT
+
+A pending booking holds its seats until ``hold_expires_at``
+(settings.SEAT_HOLD_TTL after creation). Availability checks ignore lapsed
+holds straight away through ``BookingSeat.objects.taken()``; the
+``release_expired_holds`` sweeper then marks those bookings expired, frees
+their seat rows and returns the seats to the show counters in set-based
+batches.
+"""
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .inventory import adjust_show_counters
+from .models import Booking, BookingSeat
+from .streams import notify_seats_changed
+
+
+def hold_expiry(now=None):
+    """Returns the expiry time for a seat hold created now"""
+    return (now or timezone.now()) + settings.SEAT_HOLD_TTL
+
+
+def is_hold_expired(booking, now=None):
+    """Whether a pending booking's seat hold has lapsed"""
+    if booking.status != 'pending' or booking.hold_expires_at is None:
+        return False
+    return booking.hold_expires_at <= (now or timezone.now())
+
+
+def release_expired_holds(now=None, batch_size=500, show=None, seat_ids=None):
+    """
+    Expire lapsed seat holds in batches.
+
+    Each batch runs in its own short transaction: lock up to ``batch_size``
+    expired bookings (skipping rows another sweeper holds), mark them
+    expired, deactivate their seats and give the seats back to the show
+    counters with one UPDATE per show.
+
+    Args:
+        now: Reference time (defaults to timezone.now())
+        batch_size: Bookings released per transaction
+        show: Only release holds for this show
+        seat_ids: Only release holds covering these seats
+
+    Returns:
+        Number of bookings expired
+    """
+    now = now or timezone.now()
+    released = 0
+
+    while True:
+        with transaction.atomic():
+            expired = Booking.objects.filter(status='pending', hold_expires_at__lte=now)
+            if show is not None:
+                expired = expired.filter(show=show)
+            if seat_ids is not None:
+                expired = expired.filter(pk__in=BookingSeat.objects.filter(
+                    seat_id__in=seat_ids, is_active=True
+                ).values('booking_id'))
+
+            booking_ids = list(
+                expired.select_for_update(skip_locked=True)
+                .order_by('hold_expires_at', 'id')
+                .values_list('id', flat=True)[:batch_size]
+            )
+            if not booking_ids:
+                break
+
+            freed = (
+                BookingSeat.objects.filter(booking_id__in=booking_ids, is_active=True)
+                .values_list('show_id', 'seat__seat_type')
+                .annotate(count=Count('id'))
+                .order_by()
+            )
+            seat_types_by_show = {}
+            for show_id, seat_type, count in freed:
+                seat_types_by_show.setdefault(show_id, []).extend([seat_type] * count)
+
+            Booking.objects.filter(pk__in=booking_ids).update(status='expired', updated_at=now)
+            BookingSeat.objects.filter(booking_id__in=booking_ids, is_active=True).update(is_active=False)
+            for show_id, seat_types in seat_types_by_show.items():
+                adjust_show_counters(show_id, seat_types, 'held', None)
+                notify_seats_changed(show_id)
+
+        released += len(booking_ids)
+        if len(booking_ids) < batch_size:
+            break
+
+    return released
+
+
+def hold_metrics(since=None, now=None):
+    """
+    Seat hold statistics computed from the bookings table.
+
+    Returns:
+        dict with holds created, converted (paid), expired, cancelled,
+        currently active and lapsed-but-not-yet-swept since ``since``
+    """
+    now = now or timezone.now()
+    holds = Booking.objects.filter(hold_expires_at__isnull=False)
+    if since is not None:
+        holds = holds.filter(created_at__gte=since)
+
+    return holds.aggregate(
+        created=Count('id'),
+        converted=Count('id', filter=Q(status__in=['confirmed', 'completed'])),
+        expired=Count('id', filter=Q(status='expired')),
+        cancelled=Count('id', filter=Q(status='cancelled')),
+        active=Count('id', filter=Q(status='pending', hold_expires_at__gt=now)),
+        awaiting_sweep=Count('id', filter=Q(status='pending', hold_expires_at__lte=now)),
+    )
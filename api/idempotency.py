@@ -0,0 +1,175 @@
+"""
+Movie Ticket Booking System - Idempotent Requests
+
+DAR ES SALAAM INSTITUTE OF TECHNOLOGY
+MODULE CODE: COU 07503
+MODULE NAME: WEB APPLICATION DEVELOPMENT
+
+A client that times out on ``POST /api/bookings/`` or
+``POST /api/payments/process/`` cannot tell whether its booking or payment
+went through, and a blind retry would hold a second set of seats. Sending
+the same ``Idempotency-Key`` header with the retry makes it safe:
+
+- The first request with a key claims it by inserting an IdempotencyKey
+  row in its own short transaction. The view then runs as usual, with no
+  transaction around it, so the booking keeps its short-lock commit path.
+  A concurrent duplicate finds the claim and gets 409 instead of booking
+  again.
+- Successful (2xx) responses are stored with the key in a second short
+  transaction and replayed with an ``Idempotent-Replayed: true`` header,
+  without running the view.
+- Errors are not stored: a failed request deletes its claim and the retry
+  runs the view again.
+- A key reused with a different body or on another endpoint gets 422.
+
+Keys are unique per user and expire after settings.IDEMPOTENCY_KEY_TTL. A
+claim whose request never stored a result (the process died) expires
+after settings.IDEMPOTENCY_CLAIM_TIMEOUT. An expired key is reclaimed by
+its next use; ``purge_idempotency_keys`` deletes the rest.
+"""
+
+import hashlib
+import json
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+
+
+def request_fingerprint(scope, request):
+    """Hash of the endpoint and the request body"""
+    data = request.data
+    if hasattr(data, 'lists'):
+        # QueryDict (form posts)
+        data = dict(data.lists())
+    source = json.dumps([scope, data], sort_keys=True, default=str)
+    return hashlib.sha256(source.encode()).hexdigest()
+
+
+def claim_key(user, key, scope, fingerprint, now=None):
+    """
+    Insert the row for a key in its own transaction.
+
+    Returns:
+        (row, created): the new claim, or the unexpired row of an earlier
+        request (stored, or still running if it has no response);
+        (None, False) if the key keeps changing hands
+    """
+    now = now or timezone.now()
+    for _ in range(3):
+        row = IdempotencyKey.objects.filter(user=user, key=key).first()
+        if row is None:
+            try:
+                with transaction.atomic():
+                    return IdempotencyKey.objects.create(
+                        user=user, key=key, scope=scope, request_hash=fingerprint,
+                        expires_at=now + settings.IDEMPOTENCY_CLAIM_TIMEOUT,
+                    ), True
+            except IntegrityError:
+                # Claimed by a concurrent request in between
+                continue
+        if row.expires_at > now:
+            return row, False
+        # Expired, or claimed by a request that never finished: free the
+        # key and claim it again
+        IdempotencyKey.objects.filter(pk=row.pk, expires_at__lte=now).delete()
+    return None, False
+
+
+def store_response(row, response, now=None):
+    """Keep a successful response with its key for retries to replay"""
+    now = now or timezone.now()
+    with transaction.atomic():
+        IdempotencyKey.objects.filter(pk=row.pk).update(
+            response_status=response.status_code,
+            response_body=json.loads(JSONRenderer().render(response.data)),
+            expires_at=now + settings.IDEMPOTENCY_KEY_TTL,
+        )
+
+
+def replay(row, fingerprint):
+    """The stored response of an earlier request with the same key"""
+    if row.request_hash != fingerprint:
+        return Response({
+            'error': f'This {HEADER} was already used for a different request.'
+        }, status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+    if row.response_status is None:
+        return in_progress()
+
+    response = Response(row.response_body, status=row.response_status)
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def in_progress():
+    return Response({
+        'error': f'A request with this {HEADER} is still being processed.'
+    }, status=status.HTTP_409_CONFLICT)
+
+
+def idempotent(scope):
+    """
+    View method decorator: honour the Idempotency-Key header. Requests
+    without the header (or from anonymous users) run unchanged.
+
+    Args:
+        scope: Name of the endpoint, stored with the key (e.g. 'bookings.create')
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(view, request, *args, **kwargs):
+            key = request.headers.get(HEADER)
+            if key is None or not request.user.is_authenticated:
+                return method(view, request, *args, **kwargs)
+            if not key or len(key) > MAX_KEY_LENGTH:
+                return Response({
+                    'error': f'{HEADER} must be 1 to {MAX_KEY_LENGTH} characters long.'
+                }, status=status.HTTP_400_BAD_REQUEST)
+
+            fingerprint = request_fingerprint(scope, request)
+            row, created = claim_key(request.user, key, scope, fingerprint)
+            if row is None:
+                return in_progress()
+            if not created:
+                return replay(row, fingerprint)
+
+            try:
+                response = method(view, request, *args, **kwargs)
+            except Exception:
+                row.delete()
+                raise
+            if status.is_success(response.status_code):
+                store_response(row, response)
+            else:
+                row.delete()
+            return response
+        return wrapper
+    return decorator
+
+
+def purge_expired_keys(now=None, batch_size=1000):
+    """
+    Delete expired keys in batches of ``batch_size``.
+
+    Returns:
+        Number of keys deleted
+    """
+    now = now or timezone.now()
+    deleted = 0
+    while True:
+        ids = list(
+            IdempotencyKey.objects.filter(expires_at__lte=now).values_list('pk', flat=True)[:batch_size]
+        )
+        if not ids:
+            return deleted
+        deleted += IdempotencyKey.objects.filter(pk__in=ids, expires_at__lte=now).delete()[0]
@@ -0,0 +1,183 @@
+"""
+Movie Ticket Booking System - Show Seat Inventory Counters
+
+DAR ES SALAAM INSTITUTE OF TECHNOLOGY
+MODULE CODE: COU 07503
+MODULE NAME: WEB APPLICATION DEVELOPMENT
+
+Every Show carries denormalized availability counters (total active seats,
+held, sold and remaining seats per seat type) so listing pages can show
+availability without a per-row subquery and count.
+
+Booking flows call ``adjust_show_counters`` inside their transaction
+(status changes through api.transitions) to move seats between the
+held/sold buckets with a single UPDATE on the show row.
+``recompute_show_counters`` rebuilds the counters from the source tables
+and backs the ``repair_show_counters`` management command.
+
+Held seats stay in the counters until ``release_expired_holds`` expires
+their booking. ``lapsed_holds`` reads the seats of holds that have lapsed
+in the meantime with one query, so show lists can count them as
+available without waiting for the sweeper.
+"""
+
+from typing import NamedTuple
+
+from django.db.models import F, Func, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from .catalog_cache import invalidate
+from .models import Seat, Show, BookingSeat
+
+
+# Seat type -> Show counter field holding the remaining seats of that type
+SEAT_TYPE_COUNTER_FIELDS = {
+    'regular': 'regular_seats_remaining',
+    'premium': 'premium_seats_remaining',
+    'vip': 'vip_seats_remaining',
+}
+
+# Booking statuses counted as held (awaiting payment) or sold
+HELD_STATUSES = ['pending']
+SOLD_STATUSES = ['confirmed', 'completed']
+
+
+def counter_bucket(status):
+    """Returns 'held', 'sold' or None for a booking status"""
+    if status in HELD_STATUSES:
+        return 'held'
+    if status in SOLD_STATUSES:
+        return 'sold'
+    return None
+
+
+class LapsedHolds(NamedTuple):
+    # show_id -> held seats whose hold has lapsed but is not released yet
+    seats: dict
+    # Earliest hold among the shows still to lapse, or None
+    next_expiry: object
+
+
+def lapsed_holds(shows, now=None):
+    """
+    Seats of a list of shows held by pending bookings whose hold has
+    lapsed, read with one query (none for an empty list).
+
+    Returns:
+        LapsedHolds
+    """
+    show_ids = [show.pk for show in shows]
+    if not show_ids:
+        return LapsedHolds({}, None)
+
+    now = now or timezone.now()
+    # One row per held seat (a page of shows holds few), so a keyset page
+    # still issues no COUNT
+    held = BookingSeat.objects.filter(
+        show_id__in=show_ids, is_active=True, booking__status__in=HELD_STATUSES
+    ).values_list('show_id', 'booking__hold_expires_at')
+    seats, expiries = {}, []
+    for show_id, expires_at in held:
+        if expires_at is None:
+            continue
+        if expires_at <= now:
+            seats[show_id] = seats.get(show_id, 0) + 1
+        else:
+            expiries.append(expires_at)
+    return LapsedHolds(seats, min(expiries, default=None))
+
+
+def adjust_show_counters(show_id, seat_types, old_bucket, new_bucket, active_only=False):
+    """
+    Move seats of a show between inventory buckets with one UPDATE.
+
+    Args:
+        show_id: Primary key of the show
+        seat_types: Iterable with the seat_type of every seat involved
+        old_bucket: 'held', 'sold' or None (seats were free)
+        new_bucket: 'held', 'sold' or None (seats become free)
+        active_only: Leave the counters alone if the show is no longer active
+
+    Returns:
+        False if ``active_only`` and the show is inactive, else True
+    """
+    if old_bucket == new_bucket:
+        return True
+
+    seat_types = list(seat_types)
+    if not seat_types:
+        return True
+
+    count = len(seat_types)
+    updates = {}
+    if old_bucket:
+        field = f'{old_bucket}_seats_count'
+        updates[field] = Greatest(F(field) - count, Value(0))
+    if new_bucket:
+        field = f'{new_bucket}_seats_count'
+        updates[field] = F(field) + count
+
+    # Seats leaving or entering the free pool change per-type remaining
+    if old_bucket is None or new_bucket is None:
+        sign = 1 if new_bucket is None else -1
+        per_type = {}
+        for seat_type in seat_types:
+            per_type[seat_type] = per_type.get(seat_type, 0) + 1
+        for seat_type, type_count in per_type.items():
+            field = SEAT_TYPE_COUNTER_FIELDS.get(seat_type)
+            if field:
+                updates[field] = Greatest(F(field) + sign * type_count, Value(0))
+
+    # Stamp the row so conditional GET validators see the new counters
+    shows = Show.objects.filter(pk=show_id)
+    if active_only:
+        shows = shows.filter(is_active=True)
+    updated = shows.update(updated_at=timezone.now(), **updates)
+    invalidate(f'show:{show_id}')
+    return bool(updated)
+
+
+def _count(queryset):
+    """Wraps a queryset as a correlated COUNT subquery (0 when empty)"""
+    return Coalesce(
+        Subquery(
+            queryset.order_by().annotate(_count=Func(F('pk'), function='COUNT')).values('_count')
+        ),
+        Value(0)
+    )
+
+
+def recompute_theater_show_counters(theater):
+    """Rebuild counters for every show of a theater after a seat layout change"""
+    return recompute_show_counters(Show.objects.filter(theater=theater))
+
+
+def recompute_show_counters(shows):
+    """
+    Rebuild the counters of every show in a queryset from the seat and
+    booking tables. Runs as a single set-based UPDATE.
+
+    Returns:
+        Number of shows updated
+    """
+    active_seats = Seat.objects.filter(theater=OuterRef('theater'), is_active=True)
+    show_seats = BookingSeat.objects.filter(booking__show=OuterRef('pk'))
+    taken_seat_ids = BookingSeat.objects.filter(
+        booking__show=OuterRef(OuterRef('pk')),
+        booking__status__in=HELD_STATUSES + SOLD_STATUSES
+    ).values('seat_id')
+
+    updates = {
+        'total_seats_count': _count(active_seats),
+        'held_seats_count': _count(show_seats.filter(booking__status__in=HELD_STATUSES)),
+        'sold_seats_count': _count(show_seats.filter(booking__status__in=SOLD_STATUSES)),
+    }
+    for seat_type, field in SEAT_TYPE_COUNTER_FIELDS.items():
+        updates[field] = _count(
+            active_seats.filter(seat_type=seat_type).exclude(pk__in=taken_seat_ids)
+        )
+
+    updated = shows.order_by().update(updated_at=timezone.now(), **updates)
+    invalidate('seat-counts')
+    return updated
@@ -0,0 +1,81 @@
+"""
+Movie Ticket Booking System - Seat Layout Cache
+
+DAR ES SALAAM INSTITUTE OF TECHNOLOGY
+MODULE CODE: COU 07503
+MODULE NAME: WEB APPLICATION DEVELOPMENT
+
+A theater's seat layout rarely changes while the booked state of its shows
+changes constantly. The serialized layout of a theater (its active seats)
+is cached as one blob keyed by theater ID and ``Theater.layout_version``;
+show seat maps only compute the booked-state overlay on top of it.
+
+Every code path that changes seats or theaters calls ``layout_changed``,
+which bumps the version (and stamps ``updated_at``) so the next request
+builds a fresh blob. Old blobs are never read again and age out of the
+cache.
+"""
+
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+from django.utils import timezone
+
+from .catalog_cache import invalidate
+from .models import Seat, Theater
+
+
+def layout_cache_key(theater_id, layout_version):
+    return f'seat-layout:{theater_id}:v{layout_version}'
+
+
+def get_seat_layout(theater):
+    """
+    Returns the serialized active seats of a theater (SeatSerializer dicts),
+    served from the cache when the layout version is unchanged.
+    """
+    from .serializers import SeatSerializer
+
+    key = layout_cache_key(theater.pk, theater.layout_version)
+    layout = cache.get(key)
+    if layout is None:
+        seats = Seat.objects.filter(theater_id=theater.pk, is_active=True)
+        layout = [dict(seat) for seat in SeatSerializer(seats, many=True).data]
+        cache.set(key, layout, settings.SEAT_LAYOUT_CACHE_TIMEOUT)
+    return layout
+
+
+def layout_changed(theater):
+    """Invalidate the cached layout of a theater by bumping its version"""
+    theater_id = getattr(theater, 'pk', theater)
+    Theater.objects.filter(pk=theater_id).update(
+        layout_version=F('layout_version') + 1, updated_at=timezone.now()
+    )
+    # A queryset update sends no signals
+    invalidate('theaters', f'theater:{theater_id}')
+
+
+def render_seat_map(show, availability):
+    """
+    Overlay a show's booked state and prices on the cached theater layout.
+
+    Produces the same dicts as SeatAvailabilitySerializer without touching
+    the seats table.
+    """
+    base_price = show.base_price
+    seat_map = []
+    for seat in get_seat_layout(show.theater):
+        is_available = availability.is_available(seat['id'])
+        seat_map.append({
+            'id': seat['id'],
+            'seat_number': seat['seat_number'],
+            'row': seat['row'],
+            'seat_type': seat['seat_type'],
+            'is_available': is_available,
+            'is_booked': not is_available,
+            'final_price': float(base_price * Decimal(seat['price_multiplier'])),
+            'price_multiplier': seat['price_multiplier'],
+        })
+    return seat_map
@@ -0,0 +1,185 @@
+"""
+Movie Ticket Booking System - Seat Layout Generation
+
+DAR ES SALAAM INSTITUTE OF TECHNOLOGY
+MODULE CODE: COU 07503
+MODULE NAME: WEB APPLICATION DEVELOPMENT
+
+Builds seat plans from row/column parameters or a SeatLayoutTemplate and
+applies them to theaters with bulk statements inside one transaction.
+
+Two modes are supported:
+- sync (default): diff against the existing seats. Missing seats are
+  bulk-inserted, changed ones bulk-updated, and seats no longer in the plan
+  are deleted, or deactivated when bookings still reference them.
+- replace: delete every seat and insert the plan. Refused when any seat
+  of the theater is referenced by a booking.
+"""
+
+from decimal import Decimal
+
+from django.db import transaction
+
+from .inventory import recompute_theater_show_counters
+from .layout_cache import layout_changed
+from .models import Seat, Theater, BookingSeat
+
+
+ROW_LABELS = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+
+SEAT_TYPE_MULTIPLIERS = {
+    'vip': Decimal('1.50'),
+    'premium': Decimal('1.25'),
+    'regular': Decimal('1.00'),
+}
+
+LAYOUT_MODES = ['sync', 'replace']
+
+# Seat fields compared and rewritten when syncing a layout
+SYNC_FIELDS = ['row', 'seat_type', 'price_multiplier', 'is_active']
+
+
+class LayoutError(Exception):
+    """Raised when a layout cannot be applied to a theater"""
+    pass
+
+
+def build_layout(rows, seats_per_row, aisles=(), vip_rows=2, premium_rows=3, disabled_seats=()):
+    """
+    Build the seat specs for a rectangular hall.
+
+    Args:
+        rows: Number of rows (capped at 26, labelled A-Z)
+        seats_per_row: Seat positions per row
+        aisles: Positions (1-based) left empty in every row
+        vip_rows: VIP rows at the front
+        premium_rows: Premium rows behind the VIP rows
+        disabled_seats: Seat numbers that are created inactive
+
+    Returns:
+        List of dicts with seat_number, row, seat_type, price_multiplier
+        and is_active
+    """
+    aisles = set(aisles)
+    disabled_seats = set(disabled_seats)
+    layout = []
+
+    for i in range(min(rows, len(ROW_LABELS))):
+        row_label = ROW_LABELS[i]
+        if i < vip_rows:
+            seat_type = 'vip'
+        elif i < vip_rows + premium_rows:
+            seat_type = 'premium'
+        else:
+            seat_type = 'regular'
+
+        for position in range(1, seats_per_row + 1):
+            if position in aisles:
+                continue
+            seat_number = f"{row_label}{position}"
+            layout.append({
+                'seat_number': seat_number,
+                'row': row_label,
+                'seat_type': seat_type,
+                'price_multiplier': SEAT_TYPE_MULTIPLIERS[seat_type],
+                'is_active': seat_number not in disabled_seats,
+            })
+
+    return layout
+
+
+def build_template_layout(template):
+    """Build the seat specs described by a SeatLayoutTemplate"""
+    return build_layout(
+        rows=template.rows,
+        seats_per_row=template.seats_per_row,
+        aisles=template.aisles,
+        vip_rows=template.vip_rows,
+        premium_rows=template.premium_rows,
+        disabled_seats=template.disabled_seats,
+    )
+
+
+def apply_layout(theater, layout, mode='sync'):
+    """
+    Apply seat specs to a theater in one transaction.
+
+    Returns:
+        dict with created, updated, deactivated, deleted and total_seats
+    """
+    if mode not in LAYOUT_MODES:
+        raise LayoutError(f"Unknown mode '{mode}'. Use one of: {', '.join(LAYOUT_MODES)}.")
+
+    with transaction.atomic():
+        existing = {seat.seat_number: seat for seat in theater.seats.all()}
+        referenced = set(
+            BookingSeat.objects.filter(seat__theater=theater)
+            .values_list('seat_id', flat=True).distinct()
+        )
+
+        stats = {'created': 0, 'updated': 0, 'deactivated': 0, 'deleted': 0}
+
+        if mode == 'replace':
+            if referenced:
+                raise LayoutError(
+                    f"{theater.name} has seats referenced by bookings; use mode 'sync' instead."
+                )
+            stats['deleted'] = len(existing)
+            theater.seats.all().delete()
+            existing = {}
+
+        wanted = {spec['seat_number']: spec for spec in layout}
+
+        to_create = [
+            Seat(theater=theater, **spec)
+            for seat_number, spec in wanted.items() if seat_number not in existing
+        ]
+
+        to_update = []
+        for seat_number, seat in existing.items():
+            spec = wanted.get(seat_number)
+            if spec and any(getattr(seat, field) != spec[field] for field in SYNC_FIELDS):
+                for field in SYNC_FIELDS:
+                    setattr(seat, field, spec[field])
+                to_update.append(seat)
+
+        removed = [seat for seat_number, seat in existing.items() if seat_number not in wanted]
+        to_deactivate = [seat.pk for seat in removed if seat.pk in referenced and seat.is_active]
+        to_delete = [seat.pk for seat in removed if seat.pk not in referenced]
+
+        Seat.objects.bulk_create(to_create)
+        if to_update:
+            Seat.objects.bulk_update(to_update, SYNC_FIELDS)
+        if to_deactivate:
+            Seat.objects.filter(pk__in=to_deactivate).update(is_active=False)
+        if to_delete:
+            Seat.objects.filter(pk__in=to_delete).delete()
+
+        stats['created'] = len(to_create)
+        stats['updated'] = len(to_update)
+        stats['deactivated'] = len(to_deactivate)
+        stats['deleted'] += len(to_delete)
+        stats['total_seats'] = sum(1 for spec in layout if spec['is_active'])
+
+        Theater.objects.filter(pk=theater.pk).update(total_seats=stats['total_seats'])
+        theater.total_seats = stats['total_seats']
+        seats_changed(theater)
+
+    return stats
+
+
+def seats_changed(theater):
+    """Refresh everything derived from a theater's seats after they change"""
+    layout_changed(theater)
+    recompute_theater_show_counters(theater)
+
+
+def apply_layout_to_theaters(theaters, layout, mode='sync'):
+    """
+    Apply the same seat specs to several theaters, all or nothing.
+
+    Returns:
+        dict of theater id -> stats from apply_layout
+    """
+    with transaction.atomic():
+        return {theater.pk: apply_layout(theater, layout, mode) for theater in theaters}
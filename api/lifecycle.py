@@ -0,0 +1,80 @@
+"""
+Movie Ticket Booking System - Booking Lifecycle
+
+DAR ES SALAAM INSTITUTE OF TECHNOLOGY
+MODULE CODE: COU 07503
+MODULE NAME: WEB APPLICATION DEVELOPMENT
+
+A confirmed booking is completed once its show has ended (show start plus
+the movie's duration), so live queries over pending and confirmed bookings
+stop carrying the history. ``complete_past_bookings`` walks the confirmed
+bookings of ended shows in booking ID order, one chunk per transaction:
+
+1. read the next ``batch_size`` booking IDs after the last one done
+   (keyset, no OFFSET and no locks)
+2. complete them through api.transitions, skipping rows another
+   transaction holds (a cancellation in progress), so live traffic never
+   waits on the job
+
+Transactions stay bounded by the chunk size. An interrupted run loses at
+most its open chunk, and the next run picks up where it stopped, since
+completed bookings no longer match; rows skipped for a lock are retried
+then too. Several runs can overlap safely.
+"""
+
+from datetime import datetime, timedelta
+
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Booking, Show
+from .transitions import complete_bookings
+
+
+def ended_shows(now=None):
+    """
+    Q for bookings of shows that have ended: every show dated before
+    yesterday (movies run under a day), plus the shows of yesterday and
+    today whose end time has passed.
+    """
+    now = now or timezone.now()
+    today = timezone.localdate(now)
+    recent = Show.objects.filter(show_date__gte=today - timedelta(days=1), show_date__lte=today).values_list(
+        'pk', 'show_date', 'show_time', 'movie__duration'
+    )
+    ended = [
+        pk for pk, show_date, show_time, duration in recent
+        if timezone.make_aware(datetime.combine(show_date, show_time)) + timedelta(minutes=duration) <= now
+    ]
+    return Q(show__show_date__lt=today - timedelta(days=1)) | Q(show_id__in=ended)
+
+
+def complete_past_bookings(now=None, batch_size=500, after_id=0):
+    """
+    Complete the confirmed bookings of ended shows in chunks.
+
+    Args:
+        now: Reference time (defaults to timezone.now())
+        batch_size: Bookings completed per transaction
+        after_id: Start after this booking ID
+
+    Returns:
+        (number of bookings completed, last booking ID visited)
+    """
+    now = now or timezone.now()
+    past = Booking.objects.filter(ended_shows(now), status='confirmed')
+    completed = 0
+
+    while True:
+        booking_ids = list(
+            past.filter(pk__gt=after_id).order_by('pk').values_list('pk', flat=True)[:batch_size]
+        )
+        if not booking_ids:
+            break
+
+        completed += len(complete_bookings(Booking.objects.filter(pk__in=booking_ids), now, skip_locked=True))
+        after_id = booking_ids[-1]
+        if len(booking_ids) < batch_size:
+            break
+
+    return completed, after_id
@@ -0,0 +1,208 @@
+"""
+Movie Ticket Booking System - Flash-Sale Load Client
+
+DAR ES SALAAM INSTITUTE OF TECHNOLOGY
+MODULE CODE: COU 07503
+MODULE NAME: WEB APPLICATION DEVELOPMENT
+
+HTTP client side of ``manage.py bench_flash_sale``. Each simulated customer
+logs in and then repeats the purchase flow the frontend drives:
+
+    browse shows -> seat map -> POST /api/bookings/ -> POST /api/payments/process/
+
+Only the standard library is used, so process-pool workers can run
+``run_client`` without setting up Django.
+"""
+
+import json
+import math
+import random
+import time
+from http.client import HTTPConnection
+from urllib.parse import urlsplit
+
+
+ENDPOINTS = ['login', 'browse', 'seat_map', 'book', 'pay']
+
+
+class FlashSaleClient:
+    """One simulated customer holding a keep-alive connection to the server"""
+
+    def __init__(self, base_url, timeout=30):
+        parts = urlsplit(base_url)
+        self.connection = HTTPConnection(parts.hostname, parts.port or 80, timeout=timeout)
+        self.token = None
+        self.samples = []
+
+    def request(self, endpoint, method, path, payload=None):
+        """
+        Send one request and record (endpoint, status, latency ms, query count).
+
+        Returns:
+            (status, decoded JSON body or None)
+        """
+        headers = {'Accept': 'application/json'}
+        body = None
+        if payload is not None:
+            body = json.dumps(payload)
+            headers['Content-Type'] = 'application/json'
+        if self.token:
+            headers['Authorization'] = f'Bearer {self.token}'
+
+        started = time.perf_counter()
+        try:
+            self.connection.request(method, path, body=body, headers=headers)
+            response = self.connection.getresponse()
+            raw = response.read()
+        except OSError:
+            self.connection.close()
+            self.samples.append((endpoint, 0, (time.perf_counter() - started) * 1000, None))
+            return 0, None
+        latency_ms = (time.perf_counter() - started) * 1000
+
+        queries = response.getheader('X-Query-Count')
+        self.samples.append((
+            endpoint, response.status, latency_ms, int(queries) if queries is not None else None
+        ))
+        try:
+            return response.status, json.loads(raw) if raw else None
+        except ValueError:
+            return response.status, None
+
+
+def run_client(base_url, username, password, show_ids, movie_id, iterations,
+               seats_per_booking=2, hot_fraction=0.2, seed=None):
+    """
+    Drive one customer through up to ``iterations`` purchase attempts.
+
+    Seats are picked at random from the front ``hot_fraction`` of each
+    show's free seats, so clients compete for the same seats the way buyers
+    do when a popular show opens for sale.
+
+    Returns:
+        dict with samples, started/finished wall-clock times, bookings,
+        payments, conflicts and error messages
+    """
+    rng = random.Random(seed)
+    client = FlashSaleClient(base_url)
+    result = {'bookings': 0, 'payments': 0, 'conflicts': 0, 'sold_out': False, 'errors': []}
+
+    status, body = client.request('login', 'POST', '/api/auth/login/', {
+        'username': username, 'password': password,
+    })
+    if status != 200:
+        result['errors'].append(f'login {status}: {body}')
+        result.update(samples=client.samples, started=time.time(), finished=time.time())
+        return result
+    client.token = body['tokens']['access']
+
+    result['started'] = time.time()
+    open_shows = list(show_ids)
+    for _ in range(iterations):
+        if not open_shows:
+            result['sold_out'] = True
+            break
+
+        status, body = client.request('browse', 'GET', f'/api/shows/?movie={movie_id}')
+        if status != 200:
+            result['errors'].append(f'browse {status}')
+            continue
+
+        show_id = rng.choice(open_shows)
+        status, seat_map = client.request('seat_map', 'GET', f'/api/shows/{show_id}/seats/')
+        if status != 200:
+            result['errors'].append(f'seat_map {status}')
+            continue
+
+        free = [seat['id'] for seat in seat_map if seat['is_available']]
+        if len(free) < seats_per_booking:
+            open_shows.remove(show_id)
+            continue
+        hot = free[:max(seats_per_booking, int(len(free) * hot_fraction))]
+        seat_ids = rng.sample(hot, seats_per_booking)
+
+        status, body = client.request('book', 'POST', '/api/bookings/', {
+            'show_id': show_id, 'seat_ids': seat_ids,
+        })
+        if status == 400 and body and 'already booked' in str(body.get('seat_ids', '')):
+            result['conflicts'] += 1
+            continue
+        if status != 201:
+            result['errors'].append(f'book {status}: {body}')
+            continue
+        result['bookings'] += 1
+
+        status, body = client.request('pay', 'POST', '/api/payments/process/', {
+            'booking_id': body['booking']['id'], 'payment_method': 'mobile_money',
+        })
+        # Accepted; the payment queue charges it in the background
+        if status != 202:
+            result['errors'].append(f'pay {status}: {body}')
+            continue
+        result['payments'] += 1
+
+    result.update(samples=client.samples, finished=time.time())
+    return result
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a sorted list"""
+    if not values:
+        return None
+    index = max(math.ceil(fraction * len(values)) - 1, 0)
+    return values[min(index, len(values) - 1)]
+
+
+def summarize(results):
+    """
+    Combine the results of all clients into the benchmark report.
+
+    Login is reported per endpoint but kept out of the throughput figures,
+    which cover the purchase flow only.
+    """
+    samples = [sample for result in results for sample in result['samples']]
+    started = min(result['started'] for result in results)
+    finished = max(result['finished'] for result in results)
+    window = max(finished - started, 1e-9)
+
+    endpoints = {}
+    for endpoint in ENDPOINTS:
+        rows = [sample for sample in samples if sample[0] == endpoint]
+        if not rows:
+            continue
+        latencies = sorted(row[2] for row in rows)
+        queries = [row[3] for row in rows if row[3] is not None]
+        endpoints[endpoint] = {
+            'requests': len(rows),
+            'errors': sum(1 for row in rows if row[1] == 0 or row[1] >= 500),
+            'latency_ms': {
+                'mean': round(sum(latencies) / len(latencies), 2),
+                'p50': round(percentile(latencies, 0.50), 2),
+                'p95': round(percentile(latencies, 0.95), 2),
+                'p99': round(percentile(latencies, 0.99), 2),
+                'max': round(latencies[-1], 2),
+            },
+            'queries': {
+                'mean': round(sum(queries) / len(queries), 2),
+                'max': max(queries),
+            } if queries else None,
+        }
+
+    flow_requests = sum(1 for sample in samples if sample[0] != 'login')
+    bookings = sum(result['bookings'] for result in results)
+    errors = [error for result in results for error in result['errors']]
+    return {
+        'duration_s': round(window, 3),
+        'requests': flow_requests,
+        'throughput': {
+            'requests_per_s': round(flow_requests / window, 2),
+            'bookings_per_s': round(bookings / window, 2),
+        },
+        'bookings': bookings,
+        'payments': sum(result['payments'] for result in results),
+        'conflicts': sum(result['conflicts'] for result in results),
+        'errors': len(errors),
+        'error_samples': errors[:10],
+        'clients_sold_out': sum(1 for result in results if result['sold_out']),
+        'endpoints': endpoints,
+    }
@@ -0,0 +1,249 @@
+"""
+Management command to load-test the booking API with a flash-sale workload.
+
+Run with: python manage.py bench_flash_sale [--clients 50] [--workers 20] [--pool threads|processes]
+          [--shows 1] [--rows 10] [--seats-per-row 20] [--iterations 10] [--url http://host:port]
+          [--output flash_sale.json]
+
+Seeds a benchmark movie, theater, shows and customer accounts (prefixed
+"flashbench"), starts a local server with query-count headers turned on
+(unless --url points at a running one), and drives concurrent customers
+through browse -> seat map -> booking -> payment from a thread or process
+pool. The report (throughput, p50/p95/p99 latency and query counts per
+endpoint, booking conflicts and errors, plus a double-booking check) is
+written as JSON so runs can be compared across commits. Benchmark data is
+deleted afterwards unless --keep is given.
+"""
+
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import time as show_time, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.utils import timezone
+
+from api.inventory import recompute_show_counters
+from api.layouts import apply_layout, build_layout
+from api.loadtest import run_client, summarize
+from api.models import User, Movie, Theater, Show, BookingSeat
+from api.rollups import adjust_catalog_total
+
+
+PREFIX = 'flashbench'
+PASSWORD = 'flashbench-pass'
+
+SHOW_TIMES = [show_time(10, 0), show_time(13, 30), show_time(17, 0), show_time(20, 30)]
+
+
+class Command(BaseCommand):
+    help = 'Run a flash-sale load benchmark against the booking API'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=50,
+                            help='Simulated customers (one account each)')
+        parser.add_argument('--workers', type=int, default=20,
+                            help='Customers running concurrently')
+        parser.add_argument('--pool', choices=['threads', 'processes'], default='threads',
+                            help='Run customers in a thread pool or a process pool')
+        parser.add_argument('--shows', type=int, default=1,
+                            help='Shows on sale')
+        parser.add_argument('--rows', type=int, default=10,
+                            help='Seat rows in the benchmark theater')
+        parser.add_argument('--seats-per-row', type=int, default=20,
+                            help='Seats per row in the benchmark theater')
+        parser.add_argument('--iterations', type=int, default=10,
+                            help='Purchase attempts per customer')
+        parser.add_argument('--seats-per-booking', type=int, default=2,
+                            help='Seats requested by each booking')
+        parser.add_argument('--hot-fraction', type=float, default=0.2,
+                            help='Customers pick from this front share of the free seats')
+        parser.add_argument('--url',
+                            help='Base URL of a running server (default: start one locally)')
+        parser.add_argument('--port', type=int, default=8765,
+                            help='Port for the locally started server')
+        parser.add_argument('--output', default='flash_sale.json',
+                            help='Where to write the JSON report ("-" for stdout)')
+        parser.add_argument('--keep', action='store_true',
+                            help='Keep the benchmark data after the run')
+
+    def handle(self, *args, **options):
+        self._cleanup()
+        movie, shows = self._seed(options)
+        server = None
+        try:
+            base_url = options['url']
+            if not base_url:
+                base_url = f"http://127.0.0.1:{options['port']}"
+                server = self._start_server(options['port'])
+
+            self.stdout.write(
+                f"Running {options['clients']} customers ({options['workers']} concurrent, "
+                f"{options['pool']}) against {base_url}"
+            )
+            results = self._run(base_url, movie, shows, options)
+            report = self._report(results, shows, options)
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait(timeout=10)
+            if not options['keep']:
+                self._cleanup()
+
+        output = json.dumps(report, indent=2)
+        if options['output'] == '-':
+            self.stdout.write(output)
+        else:
+            with open(options['output'], 'w') as handle:
+                handle.write(output + '\n')
+            self._print_summary(report)
+            self.stdout.write(self.style.SUCCESS(f"✓ Report written to {options['output']}"))
+
+        if report['double_booked_seats']:
+            raise CommandError(f"{report['double_booked_seats']} seats were sold twice!")
+
+    # ---- run ----
+
+    def _run(self, base_url, movie, shows, options):
+        show_ids = [show.pk for show in shows]
+        jobs = [
+            (base_url, f'{PREFIX}_{i}', PASSWORD, show_ids, movie.pk, options['iterations'],
+             options['seats_per_booking'], options['hot_fraction'], i)
+            for i in range(options['clients'])
+        ]
+
+        if options['pool'] == 'processes':
+            # Workers only speak HTTP; do not hand them our DB connection
+            connection.close()
+            executor = ProcessPoolExecutor(max_workers=options['workers'])
+        else:
+            executor = ThreadPoolExecutor(max_workers=options['workers'])
+
+        with executor:
+            futures = [executor.submit(run_client, *job) for job in jobs]
+            return [future.result() for future in futures]
+
+    def _report(self, results, shows, options):
+        summary = summarize(results)
+        seats_sold = BookingSeat.objects.taken().filter(show__in=shows).count()
+        double_booked = (
+            BookingSeat.objects.taken().filter(show__in=shows)
+            .values('show_id', 'seat_id').annotate(n=Count('id')).filter(n__gt=1).count()
+        )
+        return {
+            'benchmark': 'flash_sale',
+            'commit': _git_commit(),
+            'run_at': timezone.now().isoformat(),
+            'database': settings.DATABASES['default']['ENGINE'].rsplit('.', 1)[-1],
+            'config': {
+                key: options[key] for key in (
+                    'clients', 'workers', 'pool', 'shows', 'rows', 'seats_per_row',
+                    'iterations', 'seats_per_booking', 'hot_fraction',
+                )
+            },
+            **summary,
+            'seats_on_sale': sum(show.total_seats_count for show in shows),
+            'seats_sold': seats_sold,
+            'double_booked_seats': double_booked,
+        }
+
+    def _print_summary(self, report):
+        throughput = report['throughput']
+        self.stdout.write(
+            f"{report['requests']} requests in {report['duration_s']}s "
+            f"({throughput['requests_per_s']} req/s, {throughput['bookings_per_s']} bookings/s)"
+        )
+        self.stdout.write(
+            f"bookings {report['bookings']}, payments {report['payments']}, "
+            f"conflicts {report['conflicts']}, errors {report['errors']}, "
+            f"seats sold {report['seats_sold']}/{report['seats_on_sale']}"
+        )
+        self.stdout.write(f"{'endpoint':>9} | {'requests':>8} | {'p50 ms':>8} | {'p95 ms':>8} | "
+                          f"{'p99 ms':>8} | {'queries':>7}")
+        for name, stats in report['endpoints'].items():
+            latency = stats['latency_ms']
+            queries = stats['queries']['mean'] if stats['queries'] else '-'
+            self.stdout.write(
+                f"{name:>9} | {stats['requests']:>8} | {latency['p50']:>8} | {latency['p95']:>8} | "
+                f"{latency['p99']:>8} | {queries:>7}"
+            )
+
+    # ---- server ----
+
+    def _start_server(self, port):
+        env = dict(os.environ, QUERY_COUNT_HEADERS='1')
+        server = subprocess.Popen(
+            [sys.executable, 'manage.py', 'runserver', f'127.0.0.1:{port}', '--noreload'],
+            cwd=settings.BASE_DIR, env=env,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError('The local server exited during startup.')
+            try:
+                socket.create_connection(('127.0.0.1', port), timeout=1).close()
+                return server
+            except OSError:
+                time.sleep(0.2)
+        server.terminate()
+        raise CommandError(f'The local server did not start on port {port}.')
+
+    # ---- data ----
+
+    def _seed(self, options):
+        movie = Movie.objects.create(
+            title=f'{PREFIX} feature', genre='action', duration=120,
+            language='English', release_date=timezone.now().date(),
+        )
+        theater = Theater.objects.create(
+            name=f'{PREFIX} hall', location='Benchmark', total_seats=0
+        )
+        apply_layout(theater, build_layout(options['rows'], options['seats_per_row']))
+
+        tomorrow = timezone.now().date() + timedelta(days=1)
+        shows = Show.objects.bulk_create([
+            Show(
+                movie=movie, theater=theater,
+                show_date=tomorrow + timedelta(days=i // len(SHOW_TIMES)),
+                show_time=SHOW_TIMES[i % len(SHOW_TIMES)],
+                base_price=Decimal('15000.00'),
+            )
+            for i in range(options['shows'])
+        ])
+        recompute_show_counters(Show.objects.filter(pk__in=[show.pk for show in shows]))
+
+        password = make_password(PASSWORD)
+        User.objects.bulk_create([
+            User(username=f'{PREFIX}_{i}', email=f'{PREFIX}_{i}@example.com',
+                 role='customer', password=password)
+            for i in range(options['clients'])
+        ])
+        # bulk_create skips the signals that keep the dashboard totals
+        adjust_catalog_total('customers', options['clients'])
+        return movie, list(Show.objects.filter(movie=movie).order_by('pk'))
+
+    def _cleanup(self):
+        User.objects.filter(username__startswith=f'{PREFIX}_').delete()
+        Show.objects.filter(movie__title=f'{PREFIX} feature').delete()
+        Movie.objects.filter(title=f'{PREFIX} feature').delete()
+        Theater.objects.filter(name=f'{PREFIX} hall').delete()
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
@@ -0,0 +1,143 @@
+"""
+Management command to benchmark show seat-map rendering.
+
+Run with: python manage.py bench_seat_map [--sizes 100 500 2000] [--booked 0.3] [--repeat 3] [--json]
+
+For every theater size a throwaway theater, show and booking are seeded
+inside a transaction that is rolled back at the end, so the command is safe
+to run against a development database. The seat map is rendered with the
+legacy per-seat query path ("before") and with the shared SeatAvailability
+engine ("after"), reporting query counts and best-of-N latency.
+"""
+
+import json
+import time
+from datetime import date, time as show_time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from api.availability import SeatAvailability
+from api.models import User, Movie, Theater, Seat, Show, Booking, BookingSeat
+from api.serializers import SeatAvailabilitySerializer
+
+
+class LegacySeatAvailabilitySerializer(SeatAvailabilitySerializer):
+    """Reproduces the original per-seat availability lookups for comparison"""
+
+    def get_is_available(self, obj):
+        show = self.context.get('show')
+        if show:
+            booked_seat_ids = BookingSeat.objects.filter(
+                booking__show=show,
+                booking__status__in=['confirmed', 'pending']
+            ).values_list('seat_id', flat=True)
+            return obj.id not in booked_seat_ids
+        return True
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Benchmark seat-map rendering before/after the shared availability engine'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[100, 500, 2000],
+                            help='Theater sizes (seat counts) to benchmark')
+        parser.add_argument('--booked', type=float, default=0.3,
+                            help='Fraction of seats booked before rendering')
+        parser.add_argument('--repeat', type=int, default=3,
+                            help='Renders per path; the fastest run is reported')
+        parser.add_argument('--json', action='store_true',
+                            help='Print results as JSON')
+
+    def handle(self, *args, **options):
+        results = []
+        try:
+            with transaction.atomic():
+                for size in options['sizes']:
+                    show = self._seed(size, options['booked'])
+                    seats = list(show.theater.seats.filter(is_active=True))
+                    results.append({
+                        'seats': size,
+                        'before': self._measure(show, seats, legacy=True, repeat=options['repeat']),
+                        'after': self._measure(show, seats, legacy=False, repeat=options['repeat']),
+                    })
+                raise _Rollback()
+        except _Rollback:
+            pass
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+
+        self.stdout.write(f"{'seats':>6} | {'queries before':>14} | {'queries after':>13} | "
+                          f"{'ms before':>10} | {'ms after':>9}")
+        for row in results:
+            self.stdout.write(
+                f"{row['seats']:>6} | {row['before']['queries']:>14} | {row['after']['queries']:>13} | "
+                f"{row['before']['ms']:>10.1f} | {row['after']['ms']:>9.1f}"
+            )
+
+    def _measure(self, show, seats, legacy, repeat):
+        best_ms = None
+        queries = 0
+        for _ in range(max(repeat, 1)):
+            with CaptureQueriesContext(connection) as ctx:
+                started = time.perf_counter()
+                if legacy:
+                    LegacySeatAvailabilitySerializer(seats, many=True, context={'show': show}).data
+                else:
+                    context = {'show': show, 'availability': SeatAvailability.for_show(show)}
+                    SeatAvailabilitySerializer(seats, many=True, context=context).data
+                elapsed_ms = (time.perf_counter() - started) * 1000
+            queries = len(ctx.captured_queries)
+            best_ms = elapsed_ms if best_ms is None else min(best_ms, elapsed_ms)
+        return {'queries': queries, 'ms': round(best_ms, 2)}
+
+    def _seed(self, size, booked_fraction):
+        user, _ = User.objects.get_or_create(
+            username='bench_seat_map',
+            defaults={'email': 'bench@example.com', 'role': 'customer'}
+        )
+        movie = Movie.objects.create(
+            title=f'Bench Movie {size}', genre='action', duration=120,
+            language='English', release_date=date(2024, 1, 1)
+        )
+        theater = Theater.objects.create(
+            name=f'Bench Theater {size}', location='Benchmark', total_seats=size
+        )
+
+        seats_per_row = 50
+        row_labels = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+        Seat.objects.bulk_create([
+            Seat(
+                theater=theater,
+                seat_number=f"{row_labels[(i // seats_per_row) % 26]}{i // (seats_per_row * 26) or ''}-{i % seats_per_row + 1}",
+                row=f"{row_labels[(i // seats_per_row) % 26]}{i // (seats_per_row * 26) or ''}",
+                seat_type='regular',
+                price_multiplier=Decimal('1.00'),
+            )
+            for i in range(size)
+        ])
+
+        show = Show.objects.create(
+            movie=movie, theater=theater, show_date=date(2030, 1, 1),
+            show_time=show_time(18, 0), base_price=Decimal('15000.00')
+        )
+
+        booked = list(theater.seats.all()[:int(size * booked_fraction)])
+        if booked:
+            booking = Booking.objects.create(
+                user=user, show=show, status='confirmed',
+                total_amount=show.base_price * len(booked)
+            )
+            BookingSeat.objects.bulk_create([
+                BookingSeat(booking=booking, show=show, seat=seat, price=show.base_price)
+                for seat in booked
+            ])
+        return show
@@ -0,0 +1,117 @@
+"""
+Management command to benchmark the fast read serializers.
+
+Run with: python manage.py bench_serializers [--objects 5000] [--repeat 5] [--json]
+
+Each catalog serializer renders the same unsaved, in-memory objects with
+DRF's regular field loop ("drf") and with FastReadMixin ("fast"), so no
+database work is measured. The JSON of both paths is compared before
+timing, and objects per second of the best run are reported.
+"""
+
+import json
+import time
+from datetime import date, time as show_time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+
+from api.fast_serializers import drf_serializer_class
+from api.models import Movie, Theater, Seat, Show
+from api.serializers import MovieListSerializer, TheaterListSerializer, ShowListSerializer, SeatSerializer
+
+
+class Command(BaseCommand):
+    help = 'Benchmark catalog serialization: DRF field loop vs fast read accessors'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--objects', type=int, default=5000,
+                            help='Objects rendered per serializer')
+        parser.add_argument('--repeat', type=int, default=5,
+                            help='Renders per path; the fastest run is reported')
+        parser.add_argument('--json', action='store_true',
+                            help='Print results as JSON')
+
+    def handle(self, *args, **options):
+        count = max(options['objects'], 1)
+        context = {'request': APIRequestFactory().get('/api/movies/')}
+
+        results = []
+        for serializer_class, objects in self._objects(count):
+            drf_class = drf_serializer_class(serializer_class)
+            fast_data = serializer_class(objects, many=True, context=context).data
+            drf_data = drf_class(objects, many=True, context=context).data
+            if JSONRenderer().render(fast_data) != JSONRenderer().render(drf_data):
+                raise CommandError(f'{serializer_class.__name__}: fast path output differs from DRF')
+
+            drf = self._measure(drf_class, objects, context, options['repeat'])
+            fast = self._measure(serializer_class, objects, context, options['repeat'])
+            results.append({
+                'serializer': serializer_class.__name__,
+                'objects': count,
+                'drf_per_sec': drf,
+                'fast_per_sec': fast,
+                'speedup': round(fast / drf, 2),
+            })
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+
+        self.stdout.write(f"{'serializer':<22} | {'objects':>7} | {'drf obj/s':>10} | "
+                          f"{'fast obj/s':>10} | {'speedup':>7}")
+        for row in results:
+            self.stdout.write(
+                f"{row['serializer']:<22} | {row['objects']:>7} | {row['drf_per_sec']:>10} | "
+                f"{row['fast_per_sec']:>10} | {row['speedup']:>6}x"
+            )
+
+    def _measure(self, serializer_class, objects, context, repeat):
+        best = None
+        for _ in range(max(repeat, 1)):
+            started = time.perf_counter()
+            serializer_class(objects, many=True, context=context).data
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return int(len(objects) / best)
+
+    def _objects(self, count):
+        """(serializer class, objects) pairs; objects are never saved"""
+        movies = [
+            Movie(
+                id=i + 1, title=f'Bench Movie {i}', genre='action', duration=120,
+                language='English', release_date=date(2024, 1, 1),
+                poster=f'movie_posters/bench_{i}.jpg' if i % 2 else None,
+                poster_url='https://example.com/poster.jpg', rating='PG-13',
+            )
+            for i in range(count)
+        ]
+        theaters = []
+        for i in range(count):
+            theater = Theater(id=i + 1, name=f'Bench Theater {i}', location='Benchmark', total_seats=100)
+            # As annotated by TheaterViewSet for lists
+            theater.active_seats_count = 100
+            theaters.append(theater)
+        shows = [
+            Show(
+                id=i + 1, movie=movies[i], theater=theaters[i], show_date=date(2030, 1, 1),
+                show_time=show_time(18, 0), base_price=Decimal('15000.00'),
+                total_seats_count=100, sold_seats_count=20,
+            )
+            for i in range(count)
+        ]
+        seats = [
+            Seat(
+                id=i + 1, theater=theaters[0], seat_number=f'A{i + 1}', row='A',
+                seat_type='regular', price_multiplier=Decimal('1.00'),
+            )
+            for i in range(count)
+        ]
+        return [
+            (MovieListSerializer, movies),
+            (TheaterListSerializer, theaters),
+            (ShowListSerializer, shows),
+            (SeatSerializer, seats),
+        ]
@@ -0,0 +1,66 @@
+"""
+Management command to cancel shows with all their bookings.
+
+Run with: python manage.py cancel_shows --show 12 [--show 13] [--reason "Projector failure"] [--output affected.jsonl]
+      or: python manage.py cancel_shows --theater 3 --from 2025-01-10 [--to 2025-01-12]
+
+Cancels every pending and confirmed booking of the shows, refunds
+completed payments and deactivates the shows in one transaction
+(api.cancellations). The affected bookings, with their customer's contact
+details, are written as newline-delimited JSON to --output for the
+notification run.
+"""
+
+import json
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from api.cancellations import cancel_shows, notification_rows, select_shows
+
+
+class Command(BaseCommand):
+    help = 'Cancel shows (or a theater\'s shows over a date range) and refund their bookings'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--show', type=int, action='append', dest='shows',
+                            help='Show ID to cancel (repeatable)')
+        parser.add_argument('--theater', type=int,
+                            help='Cancel every show of this theater within --from/--to')
+        parser.add_argument('--from', type=date.fromisoformat, dest='date_from',
+                            help='First show date (YYYY-MM-DD) with --theater')
+        parser.add_argument('--to', type=date.fromisoformat, dest='date_to',
+                            help='Last show date (defaults to --from)')
+        parser.add_argument('--reason', default='',
+                            help='Stored in the notes of every cancelled booking')
+        parser.add_argument('--output',
+                            help='File for the affected bookings (JSON lines)')
+
+    def handle(self, *args, **options):
+        if bool(options['shows']) == bool(options['theater']):
+            raise CommandError('Pass either --show or --theater.')
+        if options['theater'] and not options['date_from']:
+            raise CommandError('--theater needs --from.')
+
+        if options['shows']:
+            shows = select_shows(show_ids=options['shows'])
+        else:
+            shows = select_shows(
+                theater_id=options['theater'], date_from=options['date_from'], date_to=options['date_to']
+            )
+        cancellation = cancel_shows(shows, options['reason'])
+
+        summary = cancellation.summary()
+        self.stdout.write(
+            f"[{timezone.now():%Y-%m-%d %H:%M:%S}] ✓ {summary['shows_cancelled']} shows cancelled, "
+            f"{summary['bookings_cancelled']} bookings cancelled, "
+            f"{summary['payments_refunded']} payments refunded ({summary['refunded_amount']})"
+        )
+
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                for row in notification_rows(cancellation):
+                    output.write(json.dumps(row, cls=DjangoJSONEncoder) + '\n')
+            self.stdout.write(f"  Affected bookings written to {options['output']}")
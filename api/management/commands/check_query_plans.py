@@ -0,0 +1,315 @@
+"""
+Management command to verify that the hot query paths use their indexes.
+
+Run with: python manage.py check_query_plans [--scale 1.0] [--verbose] [--json]
+
+Seeds a large throwaway dataset (tens of thousands of shows, bookings and
+payments) inside a transaction that is rolled back at the end, runs ANALYZE,
+then exercises each listed endpoint or job with its real code path. Every
+query it issues is EXPLAINed and the check passes only if the expected
+indexes appear in the plans and the tables it reads by key are never
+sequentially scanned. Exits with an error when any check fails.
+
+Requires PostgreSQL.
+"""
+
+import json
+import random
+from datetime import date, time as show_time, timedelta
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from api import catalog_cache
+from api.holds import release_expired_holds
+from api.inventory import HELD_STATUSES, SOLD_STATUSES, recompute_show_counters
+from api.layouts import build_layout
+from api.models import User, Movie, Theater, Seat, Show, Booking, BookingSeat, Payment
+
+
+# Tables large enough that a sequential scan on them is worth reporting
+HOT_TABLES = {'movies', 'shows', 'bookings', 'booking_seats', 'payments'}
+
+INDEX_SCANS = {'Index Scan', 'Index Only Scan', 'Bitmap Index Scan'}
+
+SHOW_TIMES = [show_time(10, 0), show_time(13, 30), show_time(17, 0), show_time(20, 30)]
+
+# (status, weight) of seeded bookings
+BOOKING_STATUSES = [
+    ('confirmed', 70), ('completed', 10), ('cancelled', 10), ('pending', 5), ('expired', 5),
+]
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Check that hot endpoints use index scans on a large seeded dataset'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=float, default=1.0,
+                            help='Dataset size multiplier (1.0 = ~57k shows, 60k bookings)')
+        parser.add_argument('--verbose', action='store_true',
+                            help='Print the plan of every query')
+        parser.add_argument('--json', action='store_true',
+                            help='Print results as JSON')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('check_query_plans requires PostgreSQL.')
+
+        self.verbose = options['verbose']
+        results = []
+        try:
+            with transaction.atomic():
+                data = self._seed(options['scale'])
+                with connection.cursor() as cursor:
+                    for table in HOT_TABLES | {'users', 'theaters', 'seats'}:
+                        cursor.execute(f'ANALYZE {table}')
+                for name, expected, tables, run in self._checks(data):
+                    results.append(self._check(name, expected, tables, run))
+                raise _Rollback()
+        except _Rollback:
+            pass
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+        else:
+            for result in results:
+                style = self.style.SUCCESS if result['ok'] else self.style.ERROR
+                mark = '✓' if result['ok'] else '✗'
+                self.stdout.write(style(f"{mark} {result['check']}"))
+                self.stdout.write(f"    indexes: {', '.join(result['indexes']) or '-'}")
+                if result['missing']:
+                    self.stdout.write(f"    missing: {', '.join(result['missing'])}")
+                if result['seq_scans']:
+                    self.stdout.write(f"    seq scans: {', '.join(result['seq_scans'])}")
+
+        failed = [result['check'] for result in results if not result['ok']]
+        if failed:
+            raise CommandError(f"Index not used by: {', '.join(failed)}")
+
+    # ---- checks ----
+
+    def _checks(self, data):
+        admin, customer, show, seat = data['admin'], data['customer'], data['show'], data['seat']
+        # The sweeper's default batch of 500 bookings is ~1% of the seeded
+        # booking_seats, where a seq scan and the booking_id index cost about
+        # the same and the planner flips between them from one ANALYZE sample
+        # to the next. Keep the batch the small fraction of the table it is in
+        # production so the index is clearly the cheaper plan.
+        sweep_batch = max(int(100 * data['scale']), 10)
+        soon = (timezone.now() + timedelta(days=3)).date()
+
+        def get(path, user=None):
+            def run():
+                # Measure the uncached path of cached endpoints
+                cache.clear()
+                catalog_cache.clear()
+                client = APIClient()
+                if user is not None:
+                    client.force_authenticate(user)
+                response = client.get(path)
+                assert response.status_code == 200, f'{path} returned {response.status_code}'
+            return run
+
+        def walk_cursor(path, user):
+            def run():
+                client = APIClient()
+                client.force_authenticate(user)
+                url = f'{path}?pagination=cursor'
+                for _ in range(3):
+                    response = client.get(url)
+                    assert response.status_code == 200, f'{url} returned {response.status_code}'
+                    url = response.data['next']
+            return run
+
+        def delete_seat():
+            client = APIClient()
+            client.force_authenticate(admin)
+            response = client.delete(f'/api/seats/{seat.pk}/')
+            assert response.status_code == 204, f'seat delete returned {response.status_code}'
+
+        # (name, indexes that must be used, tables that must not be seq-scanned, run)
+        return [
+            ('GET /api/shows/?movie=', ['shows_active_movie_date_idx'], ['shows'],
+             get(f'/api/shows/?movie={show.movie_id}')),
+            ('GET /api/shows/?date=', ['shows_active_date_idx'], ['shows'],
+             get(f'/api/shows/?date={soon}')),
+            # The page comes off the genre index; its COUNT(*) may read the
+            # catalog sequentially (a few hundred pages at most, now that rows
+            # carry a search vector)
+            ('GET /api/movies/?genre=', ['movies_active_genre_idx'], [],
+             get('/api/movies/?genre=action')),
+            ('GET /api/shows/{id}/seats/', [], ['shows', 'bookings', 'booking_seats'],
+             get(f'/api/shows/{show.pk}/seats/')),
+            ('GET /api/bookings/ (customer)', ['bookings_user_status_date_idx'], ['bookings'],
+             get('/api/bookings/', customer)),
+            ('GET /api/bookings/?status= (customer)', ['bookings_user_status_date_idx'], ['bookings'],
+             get('/api/bookings/?status=confirmed', customer)),
+            ('GET /api/bookings/?cursor= (admin)', ['bookings_date_idx'], ['bookings'],
+             walk_cursor('/api/bookings/', admin)),
+            ('GET /api/payments/?cursor= (admin)', ['payments_created_idx'], ['payments'],
+             walk_cursor('/api/payments/', admin)),
+            # Sales figures come from the rollups and the catalog sizes from
+            # their maintained totals, so no table is counted
+            ('GET /api/admin/dashboard/', ['bookings_date_idx', 'shows_active_date_idx'],
+             ['movies', 'bookings', 'shows'],
+             get('/api/admin/dashboard/', admin)),
+            ('release_expired_holds', ['bookings_pending_expiry_idx'], ['bookings', 'booking_seats'],
+             lambda: release_expired_holds(batch_size=sweep_batch)),
+            ('recompute_show_counters', ['bookings_show_status_idx'], ['bookings', 'booking_seats'],
+             lambda: recompute_show_counters(Show.objects.filter(pk=show.pk))),
+            ('DELETE /api/seats/{id}/', ['booking_seats_seat_booking_idx'], ['booking_seats'],
+             delete_seat),
+        ]
+
+    def _check(self, name, expected, tables, run):
+        with CaptureQueriesContext(connection) as ctx:
+            run()
+
+        indexes, seq_scans = set(), set()
+        with connection.cursor() as cursor:
+            for query in ctx.captured_queries:
+                sql = query['sql']
+                if not sql.lstrip().upper().startswith(('SELECT', 'UPDATE', 'DELETE', 'WITH')):
+                    continue
+                cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}')
+                plan = cursor.fetchone()[0]
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+                for node in _plan_nodes(plan[0]['Plan']):
+                    if node['Node Type'] in INDEX_SCANS:
+                        indexes.add(node['Index Name'])
+                    elif node['Node Type'] == 'Seq Scan' and node['Relation Name'] in HOT_TABLES:
+                        seq_scans.add(node['Relation Name'])
+                if self.verbose:
+                    self.stdout.write(f'-- {name}\n{sql}')
+                    self.stdout.write(json.dumps(plan, indent=2))
+
+        missing = [index for index in expected if index not in indexes]
+        return {
+            'check': name,
+            'ok': not missing and not seq_scans.intersection(tables),
+            'indexes': sorted(indexes),
+            'missing': missing,
+            'seq_scans': sorted(seq_scans),
+        }
+
+    # ---- dataset ----
+
+    def _seed(self, scale):
+        rng = random.Random(42)
+        today = timezone.now().date()
+        now = timezone.now()
+
+        admin, _ = User.objects.get_or_create(
+            username='plancheck_admin',
+            defaults={'email': 'plancheck_admin@example.com', 'role': 'admin', 'is_staff': True}
+        )
+        customers = User.objects.bulk_create([
+            User(username=f'plancheck_{i}', email=f'plancheck_{i}@example.com',
+                 role='customer', password='!')
+            for i in range(max(int(1000 * scale), 10))
+        ])
+
+        genres = [choice for choice, _ in Movie.GENRE_CHOICES]
+        movies = Movie.objects.bulk_create([
+            Movie(
+                title=f'Plan Check Movie {i}', genre=genres[i % len(genres)], duration=120,
+                language='English', release_date=date(2020, 1, 1) + timedelta(days=i % 2000),
+                is_active=i % 10 != 0,
+            )
+            for i in range(max(int(2000 * scale), 20))
+        ])
+
+        layout = build_layout(6, 10)
+        theaters = Theater.objects.bulk_create([
+            Theater(name=f'Plan Check Theater {i}', location='Plan Check', total_seats=len(layout))
+            for i in range(max(int(40 * scale), 2))
+        ])
+        Seat.objects.bulk_create([
+            Seat(theater=theater, **spec) for theater in theaters for spec in layout
+        ])
+        seats_by_theater = {}
+        for seat in Seat.objects.filter(theater__in=theaters).order_by('id'):
+            seats_by_theater.setdefault(seat.theater_id, []).append(seat)
+
+        shows = Show.objects.bulk_create([
+            Show(
+                movie=rng.choice(movies), theater=theater,
+                show_date=today + timedelta(days=offset), show_time=slot,
+                base_price=Decimal('15000.00'), is_active=rng.random() > 0.1,
+            )
+            for theater in theaters
+            for offset in range(-180, 180)
+            for slot in SHOW_TIMES
+        ], batch_size=5000)
+
+        statuses = [status for status, _ in BOOKING_STATUSES]
+        weights = [weight for _, weight in BOOKING_STATUSES]
+        bookings, booking_seats, payments = [], [], []
+        for i in range(int(60000 * scale)):
+            show = shows[i % len(shows)]
+            status = rng.choices(statuses, weights)[0]
+            booking = Booking(
+                user=rng.choice(customers), show=show, status=status,
+                total_amount=show.base_price * 2, booking_reference=f'PC{i:010d}',
+                hold_expires_at=now if status in ('pending', 'expired') else None,
+            )
+            bookings.append(booking)
+            position = (i // len(shows)) * 2
+            for seat in seats_by_theater[show.theater_id][position:position + 2]:
+                booking_seats.append(BookingSeat(
+                    booking=booking, show=show, seat=seat, price=show.base_price,
+                    is_active=status in HELD_STATUSES + SOLD_STATUSES,
+                ))
+            if status in ('confirmed', 'completed'):
+                payments.append(Payment(
+                    booking=booking, payment_method='mobile_money', payment_status='completed',
+                    amount=booking.total_amount, payment_date=now,
+                ))
+
+        Booking.objects.bulk_create(bookings, batch_size=5000)
+        BookingSeat.objects.bulk_create(booking_seats, batch_size=5000)
+        Payment.objects.bulk_create(payments, batch_size=5000)
+
+        # booking_date is auto_now_add: spread the bookings over the past
+        # year and move hold expiries and payment dates along with them
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "UPDATE bookings SET booking_date = booking_date - ((id * 7919) %% 525600) * interval '1 minute' "
+                "WHERE id >= %s",
+                [bookings[0].pk]
+            )
+            cursor.execute(
+                "UPDATE bookings SET hold_expires_at = booking_date + interval '15 minutes' "
+                "WHERE id >= %s AND hold_expires_at IS NOT NULL",
+                [bookings[0].pk]
+            )
+            cursor.execute(
+                "UPDATE payments SET payment_date = bookings.booking_date FROM bookings "
+                "WHERE payments.booking_id = bookings.id AND bookings.id >= %s",
+                [bookings[0].pk]
+            )
+
+        booked_show = next(show for show in shows if show.is_active and show.show_date >= today)
+        return {
+            'scale': scale,
+            'admin': admin,
+            'customer': customers[0],
+            'show': booked_show,
+            'seat': seats_by_theater[booked_show.theater_id][0],
+        }
+
+
+def _plan_nodes(node):
+    yield node
+    for child in node.get('Plans', []):
+        yield from _plan_nodes(child)
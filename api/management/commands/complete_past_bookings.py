@@ -0,0 +1,46 @@
+"""
+Management command to complete the bookings of shows that have ended.
+
+Run with: python manage.py complete_past_bookings [--batch-size 500] [--after 0] [--loop] [--interval 600]
+
+Moves confirmed bookings of ended shows to 'completed' in keyset-ordered
+chunks, one short transaction each (api.lifecycle). Run it from cron every
+few minutes, or as a long-running worker with --loop. An interrupted run
+is simply started again: finished chunks are skipped. Bookings locked by
+live requests are left for the next sweep.
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api.lifecycle import complete_past_bookings
+
+
+class Command(BaseCommand):
+    help = 'Mark confirmed bookings of ended shows as completed'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Bookings completed per transaction')
+        parser.add_argument('--after', type=int, default=0,
+                            help='Start after this booking ID (first sweep only)')
+        parser.add_argument('--loop', action='store_true',
+                            help='Keep running and sweep every --interval seconds')
+        parser.add_argument('--interval', type=int, default=600,
+                            help='Seconds between sweeps in --loop mode')
+
+    def handle(self, *args, **options):
+        after_id = options['after']
+        while True:
+            completed, last_id = complete_past_bookings(batch_size=options['batch_size'], after_id=after_id)
+            self.stdout.write(
+                f"[{timezone.now():%Y-%m-%d %H:%M:%S}] ✓ {completed} bookings completed "
+                f"(last booking ID {last_id})"
+            )
+
+            if not options['loop']:
+                break
+            after_id = 0
+            time.sleep(options['interval'])
@@ -0,0 +1,42 @@
+"""
+Management command to charge accepted payments.
+
+Run with: python manage.py process_payments [--batch-size 50] [--loop] [--interval 2]
+
+Claims pending payments in batches, charges them through
+settings.PAYMENT_GATEWAY and commits the results (api.payments). Run it
+as a long-running worker with --loop when PAYMENT_QUEUE=database; several
+workers can run side by side, each claims payments the others skip.
+Payments stuck in processing past PAYMENT_PROCESSING_TIMEOUT are retried,
+as are refunds left refund_pending that long.
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api.payments import process_pending_payments
+
+
+class Command(BaseCommand):
+    help = 'Charge pending payments through the payment gateway'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50,
+                            help='Payments claimed at a time')
+        parser.add_argument('--loop', action='store_true',
+                            help='Keep running and poll every --interval seconds')
+        parser.add_argument('--interval', type=float, default=2,
+                            help='Seconds between polls in --loop mode when idle')
+
+    def handle(self, *args, **options):
+        while True:
+            processed = process_pending_payments(batch_size=options['batch_size'])
+            if processed or not options['loop']:
+                self.stdout.write(f"[{timezone.now():%Y-%m-%d %H:%M:%S}] ✓ {processed} payments processed")
+
+            if not options['loop']:
+                break
+            if processed < options['batch_size']:
+                time.sleep(options['interval'])
@@ -0,0 +1,27 @@
+"""
+Management command to delete expired idempotency keys.
+
+Run with: python manage.py purge_idempotency_keys [--batch-size 1000]
+
+Keys of booking and payment requests are kept for
+settings.IDEMPOTENCY_KEY_TTL so retries can replay the stored result.
+Expired keys are never replayed; this deletes their rows in batches. Run
+it from cron, e.g. hourly.
+"""
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api.idempotency import purge_expired_keys
+
+
+class Command(BaseCommand):
+    help = 'Delete idempotency keys whose TTL has passed'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Keys deleted per statement')
+
+    def handle(self, *args, **options):
+        deleted = purge_expired_keys(batch_size=options['batch_size'])
+        self.stdout.write(f"[{timezone.now():%Y-%m-%d %H:%M:%S}] ✓ {deleted} expired idempotency keys deleted")
@@ -0,0 +1,39 @@
+"""
+Management command to rebuild the denormalized seat counters on shows.
+
+Run with: python manage.py repair_show_counters [--show ID ...] [--theater ID] [--upcoming]
+
+Recomputes total/held/sold and per-seat-type remaining counters from the
+seat and booking tables with one set-based UPDATE. Use it after bulk data
+fixes or if counters are suspected to have drifted.
+"""
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api.inventory import recompute_show_counters
+from api.models import Show
+
+
+class Command(BaseCommand):
+    help = 'Recompute availability counters for shows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--show', type=int, nargs='+', dest='show_ids',
+                            help='Only repair these show IDs')
+        parser.add_argument('--theater', type=int, dest='theater_id',
+                            help='Only repair shows of this theater')
+        parser.add_argument('--upcoming', action='store_true',
+                            help='Only repair shows from today onwards')
+
+    def handle(self, *args, **options):
+        shows = Show.objects.all()
+        if options['show_ids']:
+            shows = shows.filter(pk__in=options['show_ids'])
+        if options['theater_id']:
+            shows = shows.filter(theater_id=options['theater_id'])
+        if options['upcoming']:
+            shows = shows.filter(show_date__gte=timezone.now().date())
+
+        updated = recompute_show_counters(shows)
+        self.stdout.write(self.style.SUCCESS(f'✓ Counters recomputed for {updated} shows'))
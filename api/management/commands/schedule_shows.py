@@ -0,0 +1,70 @@
+"""
+Management command to create recurring shows.
+
+Run with: python manage.py schedule_shows --movie 1 --theater 1 [--theater 2] --from 2025-01-06 --to 2025-01-12
+              --time 14:00 --time 18:00 --price 15000 [--weekend-multiplier 1.2] [--weekday 4 --weekday 5] [--dry-run]
+
+Plans one show per theater, date and time, checks every slot with one
+query, bulk-inserts the free ones and lists the slots already taken
+(api.schedules).
+"""
+
+from datetime import date, time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from api.models import Movie, Theater
+from api.schedules import create_schedule, plan_shows
+
+
+class Command(BaseCommand):
+    help = 'Create shows for a movie from a recurrence rule'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--movie', type=int, required=True, help='Movie ID')
+        parser.add_argument('--theater', type=int, action='append', dest='theaters', required=True,
+                            help='Theater ID (repeatable)')
+        parser.add_argument('--from', type=date.fromisoformat, dest='date_from', required=True,
+                            help='First show date (YYYY-MM-DD)')
+        parser.add_argument('--to', type=date.fromisoformat, dest='date_to', required=True,
+                            help='Last show date (YYYY-MM-DD)')
+        parser.add_argument('--time', type=time.fromisoformat, action='append', dest='times', required=True,
+                            help='Start time (HH:MM, repeatable)')
+        parser.add_argument('--weekday', type=int, action='append', dest='weekdays', choices=range(7),
+                            help='Weekday it plays, 0 = Monday (repeatable; default every day)')
+        parser.add_argument('--price', type=Decimal, required=True, help='Weekday base price')
+        parser.add_argument('--weekend-multiplier', type=Decimal, default=Decimal('1'),
+                            help='Applied to the base price on Saturdays and Sundays')
+        parser.add_argument('--dry-run', action='store_true', help='Only report the free and taken slots')
+
+    def handle(self, *args, **options):
+        try:
+            movie = Movie.objects.get(pk=options['movie'])
+        except Movie.DoesNotExist:
+            raise CommandError(f"Movie {options['movie']} not found.")
+        theaters = Theater.objects.in_bulk(options['theaters'])
+        missing = [pk for pk in options['theaters'] if pk not in theaters]
+        if missing:
+            raise CommandError(f"Theaters {', '.join(map(str, missing))} not found.")
+        if options['date_to'] < options['date_from']:
+            raise CommandError('--to must not be before --from.')
+
+        planned = plan_shows(
+            movie, [theaters[pk] for pk in dict.fromkeys(options['theaters'])],
+            options['date_from'], options['date_to'], options['times'],
+            options['price'], options['weekend_multiplier'], options['weekdays'],
+        )
+        schedule = create_schedule(planned, dry_run=options['dry_run'])
+
+        for conflict in schedule.conflicts:
+            self.stdout.write(
+                f"  ✗ Theater {conflict['theater']} {conflict['show_date']} {conflict['show_time']:%H:%M} "
+                f"taken by show {conflict['conflicting_show']} ({conflict['conflicting_movie']})"
+            )
+        verb = 'can be created' if options['dry_run'] else 'created'
+        self.stdout.write(
+            f"[{timezone.now():%Y-%m-%d %H:%M:%S}] ✓ {len(schedule.shows)} shows {verb}, "
+            f"{len(schedule.conflicts)} slots already taken"
+        )
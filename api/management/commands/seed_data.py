@@ -8,7 +8,10 @@ from django.core.management.base import BaseCommand
 from django.utils import timezone
 from datetime import date, time, timedelta
 from decimal import Decimal
-from api.models import User, Movie, Theater, Seat, Show
+from api.models import User, Movie, Theater, Show
+from api.inventory import recompute_show_counters
+from api.layouts import apply_layout, build_layout
+from api.schedules import create_schedule, plan_shows
 
 
 class Command(BaseCommand):
@@ -158,47 +161,34 @@ class Command(BaseCommand):
         today = timezone.now().date()
         show_times = [time(10, 0), time(14, 0), time(18, 0), time(21, 0)]
         
-        shows_created = 0
-        for day_offset in range(7):
-            show_date = today + timedelta(days=day_offset)
+        planned = []
+        for theater_idx, theater in enumerate(theaters):
+            # Each theater shows 2 movies per day
+            theater_movies = movies[theater_idx*2:(theater_idx+1)*2] if theater_idx < 2 else movies[-2:]
             
-            # Distribute movies across theaters and time slots
-            for theater_idx, theater in enumerate(theaters):
-                # Each theater shows 2 movies per day at different times
-                theater_movies = movies[theater_idx*2:(theater_idx+1)*2] if theater_idx < 2 else movies[-2:]
-                
-                for movie_idx, movie in enumerate(theater_movies):
-                    # Assign different time slots to different movies
-                    movie_times = show_times[movie_idx*2:(movie_idx+1)*2]
-                    
-                    for show_time in movie_times:
-                        base_price = Decimal('15000.00')  # TZS 15,000
-                        
-                        # Premium pricing for IMAX and VIP
-                        if 'IMAX' in theater.name:
-                            base_price = Decimal('25000.00')
-                        elif 'VIP' in theater.name:
-                            base_price = Decimal('35000.00')
-                        
-                        # Weekend pricing
-                        if show_date.weekday() >= 5:  # Saturday or Sunday
-                            base_price *= Decimal('1.2')
-                        
-                        show, created = Show.objects.get_or_create(
-                            theater=theater,
-                            show_date=show_date,
-                            show_time=show_time,
-                            defaults={
-                                'movie': movie,
-                                'base_price': base_price,
-                                'is_active': True,
-                            }
-                        )
-                        if created:
-                            shows_created += 1
+            # Premium pricing for IMAX and VIP
+            base_price = Decimal('15000.00')  # TZS 15,000
+            if 'IMAX' in theater.name:
+                base_price = Decimal('25000.00')
+            elif 'VIP' in theater.name:
+                base_price = Decimal('35000.00')
+            
+            for movie_idx, movie in enumerate(theater_movies):
+                # Assign different time slots to different movies; weekend
+                # shows cost 20% more
+                planned += plan_shows(
+                    movie, [theater], today, today + timedelta(days=6),
+                    show_times[movie_idx*2:(movie_idx+1)*2], base_price, weekend_multiplier=Decimal('1.2'),
+                )
+        
+        # Slots seeded by an earlier run are skipped
+        shows_created = len(create_schedule(planned).shows)
         
         self.stdout.write(f'✓ Shows created: {shows_created}')
         
+        # Initialize the availability counters of every show
+        recompute_show_counters(Show.objects.all())
+        
         self.stdout.write(self.style.SUCCESS('\n✓ Database seeding completed successfully!'))
         self.stdout.write('\nSample credentials:')
         self.stdout.write('  Admin: username=admin, password=admin123')
@@ -206,8 +196,6 @@ class Command(BaseCommand):
     
     def _generate_seats(self, theater):
         """Generate seats for a theater"""
-        row_labels = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
-        
         # Determine rows and seats based on total_seats
         if theater.total_seats <= 50:
             rows = 5
@@ -219,35 +207,11 @@ class Command(BaseCommand):
             rows = 10
             seats_per_row = 10
         
-        seats_created = 0
-        for i in range(rows):
-            row_label = row_labels[i]
-            for j in range(1, seats_per_row + 1):
-                seat_number = f"{row_label}{j}"
-                
-                # Determine seat type based on row
-                if i < 2:
-                    seat_type = 'vip'
-                    price_multiplier = Decimal('1.50')
-                elif i < 4:
-                    seat_type = 'premium'
-                    price_multiplier = Decimal('1.25')
-                else:
-                    seat_type = 'regular'
-                    price_multiplier = Decimal('1.00')
-                
-                Seat.objects.create(
-                    theater=theater,
-                    seat_number=seat_number,
-                    row=row_label,
-                    seat_type=seat_type,
-                    price_multiplier=price_multiplier,
-                    is_active=True
-                )
-                seats_created += 1
-        
-        # Update theater's total seats
-        theater.total_seats = seats_created
-        theater.save()
+        # First two rows are VIP, the next two premium, the rest regular
+        stats = apply_layout(
+            theater,
+            build_layout(rows, seats_per_row, vip_rows=2, premium_rows=2)
+        )
+        seats_created = stats['total_seats']
         
         self.stdout.write(f'  ✓ {seats_created} seats generated for {theater.name}')
@@ -0,0 +1,138 @@
+"""
+Movie Ticket Booking System - Request Instrumentation
+
+DAR ES SALAAM INSTITUTE OF TECHNOLOGY
+MODULE CODE: COU 07503
+MODULE NAME: WEB APPLICATION DEVELOPMENT
+
+QueryCountMiddleware records the number of database queries, the total
+database time and the slowest statements of every request.
+
+- With settings.QUERY_COUNT_HEADERS on, they are returned in the
+  X-Query-Count, X-DB-Time-Ms and X-DB-Slowest response headers
+  (the load benchmarks turn this on for the server they start).
+- With settings.QUERY_STATS_LOG_INTERVAL > 0, per-endpoint totals are
+  logged to the "api.queries" logger every that many seconds, and
+  requests that exceed their endpoint's query budget are logged as
+  warnings.
+
+Views declare budgets as ``query_budgets``: a dict keyed by viewset action
+(``'list'``, ``'retrieve'``, ``'seats'``...) or, for plain APIViews, by
+lower-case HTTP method. The test suite enforces them.
+
+The middleware is not installed when both settings are off.
+"""
+
+import logging
+import re
+import threading
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+
+
+logger = logging.getLogger('api.queries')
+
+
+def query_budget_key(resolver_match, method):
+    """
+    Returns (view class, budget key) for a resolved request, or (None, None)
+    for views that are not class based.
+    """
+    func = resolver_match.func
+    view_class = getattr(func, 'cls', None) or getattr(func, 'view_class', None)
+    if view_class is None:
+        return None, None
+    actions = getattr(func, 'actions', None)
+    if actions:
+        return view_class, actions.get(method.lower())
+    return view_class, method.lower()
+
+
+def query_budget(resolver_match, method):
+    """Returns the query budget declared for a resolved request, if any"""
+    view_class, key = query_budget_key(resolver_match, method)
+    return getattr(view_class, 'query_budgets', {}).get(key)
+
+
+class EndpointStats:
+    """Thread-safe per-endpoint query totals, flushed to the log periodically"""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.totals = {}
+        self.last_flush = time.monotonic()
+
+    def add(self, endpoint, queries, seconds):
+        with self.lock:
+            entry = self.totals.setdefault(endpoint, [0, 0, 0, 0.0])
+            entry[0] += 1
+            entry[1] += queries
+            entry[2] = max(entry[2], queries)
+            entry[3] += seconds
+            if time.monotonic() - self.last_flush < self.interval:
+                return
+            totals, self.totals = self.totals, {}
+            self.last_flush = time.monotonic()
+
+        for endpoint, (requests, queries, max_queries, seconds) in sorted(totals.items()):
+            logger.info(
+                '%s requests=%d queries_avg=%.1f queries_max=%d db_ms_avg=%.1f',
+                endpoint, requests, queries / requests, max_queries, seconds * 1000 / requests
+            )
+
+
+def _header_safe(sql, limit=200):
+    sql = re.sub(r'\s+', ' ', sql)[:limit]
+    return sql.encode('ascii', 'replace').decode('ascii')
+
+
+class QueryCountMiddleware:
+    """Records query count, database time and slowest statements per request"""
+
+    def __init__(self, get_response):
+        if not settings.QUERY_COUNT_HEADERS and not settings.QUERY_STATS_LOG_INTERVAL:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        self.stats = EndpointStats(settings.QUERY_STATS_LOG_INTERVAL) if settings.QUERY_STATS_LOG_INTERVAL else None
+
+    def __call__(self, request):
+        statements = []
+
+        def record(execute, sql, params, many, context):
+            started = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                statements.append((time.perf_counter() - started, sql))
+
+        with connection.execute_wrapper(record):
+            response = self.get_response(request)
+
+        count = len(statements)
+        seconds = sum(duration for duration, _ in statements)
+        slowest = sorted(statements, key=lambda statement: statement[0], reverse=True)
+        slowest = slowest[:settings.QUERY_STATS_SLOWEST]
+
+        if settings.QUERY_COUNT_HEADERS:
+            response['X-Query-Count'] = str(count)
+            response['X-DB-Time-Ms'] = f'{seconds * 1000:.1f}'
+            response['X-DB-Slowest'] = ' | '.join(
+                f'{duration * 1000:.1f}ms {_header_safe(sql)}' for duration, sql in slowest
+            )
+
+        if self.stats is not None and request.resolver_match is not None:
+            endpoint = f'{request.method} {request.resolver_match.view_name}'
+            self.stats.add(endpoint, count, seconds)
+            budget = query_budget(request.resolver_match, request.method)
+            if budget is not None and count > budget:
+                logger.warning(
+                    '%s ran %d queries (budget %d); slowest: %s',
+                    endpoint, count, budget,
+                    '; '.join(f'{duration * 1000:.1f}ms {sql}' for duration, sql in slowest)
+                )
+
+        return response
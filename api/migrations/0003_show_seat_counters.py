@@ -0,0 +1,78 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:03
+
+from django.db import migrations, models
+
+
+def _remaining(seat_type):
+    return f"""(
+        SELECT COUNT(*) FROM seats s
+        WHERE s.theater_id = shows.theater_id AND s.is_active AND s.seat_type = '{seat_type}'
+          AND s.id NOT IN (
+              SELECT bs.seat_id FROM booking_seats bs
+              JOIN bookings b ON b.id = bs.booking_id
+              WHERE b.show_id = shows.id AND b.status IN ('pending', 'confirmed', 'completed')
+          )
+    )"""
+
+
+POPULATE_COUNTERS = f"""
+UPDATE shows SET
+    total_seats_count = (
+        SELECT COUNT(*) FROM seats s
+        WHERE s.theater_id = shows.theater_id AND s.is_active
+    ),
+    held_seats_count = (
+        SELECT COUNT(*) FROM booking_seats bs
+        JOIN bookings b ON b.id = bs.booking_id
+        WHERE b.show_id = shows.id AND b.status = 'pending'
+    ),
+    sold_seats_count = (
+        SELECT COUNT(*) FROM booking_seats bs
+        JOIN bookings b ON b.id = bs.booking_id
+        WHERE b.show_id = shows.id AND b.status IN ('confirmed', 'completed')
+    ),
+    regular_seats_remaining = {_remaining('regular')},
+    premium_seats_remaining = {_remaining('premium')},
+    vip_seats_remaining = {_remaining('vip')}
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_movie_poster_url'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='show',
+            name='held_seats_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='show',
+            name='premium_seats_remaining',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='show',
+            name='regular_seats_remaining',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='show',
+            name='sold_seats_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='show',
+            name='total_seats_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='show',
+            name='vip_seats_remaining',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunSQL(POPULATE_COUNTERS, migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# Copy the show from the parent booking and free seats of cancelled bookings
+POPULATE_BOOKING_SEATS = """
+UPDATE booking_seats SET
+    show_id = (SELECT b.show_id FROM bookings b WHERE b.id = booking_seats.booking_id),
+    is_active = (
+        SELECT b.status IN ('pending', 'confirmed', 'completed')
+        FROM bookings b WHERE b.id = booking_seats.booking_id
+    )
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_show_seat_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bookingseat',
+            name='is_active',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AddField(
+            model_name='bookingseat',
+            name='show',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='booking_seats', to='api.show'),
+        ),
+        migrations.RunSQL(POPULATE_BOOKING_SEATS, migrations.RunSQL.noop),
+        migrations.AlterField(
+            model_name='bookingseat',
+            name='show',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='booking_seats', to='api.show'),
+        ),
+        migrations.AddConstraint(
+            model_name='bookingseat',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_active', True)), fields=('show', 'seat'), name='unique_active_seat_per_show'),
+        ),
+    ]
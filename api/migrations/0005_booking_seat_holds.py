@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:06
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+
+
+def set_legacy_hold_expiry(apps, schema_editor):
+    """Give pending bookings created before holds existed a normal TTL"""
+    Booking = apps.get_model('api', 'Booking')
+    Booking.objects.filter(status='pending', hold_expires_at__isnull=True).update(
+        hold_expires_at=F('created_at') + settings.SEAT_HOLD_TTL
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_booking_seat_show_uniqueness'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='hold_expires_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='booking',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('confirmed', 'Confirmed'), ('cancelled', 'Cancelled'), ('completed', 'Completed'), ('expired', 'Expired')], default='pending', max_length=15),
+        ),
+        migrations.RunPython(set_legacy_hold_expiry, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_booking_seat_holds'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SeatLayoutTemplate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('description', models.TextField(blank=True, null=True)),
+                ('rows', models.PositiveSmallIntegerField(default=10)),
+                ('seats_per_row', models.PositiveSmallIntegerField(default=10)),
+                ('aisles', models.JSONField(blank=True, default=list)),
+                ('vip_rows', models.PositiveSmallIntegerField(default=2)),
+                ('premium_rows', models.PositiveSmallIntegerField(default=3)),
+                ('disabled_seats', models.JSONField(blank=True, default=list)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Seat Layout Template',
+                'verbose_name_plural': 'Seat Layout Templates',
+                'db_table': 'seat_layout_templates',
+                'ordering': ['name'],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_seat_layout_template'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='theater',
+            name='layout_version',
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+    ]
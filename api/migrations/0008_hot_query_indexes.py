@@ -0,0 +1,98 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:14
+
+import django.db.models.deletion
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Build the indexes without blocking writes to the booking tables
+    atomic = False
+
+    dependencies = [
+        ('api', '0007_theater_layout_version'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='booking',
+            index=models.Index(fields=['user', 'status', '-booking_date'], name='bookings_user_status_date_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='booking',
+            index=models.Index(fields=['show', 'status'], name='bookings_show_status_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='booking',
+            index=models.Index(fields=['-booking_date'], name='bookings_date_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='booking',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['hold_expires_at'], name='bookings_pending_expiry_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='bookingseat',
+            index=models.Index(fields=['seat', 'booking'], name='booking_seats_seat_booking_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='movie',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['genre', '-release_date'], name='movies_active_genre_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='payment',
+            index=models.Index(condition=models.Q(('payment_status', 'completed')), fields=['payment_date'], name='payments_completed_date_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='show',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['show_date', 'show_time'], name='shows_active_date_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='show',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['movie', 'show_date', 'show_time'], name='shows_active_movie_date_idx'),
+        ),
+        # Single-column FK indexes now covered by the composites above. Only
+        # the indexes are dropped; the FK constraints stay untouched.
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name='booking',
+                    name='show',
+                    field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='bookings', to='api.show'),
+                ),
+                migrations.AlterField(
+                    model_name='booking',
+                    name='user',
+                    field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='bookings', to=settings.AUTH_USER_MODEL),
+                ),
+                migrations.AlterField(
+                    model_name='bookingseat',
+                    name='booking',
+                    field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='booking_seats', to='api.booking'),
+                ),
+                migrations.AlterField(
+                    model_name='bookingseat',
+                    name='seat',
+                    field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='booking_seats', to='api.seat'),
+                ),
+            ],
+            database_operations=[
+                migrations.RunSQL(
+                    'DROP INDEX CONCURRENTLY IF EXISTS "bookings_show_id_182a073c";',
+                    reverse_sql='CREATE INDEX CONCURRENTLY "bookings_show_id_182a073c" ON "bookings" ("show_id");',
+                ),
+                migrations.RunSQL(
+                    'DROP INDEX CONCURRENTLY IF EXISTS "bookings_user_id_6e734b08";',
+                    reverse_sql='CREATE INDEX CONCURRENTLY "bookings_user_id_6e734b08" ON "bookings" ("user_id");',
+                ),
+                migrations.RunSQL(
+                    'DROP INDEX CONCURRENTLY IF EXISTS "booking_seats_booking_id_3bc079f3";',
+                    reverse_sql='CREATE INDEX CONCURRENTLY "booking_seats_booking_id_3bc079f3" ON "booking_seats" ("booking_id");',
+                ),
+                migrations.RunSQL(
+                    'DROP INDEX CONCURRENTLY IF EXISTS "booking_seats_seat_id_a2e378f9";',
+                    reverse_sql='CREATE INDEX CONCURRENTLY "booking_seats_seat_id_a2e378f9" ON "booking_seats" ("seat_id");',
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:22
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SalesRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('granularity', models.CharField(choices=[('hour', 'Hour'), ('day', 'Day'), ('total', 'All time')], max_length=5)),
+                ('bucket', models.DateTimeField()),
+                ('bookings', models.PositiveIntegerField(default=0)),
+                ('seats_sold', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('refunds', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('refunded_seats', models.PositiveIntegerField(default=0)),
+                ('movie', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sales_rollups', to='api.movie')),
+                ('theater', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sales_rollups', to='api.theater')),
+            ],
+            options={
+                'verbose_name': 'Sales Rollup',
+                'verbose_name_plural': 'Sales Rollups',
+                'db_table': 'sales_rollups',
+                'ordering': ['granularity', '-bucket'],
+                'constraints': [models.UniqueConstraint(fields=('granularity', 'bucket', 'theater', 'movie'), name='unique_sales_rollup_bucket')],
+            },
+        ),
+    ]
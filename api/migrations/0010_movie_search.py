@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:26
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_sales_rollups'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='movie',
+            name='search_vector',
+            field=models.GeneratedField(db_persist=True, expression=django.contrib.postgres.search.CombinedSearchVector(django.contrib.postgres.search.CombinedSearchVector(django.contrib.postgres.search.CombinedSearchVector(django.contrib.postgres.search.SearchVector('title', config='english', weight='A'), '||', django.contrib.postgres.search.SearchVector('genre', config='english', weight='B'), django.contrib.postgres.search.SearchConfig('english')), '||', django.contrib.postgres.search.SearchVector('description', config='english', weight='C'), django.contrib.postgres.search.SearchConfig('english')), '||', django.contrib.postgres.search.SearchVector('language', config='english', weight='D'), django.contrib.postgres.search.SearchConfig('english')), output_field=django.contrib.postgres.search.SearchVectorField()),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='movies_search_vector_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['title'], name='movies_title_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['language'], name='movies_language_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:49
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Build the index without blocking writes to payments
+    atomic = False
+
+    dependencies = [
+        ('api', '0010_movie_search'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='payment',
+            index=models.Index(fields=['-created_at', '-id'], name='payments_created_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:03
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Build the queue index without blocking writes to payments
+    atomic = False
+
+    dependencies = [
+        ('api', '0012_idempotency_keys'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payment',
+            name='failure_reason',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.AlterField(
+            model_name='payment',
+            name='payment_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('completed', 'Completed'), ('failed', 'Failed'), ('refunded', 'Refunded')], default='pending', max_length=15),
+        ),
+        AddIndexConcurrently(
+            model_name='payment',
+            index=models.Index(condition=models.Q(('payment_status__in', ['pending', 'processing'])), fields=['created_at', 'id'], name='payments_queue_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:04
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_payment_pipeline'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='movie',
+            name='movies_language_trgm_idx',
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('language'), name='gin_trgm_ops'), name='movies_language_trgm_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:16
+
+from django.db import migrations, models
+
+
+POPULATE_TOTALS = """
+INSERT INTO catalog_totals (name, value) VALUES
+    ('customers', (SELECT COUNT(*) FROM users WHERE role = 'customer')),
+    ('movies', (SELECT COUNT(*) FROM movies WHERE is_active)),
+    ('theaters', (SELECT COUNT(*) FROM theaters WHERE is_active))
+"""
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_movie_language_upper_trgm'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogTotal',
+            fields=[
+                ('name', models.CharField(choices=[('customers', 'Customers'), ('movies', 'Active movies'), ('theaters', 'Active theaters')], max_length=20, primary_key=True, serialize=False)),
+                ('value', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Catalog Total',
+                'verbose_name_plural': 'Catalog Totals',
+                'db_table': 'catalog_totals',
+            },
+        ),
+        migrations.RunSQL(POPULATE_TOTALS, migrations.RunSQL.noop),
+    ]
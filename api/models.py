@@ -16,12 +16,18 @@ This module defines all database entities for the Movie Ticket Booking System:
 - Theater: Cinema theater details
 - Show: Movie showtime scheduling
 - Seat: Theater seat management
+- SeatLayoutTemplate: Reusable theater seating plans
 - Booking: Ticket booking records
 - Payment: Payment transactions
+- SalesRollup: Pre-aggregated booking and sales totals for the dashboard
+- IdempotencyKey: Stored results of retried booking and payment requests
 """
 
 from django.db import models
+from django.db.models.functions import Upper
 from django.contrib.auth.models import AbstractUser
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 from django.core.validators import MinValueValidator
 from decimal import Decimal
 
@@ -80,6 +86,8 @@ class Movie(models.Model):
         poster: Movie poster image
         rating: Movie rating (PG, PG-13, R, etc.)
         is_active: Whether movie is currently showing
+        search_vector: Weighted full-text vector of title, genre, description
+                       and language, computed by the database (see api.search)
     """
     
     GENRE_CHOICES = [
@@ -113,6 +121,16 @@ class Movie(models.Model):
     poster_url = models.URLField(max_length=500, blank=True, null=True, help_text="External poster URL")
     rating = models.CharField(max_length=10, choices=RATING_CHOICES, default='PG')
     is_active = models.BooleanField(default=True)
+    search_vector = models.GeneratedField(
+        expression=(
+            SearchVector('title', weight='A', config='english')
+            + SearchVector('genre', weight='B', config='english')
+            + SearchVector('description', weight='C', config='english')
+            + SearchVector('language', weight='D', config='english')
+        ),
+        output_field=SearchVectorField(),
+        db_persist=True,
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -121,6 +139,20 @@ class Movie(models.Model):
         verbose_name = 'Movie'
         verbose_name_plural = 'Movies'
         ordering = ['-release_date']
+        indexes = [
+            # Catalog browsing by genre (MovieViewSet.get_queryset)
+            models.Index(
+                fields=['genre', '-release_date'],
+                condition=models.Q(is_active=True),
+                name='movies_active_genre_idx',
+            ),
+            # Ranked full-text search and typo-tolerant title/language
+            # matching (api.search)
+            GinIndex(fields=['search_vector'], name='movies_search_vector_idx'),
+            GinIndex(fields=['title'], opclasses=['gin_trgm_ops'], name='movies_title_trgm_idx'),
+            # ?language= filters with icontains, i.e. UPPER(language) LIKE
+            GinIndex(OpClass(Upper('language'), name='gin_trgm_ops'), name='movies_language_trgm_idx'),
+        ]
     
     def __str__(self):
         return f"{self.title} ({self.release_date.year})"
@@ -136,6 +168,7 @@ class Theater(models.Model):
         location: Physical location/address
         total_seats: Total number of seats
         is_active: Whether theater is currently operational
+        layout_version: Bumped whenever seats change; keys the seat layout cache
     """
     
     name = models.CharField(max_length=100)
@@ -143,6 +176,7 @@ class Theater(models.Model):
     total_seats = models.PositiveIntegerField(default=100)
     description = models.TextField(blank=True, null=True)
     is_active = models.BooleanField(default=True)
+    layout_version = models.PositiveIntegerField(default=1, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -202,6 +236,42 @@ class Seat(models.Model):
         return f"{self.theater.name} - Seat {self.seat_number} ({self.seat_type})"
 
 
+class SeatLayoutTemplate(models.Model):
+    """
+    Seat Layout Template Model
+    Reusable seating plan that can be applied to many theaters.
+    
+    Attributes:
+        name: Unique template name (e.g., "Standard 10x12")
+        rows: Number of rows (max 26, labelled A-Z from the screen)
+        seats_per_row: Seat positions per row, including aisle positions
+        aisles: Seat positions left empty as aisles (e.g., [5, 11])
+        vip_rows: Number of VIP rows at the front
+        premium_rows: Number of premium rows right behind the VIP rows
+        disabled_seats: Seat numbers created inactive (e.g., ["A1", "A12"])
+    """
+    
+    name = models.CharField(max_length=100, unique=True)
+    description = models.TextField(blank=True, null=True)
+    rows = models.PositiveSmallIntegerField(default=10)
+    seats_per_row = models.PositiveSmallIntegerField(default=10)
+    aisles = models.JSONField(default=list, blank=True)
+    vip_rows = models.PositiveSmallIntegerField(default=2)
+    premium_rows = models.PositiveSmallIntegerField(default=3)
+    disabled_seats = models.JSONField(default=list, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'seat_layout_templates'
+        verbose_name = 'Seat Layout Template'
+        verbose_name_plural = 'Seat Layout Templates'
+        ordering = ['name']
+    
+    def __str__(self):
+        return f"{self.name} ({self.rows}x{self.seats_per_row})"
+
+
 class Show(models.Model):
     """
     Show Model
@@ -214,6 +284,13 @@ class Show(models.Model):
         show_time: Time of the show
         base_price: Base ticket price for this show
         is_active: Whether show is active and can be booked
+        total_seats_count: Active seats in the theater (denormalized)
+        held_seats_count: Seats held by pending bookings (denormalized)
+        sold_seats_count: Seats sold to confirmed bookings (denormalized)
+        *_seats_remaining: Unbooked seats per seat type (denormalized)
+    
+    The counters are maintained by api.inventory and can be rebuilt with
+    `python manage.py repair_show_counters`.
     """
     
     movie = models.ForeignKey(
@@ -234,6 +311,12 @@ class Show(models.Model):
         validators=[MinValueValidator(Decimal('0.01'))]
     )
     is_active = models.BooleanField(default=True)
+    total_seats_count = models.PositiveIntegerField(default=0)
+    held_seats_count = models.PositiveIntegerField(default=0)
+    sold_seats_count = models.PositiveIntegerField(default=0)
+    regular_seats_remaining = models.PositiveIntegerField(default=0)
+    premium_seats_remaining = models.PositiveIntegerField(default=0)
+    vip_seats_remaining = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -243,24 +326,41 @@ class Show(models.Model):
         verbose_name_plural = 'Shows'
         ordering = ['show_date', 'show_time']
         unique_together = ['theater', 'show_date', 'show_time']
+        # Listings only show active shows; the theater filter is served by
+        # the unique (theater, show_date, show_time) index
+        indexes = [
+            models.Index(
+                fields=['show_date', 'show_time'],
+                condition=models.Q(is_active=True),
+                name='shows_active_date_idx',
+            ),
+            models.Index(
+                fields=['movie', 'show_date', 'show_time'],
+                condition=models.Q(is_active=True),
+                name='shows_active_movie_date_idx',
+            ),
+        ]
     
     def __str__(self):
         return f"{self.movie.title} - {self.theater.name} ({self.show_date} {self.show_time})"
     
+    @property
+    def available_seats_count(self):
+        """Number of unbooked seats, read from the maintained counters"""
+        return max(self.total_seats_count - self.held_seats_count - self.sold_seats_count, 0)
+    
     def get_available_seats(self):
         """Returns queryset of available seats for this show"""
-        booked_seat_ids = BookingSeat.objects.filter(
-            booking__show=self,
-            booking__status__in=['confirmed', 'pending']
+        booked_seat_ids = BookingSeat.objects.taken().filter(
+            show=self
         ).values_list('seat_id', flat=True)
         
         return self.theater.seats.filter(is_active=True).exclude(id__in=booked_seat_ids)
     
     def get_booked_seats(self):
         """Returns queryset of booked seats for this show"""
-        booked_seat_ids = BookingSeat.objects.filter(
-            booking__show=self,
-            booking__status__in=['confirmed', 'pending']
+        booked_seat_ids = BookingSeat.objects.taken().filter(
+            show=self
         ).values_list('seat_id', flat=True)
         
         return self.theater.seats.filter(id__in=booked_seat_ids)
@@ -276,8 +376,9 @@ class Booking(models.Model):
         show: Foreign key to Show
         booking_date: When the booking was made
         total_amount: Total price of the booking
-        status: Booking status (Pending, Confirmed, Cancelled)
+        status: Booking status (Pending, Confirmed, Cancelled, Completed, Expired)
         booking_reference: Unique booking reference code
+        hold_expires_at: When the seat hold of a pending booking lapses
     """
     
     STATUS_CHOICES = [
@@ -285,17 +386,21 @@ class Booking(models.Model):
         ('confirmed', 'Confirmed'),
         ('cancelled', 'Cancelled'),
         ('completed', 'Completed'),
+        ('expired', 'Expired'),
     ]
     
+    # Indexed through the composite indexes in Meta
     user = models.ForeignKey(
         User, 
         on_delete=models.CASCADE, 
-        related_name='bookings'
+        related_name='bookings',
+        db_index=False
     )
     show = models.ForeignKey(
         Show, 
         on_delete=models.CASCADE, 
-        related_name='bookings'
+        related_name='bookings',
+        db_index=False
     )
     booking_date = models.DateTimeField(auto_now_add=True)
     total_amount = models.DecimalField(
@@ -305,6 +410,7 @@ class Booking(models.Model):
     )
     status = models.CharField(max_length=15, choices=STATUS_CHOICES, default='pending')
     booking_reference = models.CharField(max_length=20, unique=True, blank=True)
+    hold_expires_at = models.DateTimeField(blank=True, null=True)
     notes = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -314,14 +420,33 @@ class Booking(models.Model):
         verbose_name = 'Booking'
         verbose_name_plural = 'Bookings'
         ordering = ['-booking_date']
+        indexes = [
+            # Customer booking history, optionally filtered by status
+            models.Index(fields=['user', 'status', '-booking_date'], name='bookings_user_status_date_idx'),
+            # Per-show counts by status (counter recompute)
+            models.Index(fields=['show', 'status'], name='bookings_show_status_idx'),
+            # Admin dashboard: today's and most recent bookings
+            models.Index(fields=['-booking_date'], name='bookings_date_idx'),
+            # Hold sweeper: only pending bookings carry a live expiry
+            models.Index(
+                fields=['hold_expires_at'],
+                condition=models.Q(status='pending'),
+                name='bookings_pending_expiry_idx',
+            ),
+        ]
     
     def __str__(self):
         return f"Booking {self.booking_reference} - {self.user.username}"
     
+    @staticmethod
+    def generate_reference():
+        """New random booking reference (also set by bulk inserts)"""
+        import uuid
+        return f"BK{uuid.uuid4().hex[:8].upper()}"
+    
     def save(self, *args, **kwargs):
         if not self.booking_reference:
-            import uuid
-            self.booking_reference = f"BK{uuid.uuid4().hex[:8].upper()}"
+            self.booking_reference = self.generate_reference()
         super().save(*args, **kwargs)
     
     def calculate_total(self):
@@ -333,6 +458,22 @@ class Booking(models.Model):
         return total
 
 
+class BookingSeatQuerySet(models.QuerySet):
+    """QuerySet helpers for booking seats"""
+    
+    def taken(self, now=None):
+        """
+        Seats that are out of sale: active rows, ignoring pending bookings
+        whose seat hold has lapsed but has not been swept yet.
+        """
+        from django.utils import timezone
+        now = now or timezone.now()
+        return self.filter(is_active=True).exclude(
+            booking__status='pending',
+            booking__hold_expires_at__lte=now
+        )
+
+
 class BookingSeat(models.Model):
     """
     BookingSeat Model (Junction Table)
@@ -340,31 +481,60 @@ class BookingSeat(models.Model):
     
     Attributes:
         booking: Foreign key to Booking
+        show: Foreign key to Show (copied from the booking)
         seat: Foreign key to Seat
         price: Price paid for this specific seat
+        is_active: Whether the seat is still taken by the booking
+    
+    A partial unique constraint on (show, seat) for active rows guarantees
+    that a seat can only be taken once per show, even under concurrent
+    bookings. Cancelling a booking deactivates its rows.
     """
     
+    # booking and seat are indexed through the composite indexes in Meta
     booking = models.ForeignKey(
         Booking, 
         on_delete=models.CASCADE, 
+        related_name='booking_seats',
+        db_index=False
+    )
+    show = models.ForeignKey(
+        Show,
+        on_delete=models.CASCADE,
         related_name='booking_seats'
     )
     seat = models.ForeignKey(
         Seat, 
         on_delete=models.CASCADE, 
-        related_name='booking_seats'
+        related_name='booking_seats',
+        db_index=False
     )
     price = models.DecimalField(
         max_digits=10, 
         decimal_places=2,
         validators=[MinValueValidator(Decimal('0.01'))]
     )
+    is_active = models.BooleanField(default=True)
+    
+    objects = BookingSeatQuerySet.as_manager()
     
     class Meta:
         db_table = 'booking_seats'
         verbose_name = 'Booking Seat'
         verbose_name_plural = 'Booking Seats'
         unique_together = ['booking', 'seat']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['show', 'seat'],
+                condition=models.Q(is_active=True),
+                name='unique_active_seat_per_show',
+            ),
+        ]
+        indexes = [
+            # Seat-side lookups (layout sync, seat deletion); the unique
+            # (booking, seat) index only serves booking-side lookups
+            models.Index(fields=['seat', 'booking'], name='booking_seats_seat_booking_idx'),
+        ]
     
     def __str__(self):
         return f"{self.booking.booking_reference} - {self.seat.seat_number}"
@@ -378,8 +548,10 @@ class Payment(models.Model):
     Attributes:
         booking: One-to-One relationship with Booking
         payment_method: Method of payment (Cash, Card, Mobile)
-        payment_status: Status of payment (Pending, Completed, Failed, Refunded)
+        payment_status: Status of payment (Pending, Processing, Completed, Failed,
+            Refund pending, Refunded)
         transaction_id: External transaction reference
+        failure_reason: Why the provider did not complete the payment
         amount: Payment amount
         payment_date: When payment was processed
     """
@@ -394,8 +566,10 @@ class Payment(models.Model):
     
     PAYMENT_STATUS_CHOICES = [
         ('pending', 'Pending'),
+        ('processing', 'Processing'),
         ('completed', 'Completed'),
         ('failed', 'Failed'),
+        ('refund_pending', 'Refund pending'),
         ('refunded', 'Refunded'),
     ]
     
@@ -411,6 +585,7 @@ class Payment(models.Model):
         default='pending'
     )
     transaction_id = models.CharField(max_length=100, blank=True, null=True)
+    failure_reason = models.CharField(max_length=255, blank=True, default='')
     amount = models.DecimalField(
         max_digits=10, 
         decimal_places=2,
@@ -425,15 +600,172 @@ class Payment(models.Model):
         verbose_name = 'Payment'
         verbose_name_plural = 'Payments'
         ordering = ['-created_at']
+        indexes = [
+            # Revenue reports only sum completed payments
+            models.Index(
+                fields=['payment_date'],
+                condition=models.Q(payment_status='completed'),
+                name='payments_completed_date_idx',
+            ),
+            # Keyset pagination of the payments list (api.pagination)
+            models.Index(fields=['-created_at', '-id'], name='payments_created_idx'),
+            # Payment workers: only payments in flight are queued (api.payments)
+            models.Index(
+                fields=['created_at', 'id'],
+                condition=models.Q(payment_status__in=['pending', 'processing']),
+                name='payments_queue_idx',
+            ),
+            # Charges waiting to be given back (api.payments)
+            models.Index(
+                fields=['updated_at'],
+                condition=models.Q(payment_status='refund_pending'),
+                name='payments_refund_queue_idx',
+            ),
+        ]
     
     def __str__(self):
         return f"Payment {self.id} - {self.booking.booking_reference} ({self.payment_status})"
     
     def save(self, *args, **kwargs):
-        if self.payment_status == 'completed' and not self.payment_date:
-            from django.utils import timezone
-            self.payment_date = timezone.now()
-            # Update booking status when payment is completed
-            self.booking.status = 'confirmed'
-            self.booking.save()
-        super().save(*args, **kwargs)
+        if not (self.payment_status == 'completed' and not self.payment_date):
+            return super().save(*args, **kwargs)
+        
+        from django.db import transaction
+        from django.utils import timezone
+        from .transitions import payment_completed
+        self.payment_date = timezone.now()
+        # Saved as completed directly: confirm the booking in the same
+        # transaction (the API goes through api.transitions instead)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            payment_completed(self)
+
+
+class SalesRollup(models.Model):
+    """
+    Sales Rollup Model
+    Booking and sales totals per theater and movie for one hour, one day
+    or all time, maintained incrementally by api.rollups.
+    
+    Attributes:
+        granularity: Bucket size (hour, day or total)
+        bucket: Start of the hour/day (local time); a fixed date for totals
+        theater: Theater the sales happened in
+        movie: Movie the sales were for
+        bookings: Bookings created
+        seats_sold: Seats of bookings whose payment completed
+        revenue: Completed payment amounts
+        refunds: Refunded payment amounts
+        refunded_seats: Seats of refunded bookings
+    """
+    
+    GRANULARITY_CHOICES = [
+        ('hour', 'Hour'),
+        ('day', 'Day'),
+        ('total', 'All time'),
+    ]
+    
+    granularity = models.CharField(max_length=5, choices=GRANULARITY_CHOICES)
+    bucket = models.DateTimeField()
+    theater = models.ForeignKey(
+        Theater,
+        on_delete=models.CASCADE,
+        related_name='sales_rollups'
+    )
+    movie = models.ForeignKey(
+        Movie,
+        on_delete=models.CASCADE,
+        related_name='sales_rollups'
+    )
+    bookings = models.PositiveIntegerField(default=0)
+    seats_sold = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    refunds = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    refunded_seats = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        db_table = 'sales_rollups'
+        verbose_name = 'Sales Rollup'
+        verbose_name_plural = 'Sales Rollups'
+        ordering = ['granularity', '-bucket']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['granularity', 'bucket', 'theater', 'movie'],
+                name='unique_sales_rollup_bucket',
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.granularity} {self.bucket:%Y-%m-%d %H:%M} - {self.theater_id}/{self.movie_id}"
+
+
+class CatalogTotal(models.Model):
+    """
+    Catalog Total Model
+    A row count shown on the admin dashboard, maintained incrementally by
+    api.rollups so the dashboard never counts whole tables.
+    
+    Attributes:
+        name: What is counted (customers, active movies, active theaters)
+        value: Current count
+    """
+    
+    NAME_CHOICES = [
+        ('customers', 'Customers'),
+        ('movies', 'Active movies'),
+        ('theaters', 'Active theaters'),
+    ]
+    
+    name = models.CharField(max_length=20, choices=NAME_CHOICES, primary_key=True)
+    value = models.IntegerField(default=0)
+    
+    class Meta:
+        db_table = 'catalog_totals'
+        verbose_name = 'Catalog Total'
+        verbose_name_plural = 'Catalog Totals'
+    
+    def __str__(self):
+        return f"{self.name}: {self.value}"
+
+
+class IdempotencyKey(models.Model):
+    """
+    Idempotency Key Model
+    The result of a POST sent with an ``Idempotency-Key`` header, replayed
+    when the client retries with the same key (see api.idempotency).
+    
+    Attributes:
+        user: User who sent the request; keys are unique per user
+        key: Client-chosen key from the Idempotency-Key header
+        scope: Endpoint the key was used on (e.g. bookings.create)
+        request_hash: Fingerprint of the endpoint and request body
+        response_status: HTTP status of the stored response
+        response_body: JSON body of the stored response
+        expires_at: When the key can be reused for a new request
+    """
+    
+    # Indexed through the unique constraint in Meta
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='idempotency_keys',
+        db_index=False
+    )
+    key = models.CharField(max_length=255)
+    scope = models.CharField(max_length=50)
+    request_hash = models.CharField(max_length=64)
+    response_status = models.PositiveSmallIntegerField(blank=True, null=True)
+    response_body = models.JSONField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+    
+    class Meta:
+        db_table = 'idempotency_keys'
+        verbose_name = 'Idempotency Key'
+        verbose_name_plural = 'Idempotency Keys'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='unique_idempotency_key_per_user'),
+        ]
+    
+    def __str__(self):
+        return f"{self.scope} {self.key} ({self.user_id})"
@@ -0,0 +1,283 @@
+"""
+Movie Ticket Booking System - Pagination
+
+DAR ES SALAAM INSTITUTE OF TECHNOLOGY
+MODULE CODE: COU 07503
+MODULE NAME: WEB APPLICATION DEVELOPMENT
+
+``DefaultPagination`` (settings.REST_FRAMEWORK) keeps the page-number
+responses the frontend uses: ``?page=N`` with count, next, previous and
+results. Views over large, append-mostly tables also offer keyset
+pagination on the ordering they declare as ``cursor_ordering``:
+
+    GET /api/bookings/?pagination=cursor     first page
+    GET /api/bookings/?cursor=<token>        the pages linked from it
+
+A keyset page seeks straight to its position through the ordering's index
+with ``WHERE (ordering columns) past the cursor ... LIMIT n``. Unlike
+OFFSET it costs the same on page 1 and page 10,000, and it runs no
+COUNT(*). The ordering must end in a unique column, and its columns must
+be non-null.
+
+``?count=approximate`` reports the planner's row estimate instead of an
+exact COUNT(*) (page-number mode), or adds it to keyset pages, which can
+also ask for ``?count=exact``. Page-number pages then read one row past
+the page to tell whether another follows, so the estimate never decides
+which rows are served.
+"""
+
+import base64
+import binascii
+import json
+from datetime import date, datetime, time
+from decimal import Decimal
+from functools import reduce
+from operator import or_
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger, Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def estimated_count(queryset):
+    """
+    Planner row estimate for a queryset, from EXPLAIN: no rows are scanned,
+    so it is cheap on any table size but only as good as the statistics.
+    """
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class EstimatedPage(Page):
+    """Page that knows from its extra row whether another page follows"""
+
+    def __init__(self, object_list, number, paginator, has_next):
+        super().__init__(object_list, number, paginator)
+        self.more = has_next
+
+    def has_next(self):
+        return self.more
+
+    def next_page_number(self):
+        return self.number + 1
+
+    def previous_page_number(self):
+        return self.number - 1
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Django paginator for ``?count=approximate``. A page is read as
+    ``per_page + 1`` rows at its offset, so the planner's estimate only
+    feeds ``count``: a low estimate never cuts a page short or hides the
+    pages after it.
+    """
+
+    @cached_property
+    def count(self):
+        return estimated_count(self.object_list)
+
+    def validate_number(self, number):
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger('That page number is not an integer')
+        if number < 1:
+            raise EmptyPage('That page number is less than 1')
+        return number
+
+    def page(self, number):
+        number = self.validate_number(number)
+        offset = (number - 1) * self.per_page
+        rows = list(self.object_list[offset:offset + self.per_page + 1])
+        if not rows and number > 1:
+            raise EmptyPage('That page contains no results')
+        return EstimatedPage(rows[:self.per_page], number, self, len(rows) > self.per_page)
+
+
+def _encode_value(value):
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+class KeysetPagination:
+    """
+    Cursor pagination over a composite ordering such as
+    ``('-booking_date', '-id')``.
+
+    The cursor holds the ordering values of the last row shown (or of the
+    first row, for a link backwards) and the direction.
+    """
+
+    cursor_query_param = 'cursor'
+
+    def __init__(self, ordering, page_size):
+        self.ordering = list(ordering)
+        self.page_size = page_size
+
+    def paginate_queryset(self, queryset, request):
+        self.request = request
+        self.base_url = remove_query_param(request.build_absolute_uri(), 'page')
+        position, self.reverse = self.decode_cursor(request)
+        if position is not None:
+            position = self.parse_position(queryset.model, position)
+        self.has_cursor = position is not None
+
+        ordering = self.ordering if not self.reverse else [_flip(field) for field in self.ordering]
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self.keyset_filter(ordering, position))
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if self.reverse:
+            rows.reverse()
+            self.has_next, self.has_previous = self.has_cursor, has_more
+        else:
+            self.has_next, self.has_previous = has_more, self.has_cursor
+        self.rows = rows
+        return rows
+
+    def keyset_filter(self, ordering, position):
+        """
+        Rows strictly after ``position`` in ``ordering``.
+
+        Expanded as (a > x) OR (a = x AND b > y) OR ..., with a redundant
+        range condition on the first column so the index scan starts at the
+        cursor rather than at the top of the index.
+        """
+        clauses, equal = [], {}
+        for field, value in zip(ordering, position):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            clauses.append(Q(**equal, **{f'{name}__{lookup}': value}))
+            equal[name] = value
+        first = ordering[0]
+        seek = Q(**{f"{first.lstrip('-')}__{'lte' if first.startswith('-') else 'gte'}": position[0]})
+        return seek & reduce(or_, clauses)
+
+    def decode_cursor(self, request):
+        """Returns (position or None, reverse) from the request's cursor"""
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None, False
+        try:
+            data = json.loads(base64.urlsafe_b64decode(token.encode('ascii')))
+            position, reverse = data['p'], bool(data.get('r'))
+        except (ValueError, KeyError, TypeError, binascii.Error, UnicodeEncodeError):
+            raise NotFound('Invalid cursor.')
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound('Invalid cursor.')
+        return position, reverse
+
+    def parse_position(self, model, position):
+        """
+        Convert the cursor's values with their ordering fields, so a
+        tampered cursor is a 404 rather than a database error.
+        """
+        values = []
+        for field, value in zip(self.ordering, position):
+            try:
+                value = model._meta.get_field(field.lstrip('-')).to_python(value)
+            except (ValidationError, TypeError, ValueError):
+                raise NotFound('Invalid cursor.')
+            if value is None:
+                # Ordering columns are non-null
+                raise NotFound('Invalid cursor.')
+            values.append(value)
+        return values
+
+    def encode_cursor(self, row, reverse):
+        position = [_encode_value(_row_value(row, field.lstrip('-'))) for field in self.ordering]
+        token = base64.urlsafe_b64encode(
+            json.dumps({'p': position, 'r': int(reverse)}, separators=(',', ':')).encode()
+        ).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, token)
+
+    def get_next_link(self):
+        if not self.has_next or not self.rows:
+            return None
+        return self.encode_cursor(self.rows[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.rows:
+            return None
+        return self.encode_cursor(self.rows[0], reverse=True)
+
+
+def _flip(field):
+    return field[1:] if field.startswith('-') else f'-{field}'
+
+
+def _row_value(row, name):
+    return row[name] if isinstance(row, dict) else getattr(row, name)
+
+
+class DefaultPagination(PageNumberPagination):
+    """
+    Page-number pagination with keyset mode for views that declare
+    ``cursor_ordering`` and approximate counts on request.
+    """
+
+    mode_query_param = 'pagination'
+    count_query_param = 'count'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        self.count_mode = request.query_params.get(self.count_query_param)
+        ordering = getattr(view, 'cursor_ordering', None)
+
+        if ordering and (
+            request.query_params.get(self.mode_query_param) == 'cursor'
+            or KeysetPagination.cursor_query_param in request.query_params
+        ):
+            self.keyset = KeysetPagination(ordering, self.get_page_size(request))
+            if self.count_mode == 'exact':
+                self.keyset_count = queryset.count()
+            elif self.count_mode == 'approximate':
+                self.keyset_count = estimated_count(queryset)
+            return self.keyset.paginate_queryset(queryset, request)
+
+        if self.count_mode == 'approximate':
+            self.django_paginator_class = EstimatedCountPaginator
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_page_metadata(self):
+        """Count and links of the current page, as in its response"""
+        if self.keyset is None:
+            return (self.page.paginator.count, self.get_next_link(), self.get_previous_link())
+        count = self.keyset_count if self.count_mode in ('exact', 'approximate') else None
+        return (count, self.keyset.get_next_link(), self.keyset.get_previous_link())
+
+    def get_paginated_response(self, data):
+        if self.keyset is None:
+            response = super().get_paginated_response(data)
+            if self.count_mode == 'approximate':
+                response.data['count_is_approximate'] = True
+            return response
+
+        payload = {
+            'next': self.keyset.get_next_link(),
+            'previous': self.keyset.get_previous_link(),
+            'results': data,
+        }
+        if self.count_mode in ('exact', 'approximate'):
+            payload = {'count': self.keyset_count, **payload}
+            if self.count_mode == 'approximate':
+                payload['count_is_approximate'] = True
+        return Response(payload)
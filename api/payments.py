@@ -0,0 +1,415 @@
+"""
+Movie Ticket Booking System - Payment Pipeline
+
+DAR ES SALAAM INSTITUTE OF TECHNOLOGY
+MODULE CODE: COU 07503
+MODULE NAME: WEB APPLICATION DEVELOPMENT
+
+Talking to a payment provider can take seconds, so checkout does not wait
+for it. ``POST /api/payments/process/`` only accepts the payment:
+
+1. ``accept_payment`` stores it as ``pending`` and, once the transaction
+   commits, hands its ID to the payment queue.
+2. A worker claims the payment (``pending`` -> ``processing``) with a
+   single UPDATE, so each payment is charged by one worker only, and calls
+   the gateway outside of any transaction.
+3. ``finish_payment`` commits the gateway's answer: ``completed`` confirms
+   the booking (api.transitions), ``failed`` leaves it pending until its
+   hold lapses. If the booking expired or was cancelled meanwhile, the
+   payment is recorded as ``refund_pending`` and the charge is given back
+   after the commit, again outside of any transaction.
+
+Accepting, claiming and requeueing a payment each push the booking's hold
+to two processing timeouts ahead, past the point where a stuck payment is
+requeued, so the hold cannot lapse while the payment is in flight.
+
+Clients follow the payment at ``GET /api/payments/{id}/status/`` or as
+Server-Sent Events from ``GET /api/payments/{id}/status/stream/``.
+
+The payments table is the queue of record; settings.PAYMENT_QUEUE picks
+how workers learn about new payments:
+
+- ``local``: a thread in the accepting process works through them. The
+  offline stand-in for development and single-process deployments.
+- ``database``: ``python manage.py process_payments --loop`` workers poll
+  for pending payments, skipping rows other workers hold.
+
+Payments stuck in ``processing`` for settings.PAYMENT_PROCESSING_TIMEOUT
+(a worker died mid-charge) are returned to ``pending`` and retried, and
+refunds left ``refund_pending`` that long are attempted again. The
+gateway is settings.PAYMENT_GATEWAY; ``DemoGateway`` approves every charge
+without leaving the machine.
+"""
+
+import copy
+import logging
+import queue
+import threading
+import time
+from typing import NamedTuple
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Booking, Payment
+
+
+logger = logging.getLogger('api.payments')
+
+# Statuses after which a payment no longer changes on its own
+FINAL_STATUSES = ['completed', 'failed', 'refunded']
+
+# Statuses of a payment that must not be accepted again
+ACTIVE_STATUSES = ['pending', 'processing', 'completed', 'refund_pending']
+
+# Statuses of a payment whose charge has not been answered yet
+IN_FLIGHT_STATUSES = ['pending', 'processing']
+
+# Statuses of a payment that already holds an approved charge
+CHARGED_STATUSES = ['completed', 'refund_pending', 'refunded']
+
+
+# ==================== GATEWAYS ====================
+
+class GatewayResult(NamedTuple):
+    approved: bool
+    transaction_id: str = ''
+    message: str = ''
+
+
+class DemoGateway:
+    """
+    Offline stand-in for a payment provider: approves every charge after
+    settings.PAYMENT_DEMO_GATEWAY_DELAY seconds.
+    """
+
+    def charge(self, payment):
+        time.sleep(settings.PAYMENT_DEMO_GATEWAY_DELAY)
+        return GatewayResult(True, payment.transaction_id or f'DEMO-{payment.pk}')
+
+    def refund(self, payment):
+        return GatewayResult(True, payment.transaction_id)
+
+
+def get_gateway():
+    return import_string(settings.PAYMENT_GATEWAY)()
+
+
+# ==================== QUEUES ====================
+
+class LocalPaymentQueue:
+    """In-process stand-in for a job queue, drained by one daemon thread"""
+
+    def __init__(self):
+        self.jobs = queue.Queue()
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def enqueue(self, payment_id):
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self.run, name='payment-worker', daemon=True)
+                self.thread.start()
+        self.jobs.put(payment_id)
+
+    def run(self):
+        while True:
+            payment_id = self.jobs.get()
+            try:
+                process_payment(payment_id)
+            except Exception:
+                logger.exception('Payment %s could not be processed', payment_id)
+            finally:
+                close_old_connections()
+
+
+class DatabasePaymentQueue:
+    """Pending payments are picked up by ``manage.py process_payments`` workers"""
+
+    def enqueue(self, payment_id):
+        pass
+
+
+QUEUES = {'local': LocalPaymentQueue, 'database': DatabasePaymentQueue}
+_queue = None
+
+
+def get_queue():
+    global _queue
+    if _queue is None or not isinstance(_queue, QUEUES[settings.PAYMENT_QUEUE]):
+        _queue = QUEUES[settings.PAYMENT_QUEUE]()
+    return _queue
+
+
+# ==================== PIPELINE ====================
+
+class PaymentNotAcceptable(Exception):
+    """The booking can no longer be paid for"""
+
+
+def payment_hold_expiry(now=None):
+    """
+    Hold expiry for a booking whose payment is in flight: a processing
+    payment is requeued after one timeout, which extends the hold again.
+    """
+    return (now or timezone.now()) + 2 * settings.PAYMENT_PROCESSING_TIMEOUT
+
+
+def keep_holds_alive(payments, now=None):
+    """
+    Extend the holds of the pending bookings of ``payments`` to
+    ``payment_hold_expiry``. Lapsed holds are left alone: their seats may
+    already be booked again. A single UPDATE of the bookings table.
+    """
+    now = now or timezone.now()
+    return Booking.objects.filter(
+        pk__in=payments.values('booking_id'), status='pending', hold_expires_at__gt=now
+    ).update(hold_expires_at=Greatest(F('hold_expires_at'), Value(payment_hold_expiry(now))))
+
+
+def accept_payment(booking_id, payment_method, transaction_id=''):
+    """
+    Store a pending payment for a booking and queue it once the current
+    transaction commits.
+
+    Raises:
+        PaymentNotAcceptable: the booking's hold lapsed, it is not pending
+            or its payment is already pending, processing or completed
+
+    Returns:
+        The pending Payment
+    """
+    # Imported here: api.holds -> api.streams imports this module
+    from .holds import is_hold_expired
+
+    now = timezone.now()
+    with transaction.atomic():
+        # Lock the booking so the hold sweeper cannot expire it meanwhile
+        booking = Booking.objects.select_for_update().get(pk=booking_id)
+        if booking.status == 'expired' or is_hold_expired(booking, now):
+            raise PaymentNotAcceptable("Seat hold has expired. Please book again.")
+        if booking.status != 'pending':
+            raise PaymentNotAcceptable(f"Booking is already {booking.status}.")
+
+        # Keep the seats held while the payment is in flight
+        hold_until = payment_hold_expiry(now)
+        if booking.hold_expires_at is None or booking.hold_expires_at < hold_until:
+            booking.hold_expires_at = hold_until
+            booking.save(update_fields=['hold_expires_at', 'updated_at'])
+
+        # Checked again under the locks: a concurrent request may have
+        # accepted a payment since the serializer looked
+        payment = Payment.objects.select_for_update().filter(booking=booking).first()
+        if payment is not None and payment.payment_status in ACTIVE_STATUSES:
+            raise PaymentNotAcceptable(
+                "Payment has already been completed." if payment.payment_status == 'completed'
+                else "Payment is already being processed."
+            )
+        payment = payment or Payment(booking=booking)
+        payment.payment_method = payment_method
+        payment.transaction_id = transaction_id
+        payment.amount = booking.total_amount
+        payment.payment_status = 'pending'
+        payment.failure_reason = ''
+        payment.save()
+        transaction.on_commit(lambda: get_queue().enqueue(payment.pk))
+    return payment
+
+
+def process_payment(payment_id, gateway=None):
+    """
+    Claim one pending payment (pending -> processing), charge it and
+    commit the result.
+
+    Returns:
+        True if this call processed the payment, False if it was not
+        pending (another worker has it)
+    """
+    claimed = Payment.objects.filter(pk=payment_id, payment_status='pending').update(
+        payment_status='processing', updated_at=timezone.now()
+    )
+    if not claimed:
+        return False
+    keep_holds_alive(Payment.objects.filter(pk=payment_id))
+    charge_payment(payment_id, gateway or get_gateway())
+    return True
+
+
+def charge_payment(payment_id, gateway):
+    """Charge a claimed payment through the gateway, outside any transaction"""
+    payment = Payment.objects.get(pk=payment_id)
+    try:
+        result = gateway.charge(payment)
+    except Exception as error:
+        logger.exception('Gateway error for payment %s', payment_id)
+        result = GatewayResult(False, message=f'Payment provider error: {error}')
+    return finish_payment(payment_id, result, gateway)
+
+
+def finish_payment(payment_id, result, gateway):
+    """
+    Commit a gateway result for a payment in flight. A charge that can no
+    longer be used is recorded as refund_pending and refunded once the
+    transaction has committed.
+    """
+    # Imported here: api.holds -> api.streams imports this module
+    from .holds import is_hold_expired
+    from .transitions import confirm_bookings
+
+    with transaction.atomic():
+        # Locks the booking row as well
+        payment = Payment.objects.select_related('booking').select_for_update().get(pk=payment_id)
+        booking = payment.booking
+        # A payment requeued while the gateway was slow is pending again;
+        # its answer still stands, so it is not charged a second time
+        if payment.payment_status not in IN_FLIGHT_STATUSES:
+            if not result.approved:
+                return payment
+            if payment.payment_status in CHARGED_STATUSES:
+                # A requeued retry of this charge was answered first
+                if result.transaction_id and result.transaction_id != payment.transaction_id:
+                    duplicate = copy.copy(payment)
+                    duplicate.transaction_id = result.transaction_id
+                    transaction.on_commit(lambda: _refund_duplicate(duplicate, gateway))
+                return payment
+            # The booking was cancelled while the charge was in flight
+            _record_refund(payment, result, payment.failure_reason, gateway)
+            return payment
+
+        if result.transaction_id:
+            payment.transaction_id = result.transaction_id
+        if result.approved and (booking.status != 'pending' or is_hold_expired(booking)):
+            # Paid too late: give the money back
+            _record_refund(payment, result, f'Booking is {booking.status}; the charge was refunded.', gateway)
+            return payment
+        if not result.approved:
+            payment.payment_status = 'failed'
+            payment.failure_reason = result.message or 'The payment was declined.'
+            payment.save()
+            return payment
+
+        # Completes the payment, confirms the booking, counts the sale
+        payment.save()
+        confirm_bookings(Booking.objects.filter(pk=booking.pk))
+        payment.refresh_from_db()
+    return payment
+
+
+def _record_refund(payment, result, reason, gateway):
+    if result.transaction_id:
+        payment.transaction_id = result.transaction_id
+    payment.payment_status = 'refund_pending'
+    payment.failure_reason = reason
+    payment.save()
+    transaction.on_commit(lambda: refund_charge(payment.pk, gateway))
+
+
+def _refund_duplicate(payment, gateway):
+    """Refund a second charge of a payment that already holds one"""
+    try:
+        result = gateway.refund(payment)
+    except Exception:
+        logger.exception('Gateway error refunding duplicate charge %s', payment.transaction_id)
+        return
+    if not result.approved:
+        logger.error('Refund of duplicate charge %s was declined: %s', payment.transaction_id, result.message)
+
+
+def refund_charge(payment_id, gateway=None):
+    """
+    Give back the charge of a refund_pending payment through the gateway,
+    outside any transaction; the payment then ends as failed. On a gateway
+    error it stays refund_pending and ``retry_refunds`` tries again.
+
+    Returns:
+        True if the charge was refunded
+    """
+    payment = Payment.objects.get(pk=payment_id)
+    try:
+        result = (gateway or get_gateway()).refund(payment)
+    except Exception:
+        logger.exception('Gateway error refunding payment %s', payment_id)
+        return False
+    if not result.approved:
+        logger.error('Refund of payment %s was declined: %s', payment_id, result.message)
+        return False
+    return bool(Payment.objects.filter(pk=payment_id, payment_status='refund_pending').update(
+        payment_status='failed', updated_at=timezone.now()
+    ))
+
+
+def retry_refunds(now=None, batch_size=50, gateway=None):
+    """
+    Refund payments left refund_pending for PAYMENT_PROCESSING_TIMEOUT
+    (the gateway failed or the worker died). Each is claimed by bumping
+    its updated_at, so only one worker retries it at a time.
+
+    Returns:
+        Number of charges refunded
+    """
+    now = now or timezone.now()
+    stale = Payment.objects.filter(
+        payment_status='refund_pending',
+        updated_at__lte=now - settings.PAYMENT_PROCESSING_TIMEOUT,
+    )
+    refunded = 0
+    for payment_id in stale.order_by('updated_at').values_list('id', flat=True)[:batch_size]:
+        if stale.filter(pk=payment_id).update(updated_at=now):
+            refunded += refund_charge(payment_id, gateway)
+    return refunded
+
+
+def requeue_stale_payments(now=None):
+    """Return payments whose worker died mid-charge to pending"""
+    now = now or timezone.now()
+    stale = Payment.objects.filter(
+        payment_status='processing',
+        updated_at__lte=now - settings.PAYMENT_PROCESSING_TIMEOUT,
+    )
+    keep_holds_alive(stale, now)
+    return stale.update(payment_status='pending', updated_at=now)
+
+
+def process_pending_payments(batch_size=50, gateway=None):
+    """
+    Claim up to ``batch_size`` pending payments, oldest first, in one
+    UPDATE (skipping rows other workers are claiming) and charge them.
+
+    Returns:
+        Number of payments processed
+    """
+    gateway = gateway or get_gateway()
+    requeue_stale_payments()
+    retry_refunds(batch_size=batch_size, gateway=gateway)
+    with transaction.atomic():
+        payment_ids = list(
+            Payment.objects.filter(payment_status='pending')
+            .select_for_update(skip_locked=True)
+            .order_by('created_at', 'id')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        Payment.objects.filter(pk__in=payment_ids).update(
+            payment_status='processing', updated_at=timezone.now()
+        )
+    keep_holds_alive(Payment.objects.filter(pk__in=payment_ids))
+
+    for payment_id in payment_ids:
+        charge_payment(payment_id, gateway)
+    return len(payment_ids)
+
+
+def payment_state(payment):
+    """Status payload for polling and streaming clients"""
+    return {
+        'id': payment.pk,
+        'booking': payment.booking_id,
+        'payment_status': payment.payment_status,
+        'failure_reason': payment.failure_reason,
+        'transaction_id': payment.transaction_id,
+        'payment_date': payment.payment_date.isoformat() if payment.payment_date else None,
+        'final': payment.payment_status in FINAL_STATUSES,
+    }
@@ -0,0 +1,324 @@
+"""
+Movie Ticket Booking System - Sales Rollups
+
+DAR ES SALAAM INSTITUTE OF TECHNOLOGY
+MODULE CODE: COU 07503
+MODULE NAME: WEB APPLICATION DEVELOPMENT
+
+The admin dashboard reads pre-aggregated SalesRollup rows instead of
+counting and summing the bookings and payments tables.
+
+Booking and payment transitions call ``record_booking``, ``record_sales``
+and ``record_refunds`` inside their transaction. Each call is a single
+INSERT ... ON CONFLICT DO UPDATE that adds the change to the hour, day and
+all-time rows of the shows' theaters and movies, for one booking or for
+thousands at once. Buckets follow the current time zone, like the
+TruncHour/TruncDay lookups ``rebuild_sales_rollups`` uses to recompute
+every row from the source tables.
+
+The customer, active movie and active theater counts the dashboard shows
+are kept the same way in CatalogTotal rows: save and delete signals of
+User, Movie and Theater (connected in ``ApiConfig.ready``) add the change
+in one upsert. Bulk writes that bypass signals call
+``adjust_catalog_total``; ``rebuild_catalog_totals`` recounts the tables.
+"""
+
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+
+from .models import User, Movie, Theater, Show, Booking, BookingSeat, Payment, SalesRollup, CatalogTotal
+
+
+# Bucket of the all-time rows
+TOTAL_BUCKET = datetime(2000, 1, 1, tzinfo=dt_timezone.utc)
+
+MEASURES = ['bookings', 'seats_sold', 'revenue', 'refunds', 'refunded_seats']
+
+_UPSERT_SQL = f"""
+    INSERT INTO {SalesRollup._meta.db_table}
+        (granularity, bucket, theater_id, movie_id, bookings, seats_sold, revenue, refunds, refunded_seats)
+    SELECT b.granularity, b.bucket, s.theater_id, s.movie_id, %(bookings)s,
+           seats.n * %(sold)s, %(revenue)s, %(refunds)s, seats.n * %(refunded)s
+    FROM {Booking._meta.db_table} bk
+    JOIN {Show._meta.db_table} s ON s.id = bk.show_id
+    CROSS JOIN (
+        SELECT COUNT(*) AS n FROM {BookingSeat._meta.db_table} WHERE booking_id = %(booking_id)s
+    ) seats
+    CROSS JOIN (VALUES
+        ('hour', %(hour)s), ('day', %(day)s), ('total', %(total)s)
+    ) AS b(granularity, bucket)
+    WHERE bk.id = %(booking_id)s
+    ON CONFLICT (granularity, bucket, theater_id, movie_id) DO UPDATE SET
+        bookings = {SalesRollup._meta.db_table}.bookings + EXCLUDED.bookings,
+        seats_sold = {SalesRollup._meta.db_table}.seats_sold + EXCLUDED.seats_sold,
+        revenue = {SalesRollup._meta.db_table}.revenue + EXCLUDED.revenue,
+        refunds = {SalesRollup._meta.db_table}.refunds + EXCLUDED.refunds,
+        refunded_seats = {SalesRollup._meta.db_table}.refunded_seats + EXCLUDED.refunded_seats
+"""
+
+# Sales and refunds of many bookings at once, from the amounts of their
+# completed payments
+_PAYMENTS_UPSERT_SQL = f"""
+    INSERT INTO {SalesRollup._meta.db_table}
+        (granularity, bucket, theater_id, movie_id, bookings, seats_sold, revenue, refunds, refunded_seats)
+    SELECT b.granularity, b.bucket, s.theater_id, s.movie_id, 0,
+           SUM(seats.n) * %(sold)s, SUM(p.amount) * %(sold)s,
+           SUM(p.amount) * %(refunded)s, SUM(seats.n) * %(refunded)s
+    FROM {Payment._meta.db_table} p
+    JOIN {Booking._meta.db_table} bk ON bk.id = p.booking_id
+    JOIN {Show._meta.db_table} s ON s.id = bk.show_id
+    CROSS JOIN LATERAL (
+        SELECT COUNT(*) AS n FROM {BookingSeat._meta.db_table} WHERE booking_id = bk.id
+    ) seats
+    CROSS JOIN (VALUES
+        ('hour', %(hour)s), ('day', %(day)s), ('total', %(total)s)
+    ) AS b(granularity, bucket)
+    WHERE p.booking_id = ANY(%(booking_ids)s) AND p.payment_status = 'completed'
+    GROUP BY b.granularity, b.bucket, s.theater_id, s.movie_id
+    ON CONFLICT (granularity, bucket, theater_id, movie_id) DO UPDATE SET
+        seats_sold = {SalesRollup._meta.db_table}.seats_sold + EXCLUDED.seats_sold,
+        revenue = {SalesRollup._meta.db_table}.revenue + EXCLUDED.revenue,
+        refunds = {SalesRollup._meta.db_table}.refunds + EXCLUDED.refunds,
+        refunded_seats = {SalesRollup._meta.db_table}.refunded_seats + EXCLUDED.refunded_seats
+"""
+
+
+def rollup_buckets(when):
+    """Returns the (granularity, bucket) pairs a moment is counted in"""
+    hour = timezone.localtime(when).replace(minute=0, second=0, microsecond=0)
+    day = hour.replace(hour=0)
+    return [('hour', hour), ('day', day), ('total', TOTAL_BUCKET)]
+
+
+def _record(booking_id, when, bookings=0, sold=0, revenue=0, refunded=0, refunds=0):
+    """
+    Add a change to the rollup rows of a booking's theater and movie.
+    ``sold`` / ``refunded`` are 0 or 1: whether to add the booking's seat
+    count to seats_sold / refunded_seats.
+    """
+    buckets = dict(rollup_buckets(when))
+    with connection.cursor() as cursor:
+        cursor.execute(_UPSERT_SQL, {
+            'booking_id': booking_id,
+            'bookings': bookings,
+            'sold': sold,
+            'revenue': Decimal(revenue),
+            'refunded': refunded,
+            'refunds': Decimal(refunds),
+            'hour': buckets['hour'],
+            'day': buckets['day'],
+            'total': buckets['total'],
+        })
+
+
+def record_booking(booking):
+    """Count a newly created booking"""
+    _record(booking.pk, booking.booking_date, bookings=1)
+
+
+def _record_payments(booking_ids, when, sold=0, refunded=0):
+    booking_ids = list(booking_ids)
+    if not booking_ids:
+        return
+    buckets = dict(rollup_buckets(when))
+    with connection.cursor() as cursor:
+        cursor.execute(_PAYMENTS_UPSERT_SQL, {
+            'booking_ids': booking_ids,
+            'sold': sold,
+            'refunded': refunded,
+            'hour': buckets['hour'],
+            'day': buckets['day'],
+            'total': buckets['total'],
+        })
+
+
+def record_sales(booking_ids, when):
+    """Count the completed payments of bookings: their amounts and seats.
+    Call once the payments are completed."""
+    _record_payments(booking_ids, when, sold=1)
+
+
+def record_refunds(booking_ids, when):
+    """Count the refunds of bookings' completed payments. Call before the
+    payments are marked refunded."""
+    _record_payments(booking_ids, when, refunded=1)
+
+
+def sales_summary(now=None):
+    """
+    Dashboard sales figures read from the rollups.
+
+    Returns:
+        dict with today's and all-time measures and today's hourly series
+    """
+    now = now or timezone.now()
+    buckets = dict(rollup_buckets(now))
+    day_start = buckets['day']
+    sums = {measure: Sum(measure) for measure in MEASURES}
+
+    totals = {
+        row.pop('granularity'): row
+        for row in SalesRollup.objects.filter(
+            Q(granularity='day', bucket=day_start) | Q(granularity='total', bucket=TOTAL_BUCKET)
+        ).values('granularity').annotate(**sums).order_by()
+    }
+    hourly = list(
+        SalesRollup.objects.filter(
+            granularity='hour', bucket__gte=day_start, bucket__lt=day_start + timedelta(days=1)
+        ).values('bucket').annotate(**sums).order_by('bucket')
+    )
+
+    empty = {measure: 0 for measure in MEASURES}
+    return {
+        'today': totals.get('day', empty),
+        'total': totals.get('total', empty),
+        'today_by_hour': hourly,
+    }
+
+
+def rebuild_sales_rollups():
+    """
+    Recompute every rollup row from bookings and payments.
+
+    The table is locked against concurrent rollup updates before anything
+    is read, so transitions committed during the rebuild are neither lost
+    nor counted twice. Refunds are dated by the payment's last update.
+
+    Returns:
+        Number of rollup rows written
+    """
+    completed = {'payment_date__isnull': False, 'payment_status__in': ['completed', 'refunded']}
+    refunded = {'payment_date__isnull': False, 'payment_status': 'refunded'}
+
+    sources = [
+        # (rows grouped by theater/movie/hour, measure, aggregate)
+        (Booking.objects.values(
+            theater=F('show__theater'), movie=F('show__movie'), hour=TruncHour('booking_date')
+        ), 'bookings', Count('id')),
+        (Payment.objects.filter(**completed).values(
+            theater=F('booking__show__theater'), movie=F('booking__show__movie'),
+            hour=TruncHour('payment_date')
+        ), 'revenue', Sum('amount')),
+        (BookingSeat.objects.filter(**_via_payment(completed)).values(
+            theater=F('show__theater'), movie=F('show__movie'),
+            hour=TruncHour('booking__payment__payment_date')
+        ), 'seats_sold', Count('id')),
+        (Payment.objects.filter(**refunded).values(
+            theater=F('booking__show__theater'), movie=F('booking__show__movie'),
+            hour=TruncHour('updated_at')
+        ), 'refunds', Sum('amount')),
+        (BookingSeat.objects.filter(**_via_payment(refunded)).values(
+            theater=F('show__theater'), movie=F('show__movie'),
+            hour=TruncHour('booking__payment__updated_at')
+        ), 'refunded_seats', Count('id')),
+    ]
+
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(f'LOCK TABLE {SalesRollup._meta.db_table} IN SHARE ROW EXCLUSIVE MODE')
+        SalesRollup.objects.all().delete()
+
+        rows = {}
+        for queryset, measure, aggregate in sources:
+            for group in queryset.annotate(value=aggregate).order_by():
+                for granularity, bucket in rollup_buckets(group['hour']):
+                    key = (granularity, bucket, group['theater'], group['movie'])
+                    row = rows.setdefault(key, SalesRollup(
+                        granularity=granularity, bucket=bucket,
+                        theater_id=group['theater'], movie_id=group['movie'],
+                    ))
+                    setattr(row, measure, getattr(row, measure) + group['value'])
+
+        SalesRollup.objects.bulk_create(rows.values(), batch_size=1000)
+    return len(rows)
+
+
+def _via_payment(lookups):
+    """Payment lookups rewritten for a BookingSeat queryset"""
+    return {f'booking__payment__{lookup}': value for lookup, value in lookups.items()}
+
+
+# ==================== CATALOG TOTALS ====================
+
+# CatalogTotal name -> (model, field values of a counted row)
+CATALOG_TOTALS = {
+    'customers': (User, {'role': 'customer'}),
+    'movies': (Movie, {'is_active': True}),
+    'theaters': (Theater, {'is_active': True}),
+}
+
+_TOTAL_UPSERT_SQL = f"""
+    INSERT INTO {CatalogTotal._meta.db_table} (name, value) VALUES (%(name)s, %(delta)s)
+    ON CONFLICT (name) DO UPDATE SET value = {CatalogTotal._meta.db_table}.value + EXCLUDED.value
+"""
+
+
+def adjust_catalog_total(name, delta):
+    """Add ``delta`` to a catalog total, e.g. after a bulk_create"""
+    if delta:
+        with connection.cursor() as cursor:
+            cursor.execute(_TOTAL_UPSERT_SQL, {'name': name, 'delta': delta})
+
+
+def catalog_totals():
+    """Returns every catalog total by name, read from CatalogTotal rows"""
+    values = dict(CatalogTotal.objects.values_list('name', 'value'))
+    return {name: values.get(name, 0) for name in CATALOG_TOTALS}
+
+
+def rebuild_catalog_totals():
+    """
+    Recount every catalog total from its table, locked against concurrent
+    updates like ``rebuild_sales_rollups``.
+    """
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(f'LOCK TABLE {CatalogTotal._meta.db_table} IN SHARE ROW EXCLUSIVE MODE')
+        for name, (model, lookups) in CATALOG_TOTALS.items():
+            CatalogTotal.objects.update_or_create(
+                name=name, defaults={'value': model.objects.filter(**lookups).count()}
+            )
+
+
+def _counted(instance, lookups):
+    return all(getattr(instance, field) == value for field, value in lookups.items())
+
+
+def _catalog_receivers(name, lookups):
+    def saving(sender, instance, update_fields=None, **kwargs):
+        # Whether the stored row was counted; None when the save leaves the
+        # counted fields alone (e.g. last_login updates)
+        if instance._state.adding:
+            instance._catalog_counted = False
+        elif update_fields is not None and not set(lookups) & set(update_fields):
+            instance._catalog_counted = None
+        else:
+            instance._catalog_counted = sender._base_manager.filter(pk=instance.pk, **lookups).exists()
+
+    def saved(sender, instance, **kwargs):
+        before = instance.__dict__.pop('_catalog_counted', None)
+        if before is not None:
+            adjust_catalog_total(name, int(_counted(instance, lookups)) - int(before))
+
+    def deleted(sender, instance, **kwargs):
+        if _counted(instance, lookups):
+            adjust_catalog_total(name, -1)
+
+    return saving, saved, deleted
+
+
+def connect_signals():
+    """Connect the catalog total receivers; called from ApiConfig.ready()"""
+    from django.db.models.signals import post_delete, post_save, pre_save
+
+    for name, (model, lookups) in CATALOG_TOTALS.items():
+        saving, saved, deleted = _catalog_receivers(name, lookups)
+        uid = f'catalog-total-{name}'
+        pre_save.connect(saving, sender=model, weak=False, dispatch_uid=f'{uid}-pre-save')
+        post_save.connect(saved, sender=model, weak=False, dispatch_uid=f'{uid}-save')
+        post_delete.connect(deleted, sender=model, weak=False, dispatch_uid=f'{uid}-delete')
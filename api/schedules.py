@@ -0,0 +1,136 @@
+"""
+Movie Ticket Booking System - Recurring Show Schedules
+
+DAR ES SALAAM INSTITUTE OF TECHNOLOGY
+MODULE CODE: COU 07503
+MODULE NAME: WEB APPLICATION DEVELOPMENT
+
+Creates a run of showtimes from one recurrence rule: a movie, the
+theaters showing it, a date range, the start times of each day and the
+weekdays it plays, priced from a base price with a weekend uplift.
+
+``create_schedule`` checks every planned slot against the shows table
+with one query (a slot is taken when its theater already has a show at
+that date and time, as enforced by the unique index), inserts the free
+slots with one bulk INSERT and initializes their seat counters with one
+UPDATE. Taken slots are reported back instead of failing the whole run.
+Bulk inserts send no signals, so the catalog cache is invalidated here.
+"""
+
+from datetime import timedelta
+from decimal import Decimal
+from typing import NamedTuple
+
+from django.db import IntegrityError, transaction
+
+from .catalog_cache import invalidate
+from .inventory import recompute_show_counters
+from .models import Show
+
+
+# Days priced with the weekend multiplier (Saturday, Sunday)
+WEEKEND_DAYS = {5, 6}
+
+
+class Schedule(NamedTuple):
+    shows: list
+    conflicts: list
+
+
+def show_price(base_price, show_date, weekend_multiplier=Decimal('1')):
+    """Base price with the weekend uplift applied on weekends"""
+    if show_date.weekday() in WEEKEND_DAYS:
+        return (base_price * weekend_multiplier).quantize(Decimal('0.01'))
+    return base_price
+
+
+def plan_shows(movie, theaters, date_from, date_to, times, base_price,
+               weekend_multiplier=Decimal('1'), weekdays=None):
+    """
+    Unsaved Show instances for every theater, date and time of a rule.
+
+    Args:
+        movie: Movie shown
+        theaters: Theaters showing it
+        date_from, date_to: First and last show date (inclusive)
+        times: Start times of each day
+        base_price: Weekday base price
+        weekend_multiplier: Applied to the base price on weekends
+        weekdays: Weekdays it plays (0 = Monday); every day when None
+    """
+    shows = []
+    show_date = date_from
+    while show_date <= date_to:
+        if weekdays is None or show_date.weekday() in weekdays:
+            price = show_price(base_price, show_date, weekend_multiplier)
+            for theater in theaters:
+                for show_time in sorted(set(times)):
+                    shows.append(Show(
+                        movie=movie, theater=theater, show_date=show_date,
+                        show_time=show_time, base_price=price,
+                    ))
+        show_date += timedelta(days=1)
+    return shows
+
+
+def find_taken_slots(shows):
+    """
+    Existing shows in the slots of planned shows, read with one query.
+
+    Returns:
+        {(theater_id, show_date, show_time): (show_id, movie_title)}
+    """
+    if not shows:
+        return {}
+    taken = Show.objects.filter(
+        theater_id__in={show.theater_id for show in shows},
+        show_date__gte=min(show.show_date for show in shows),
+        show_date__lte=max(show.show_date for show in shows),
+        show_time__in={show.show_time for show in shows},
+    ).values_list('theater_id', 'show_date', 'show_time', 'pk', 'movie__title')
+    return {
+        (theater_id, show_date, show_time): (pk, title)
+        for theater_id, show_date, show_time, pk, title in taken
+    }
+
+
+def create_schedule(shows, dry_run=False):
+    """
+    Insert planned shows (see plan_shows), skipping taken slots.
+
+    Args:
+        shows: Unsaved Show instances
+        dry_run: Only check the slots
+
+    Returns:
+        Schedule of the created (or, on a dry run, creatable) shows and
+        a conflict dict per taken slot
+    """
+    for attempt in range(2):
+        try:
+            with transaction.atomic():
+                taken = find_taken_slots(shows)
+                free = [show for show in shows if _slot(show) not in taken]
+                conflicts = [
+                    {
+                        'theater': show.theater_id,
+                        'show_date': show.show_date,
+                        'show_time': show.show_time,
+                        'conflicting_show': taken[_slot(show)][0],
+                        'conflicting_movie': taken[_slot(show)][1],
+                    }
+                    for show in shows if _slot(show) in taken
+                ]
+                if free and not dry_run:
+                    Show.objects.bulk_create(free)
+                    recompute_show_counters(Show.objects.filter(pk__in=[show.pk for show in free]))
+                    invalidate('shows')
+            return Schedule(free, conflicts)
+        except IntegrityError:
+            # A slot was taken after the check: check again once
+            if attempt:
+                raise
+
+
+def _slot(show):
+    return show.theater_id, show.show_date, show.show_time
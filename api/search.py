@@ -0,0 +1,81 @@
+"""
+Movie Ticket Booking System - Movie Search
+
+DAR ES SALAAM INSTITUTE OF TECHNOLOGY
+MODULE CODE: COU 07503
+MODULE NAME: WEB APPLICATION DEVELOPMENT
+
+``?search=`` on the movie list and the autocomplete endpoint match movies
+in two ways, each served by a GIN index on the movies table:
+
+- Full text: ``Movie.search_vector`` is a stored generated column, so the
+  database keeps it current on every write. It weights title over genre
+  over description over language and uses English stemming. Every typed
+  word is matched as a prefix ("inter" finds "Interstellar").
+- Trigrams: the pg_trgm word-similarity operator on the title tolerates
+  typos ("avengrs" finds "Avengers").
+
+Matches are ranked by full-text rank plus title similarity.
+"""
+
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramWordSimilarity
+from django.db.models import F, Q
+
+
+SEARCH_CONFIG = 'english'
+
+# Words of a query that are used; the rest is ignored
+MAX_SEARCH_WORDS = 8
+
+AUTOCOMPLETE_MIN_LENGTH = 2
+AUTOCOMPLETE_LIMIT = 8
+
+WORD_RE = re.compile(r'\w+')
+
+
+def prefix_search_query(text):
+    """
+    Build a full-text query matching every word of ``text`` as a prefix.
+
+    Returns:
+        SearchQuery, or None when the text has no words
+    """
+    words = WORD_RE.findall(text.lower())[:MAX_SEARCH_WORDS]
+    if not words:
+        return None
+    # \w+ words cannot contain tsquery syntax, so a raw query is safe
+    raw = ' & '.join(f"'{word}':*" for word in words)
+    return SearchQuery(raw, search_type='raw', config=SEARCH_CONFIG)
+
+
+def search_movies(queryset, text):
+    """
+    Filter a movie queryset to matches for ``text``, best match first.
+
+    The queryset is annotated with ``search_rank``.
+    """
+    query = prefix_search_query(text)
+    if query is None:
+        return queryset.none()
+    text = text.strip()
+    return queryset.filter(
+        Q(search_vector=query) | Q(title__trigram_word_similar=text)
+    ).annotate(
+        search_rank=SearchRank(F('search_vector'), query) + TrigramWordSimilarity(text, 'title')
+    ).order_by('-search_rank', '-release_date')
+
+
+def autocomplete_movies(queryset, text, limit=AUTOCOMPLETE_LIMIT):
+    """
+    Suggestions for a partially typed query, as lean dicts.
+
+    Returns:
+        List of {id, title, genre, release_date}; empty for very short text
+    """
+    if len(text.strip()) < AUTOCOMPLETE_MIN_LENGTH:
+        return []
+    return list(
+        search_movies(queryset, text).values('id', 'title', 'genre', 'release_date')[:limit]
+    )
@@ -9,9 +9,22 @@ Serializers convert complex data types (Django models) to JSON and vice versa.
 These are used by Django REST Framework to handle API requests and responses.
 """
 
+from decimal import Decimal
+
 from rest_framework import serializers
 from django.contrib.auth.password_validation import validate_password
-from .models import User, Movie, Theater, Seat, Show, Booking, BookingSeat, Payment
+from .models import User, Movie, Theater, Seat, SeatLayoutTemplate, Show, Booking, BookingSeat, Payment
+from .availability import SeatAvailability
+from .layout_cache import get_seat_layout, render_seat_map
+from .inventory import recompute_show_counters
+from .bookings import (
+    SeatConflictError, ShowNotActiveError, commit_booking, commit_group_booking,
+    find_conflicting_seats, find_group_conflicts,
+)
+from .holds import is_hold_expired
+from .payments import PaymentNotAcceptable, accept_payment
+from .layouts import LAYOUT_MODES, ROW_LABELS
+from .fast_serializers import FastReadMixin
 
 
 # ==================== USER SERIALIZERS ====================
@@ -91,7 +104,7 @@ class LoginSerializer(serializers.Serializer):
 
 # ==================== MOVIE SERIALIZERS ====================
 
-class MovieListSerializer(serializers.ModelSerializer):
+class MovieListSerializer(FastReadMixin, serializers.ModelSerializer):
     """Serializer for listing movies (minimal data)"""
     
     class Meta:
@@ -112,6 +125,9 @@ class MovieDetailSerializer(serializers.ModelSerializer):
                   'created_at', 'updated_at']
     
     def get_shows_count(self, obj):
+        # Annotated by MovieViewSet for detail views
+        if hasattr(obj, 'active_shows_count'):
+            return obj.active_shows_count
         return obj.shows.filter(is_active=True).count()
 
 
@@ -126,7 +142,7 @@ class MovieCreateUpdateSerializer(serializers.ModelSerializer):
 
 # ==================== THEATER SERIALIZERS ====================
 
-class TheaterListSerializer(serializers.ModelSerializer):
+class TheaterListSerializer(FastReadMixin, serializers.ModelSerializer):
     """Serializer for listing theaters"""
     
     seats_count = serializers.SerializerMethodField()
@@ -136,6 +152,9 @@ class TheaterListSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'location', 'total_seats', 'seats_count', 'is_active']
     
     def get_seats_count(self, obj):
+        # Annotated by TheaterViewSet for lists
+        if hasattr(obj, 'active_seats_count'):
+            return obj.active_seats_count
         return obj.seats.filter(is_active=True).count()
 
 
@@ -150,8 +169,7 @@ class TheaterDetailSerializer(serializers.ModelSerializer):
                   'is_active', 'seats', 'created_at', 'updated_at']
     
     def get_seats(self, obj):
-        seats = obj.seats.filter(is_active=True)
-        return SeatSerializer(seats, many=True).data
+        return get_seat_layout(obj)
 
 
 class TheaterCreateUpdateSerializer(serializers.ModelSerializer):
@@ -164,7 +182,7 @@ class TheaterCreateUpdateSerializer(serializers.ModelSerializer):
 
 # ==================== SEAT SERIALIZERS ====================
 
-class SeatSerializer(serializers.ModelSerializer):
+class SeatSerializer(FastReadMixin, serializers.ModelSerializer):
     """Serializer for Seat model"""
     
     class Meta:
@@ -191,19 +209,29 @@ class SeatAvailabilitySerializer(serializers.ModelSerializer):
         model = Seat
         fields = ['id', 'seat_number', 'row', 'seat_type', 'is_available', 'is_booked', 'final_price', 'price_multiplier']
     
+    def get_availability(self):
+        """
+        Returns the shared SeatAvailability for the show in context.
+        Built once and cached on the serializer context so every seat in a
+        many=True serialization reuses the same booked-seat set.
+        """
+        availability = self.context.get('availability')
+        if availability is None:
+            show = self.context.get('show')
+            if show is None:
+                return None
+            availability = SeatAvailability.for_show(show)
+            self.context['availability'] = availability
+        return availability
+    
     def get_is_available(self, obj):
-        show = self.context.get('show')
-        if show:
-            booked_seat_ids = BookingSeat.objects.filter(
-                booking__show=show,
-                booking__status__in=['confirmed', 'pending']
-            ).values_list('seat_id', flat=True)
-            return obj.id not in booked_seat_ids
+        availability = self.get_availability()
+        if availability is not None:
+            return availability.is_available(obj.id)
         return True
     
     def get_is_booked(self, obj):
         return not self.get_is_available(obj)
-        return True
     
     def get_final_price(self, obj):
         show = self.context.get('show')
@@ -212,9 +240,74 @@ class SeatAvailabilitySerializer(serializers.ModelSerializer):
         return float(obj.price_multiplier)
 
 
+# ==================== SEAT LAYOUT SERIALIZERS ====================
+
+class SeatLayoutFieldsMixin:
+    """Shared validation for seat layout parameters"""
+    
+    def validate_rows(self, value):
+        if value < 1 or value > len(ROW_LABELS):
+            raise serializers.ValidationError(f"Rows must be between 1 and {len(ROW_LABELS)}.")
+        return value
+    
+    def validate_seats_per_row(self, value):
+        if value < 1:
+            raise serializers.ValidationError("Seats per row must be at least 1.")
+        return value
+    
+    def validate_aisles(self, value):
+        if not isinstance(value, list) or not all(isinstance(pos, int) and pos > 0 for pos in value):
+            raise serializers.ValidationError("Aisles must be a list of positive seat positions.")
+        return sorted(set(value))
+    
+    def validate_disabled_seats(self, value):
+        if not isinstance(value, list) or not all(isinstance(number, str) for number in value):
+            raise serializers.ValidationError("Disabled seats must be a list of seat numbers.")
+        return sorted(set(value))
+
+
+class SeatLayoutTemplateSerializer(SeatLayoutFieldsMixin, serializers.ModelSerializer):
+    """Serializer for seat layout templates (Admin only)"""
+    
+    class Meta:
+        model = SeatLayoutTemplate
+        fields = ['id', 'name', 'description', 'rows', 'seats_per_row', 'aisles',
+                  'vip_rows', 'premium_rows', 'disabled_seats', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'created_at', 'updated_at']
+
+
+class SeatGenerationSerializer(SeatLayoutFieldsMixin, serializers.Serializer):
+    """Serializer for generating a theater's seats from parameters or a template"""
+    
+    template = serializers.PrimaryKeyRelatedField(
+        queryset=SeatLayoutTemplate.objects.all(), required=False
+    )
+    rows = serializers.IntegerField(required=False, default=10)
+    seats_per_row = serializers.IntegerField(required=False, default=10)
+    aisles = serializers.ListField(child=serializers.IntegerField(), required=False, default=list)
+    vip_rows = serializers.IntegerField(required=False, default=2, min_value=0)
+    premium_rows = serializers.IntegerField(required=False, default=3, min_value=0)
+    disabled_seats = serializers.ListField(child=serializers.CharField(), required=False, default=list)
+    mode = serializers.ChoiceField(choices=LAYOUT_MODES, required=False, default='sync')
+
+
+class SeatLayoutApplySerializer(serializers.Serializer):
+    """Serializer for applying a layout template to several theaters"""
+    
+    theaters = serializers.ListField(child=serializers.IntegerField(), allow_empty=False)
+    mode = serializers.ChoiceField(choices=LAYOUT_MODES, required=False, default='sync')
+    
+    def validate_theaters(self, theater_ids):
+        theaters = Theater.objects.in_bulk(theater_ids)
+        missing = [theater_id for theater_id in theater_ids if theater_id not in theaters]
+        if missing:
+            raise serializers.ValidationError(f"Theaters {', '.join(map(str, missing))} not found.")
+        return [theaters[theater_id] for theater_id in dict.fromkeys(theater_ids)]
+
+
 # ==================== SHOW SERIALIZERS ====================
 
-class ShowListSerializer(serializers.ModelSerializer):
+class ShowListSerializer(FastReadMixin, serializers.ModelSerializer):
     """Serializer for listing shows"""
     
     movie_title = serializers.CharField(source='movie.title', read_only=True)
@@ -227,7 +320,12 @@ class ShowListSerializer(serializers.ModelSerializer):
                   'show_date', 'show_time', 'base_price', 'available_seats', 'is_active']
     
     def get_available_seats(self, obj):
-        return obj.get_available_seats().count()
+        # Views pass the seats of lapsed holds (inventory.lapsed_holds) the
+        # sweeper has not released yet
+        lapsed = self.context.get('lapsed_holds')
+        if lapsed is None:
+            return obj.available_seats_count
+        return min(obj.available_seats_count + lapsed.seats.get(obj.pk, 0), obj.total_seats_count)
 
 
 class ShowDetailSerializer(serializers.ModelSerializer):
@@ -243,8 +341,9 @@ class ShowDetailSerializer(serializers.ModelSerializer):
                   'base_price', 'is_active', 'seats', 'created_at', 'updated_at']
     
     def get_seats(self, obj):
-        seats = obj.theater.seats.filter(is_active=True)
-        return SeatAvailabilitySerializer(seats, many=True, context={'show': obj}).data
+        # ShowViewSet passes the availability it built for the validators
+        availability = self.context.get('availability') or SeatAvailability.for_show(obj)
+        return render_seat_map(obj, availability)
 
 
 class ShowCreateUpdateSerializer(serializers.ModelSerializer):
@@ -276,6 +375,81 @@ class ShowCreateUpdateSerializer(serializers.ModelSerializer):
             )
         
         return attrs
+    
+    def save(self, **kwargs):
+        show = super().save(**kwargs)
+        # Seat totals depend on the theater, so (re)initialize the counters
+        recompute_show_counters(Show.objects.filter(pk=show.pk))
+        return show
+
+
+class ShowScheduleSerializer(serializers.Serializer):
+    """
+    Serializer for a recurring show schedule (Admin only). Theaters are
+    validated with one query.
+    """
+
+    MAX_SHOWS = 1000
+
+    movie = serializers.PrimaryKeyRelatedField(queryset=Movie.objects.defer('search_vector'))
+    theaters = serializers.ListField(child=serializers.IntegerField(), allow_empty=False)
+    date_from = serializers.DateField()
+    date_to = serializers.DateField()
+    times = serializers.ListField(child=serializers.TimeField(), allow_empty=False)
+    weekdays = serializers.ListField(
+        child=serializers.IntegerField(min_value=0, max_value=6), required=False, allow_empty=False
+    )
+    base_price = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=Decimal('0.01'))
+    weekend_multiplier = serializers.DecimalField(
+        max_digits=4, decimal_places=2, min_value=Decimal('0.01'), default=Decimal('1.00')
+    )
+    dry_run = serializers.BooleanField(default=False)
+
+    def validate_theaters(self, theater_ids):
+        theaters = Theater.objects.in_bulk(theater_ids)
+        missing = [theater_id for theater_id in theater_ids if theater_id not in theaters]
+        if missing:
+            raise serializers.ValidationError(f"Theaters {', '.join(map(str, missing))} not found.")
+        return [theaters[theater_id] for theater_id in dict.fromkeys(theater_ids)]
+
+    def validate(self, attrs):
+        if attrs['date_to'] < attrs['date_from']:
+            raise serializers.ValidationError({"date_to": "Must not be before date_from."})
+        days = (attrs['date_to'] - attrs['date_from']).days + 1
+        if days * len(attrs['theaters']) * len(set(attrs['times'])) > self.MAX_SHOWS:
+            raise serializers.ValidationError(f"A schedule can create at most {self.MAX_SHOWS} shows.")
+        return attrs
+
+
+class ShowCancellationSerializer(serializers.Serializer):
+    """
+    Serializer for cancelling shows (Admin only): a list of shows, or every
+    show of a theater from date_from to date_to (inclusive).
+    """
+
+    shows = serializers.ListField(child=serializers.IntegerField(), required=False)
+    theater = serializers.PrimaryKeyRelatedField(queryset=Theater.objects.all(), required=False)
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+    reason = serializers.CharField(required=False, allow_blank=True, max_length=200)
+
+    def validate_shows(self, show_ids):
+        shows = Show.objects.in_bulk(show_ids)
+        missing = [show_id for show_id in show_ids if show_id not in shows]
+        if missing:
+            raise serializers.ValidationError(f"Shows {', '.join(map(str, missing))} not found.")
+        return [shows[show_id] for show_id in dict.fromkeys(show_ids)]
+
+    def validate(self, attrs):
+        if bool(attrs.get('shows')) == bool(attrs.get('theater')):
+            raise serializers.ValidationError("Provide either shows or a theater.")
+        if attrs.get('theater'):
+            if not attrs.get('date_from'):
+                raise serializers.ValidationError({"date_from": "Required with a theater."})
+            attrs.setdefault('date_to', attrs['date_from'])
+            if attrs['date_to'] < attrs['date_from']:
+                raise serializers.ValidationError({"date_to": "Must not be before date_from."})
+        return attrs
 
 
 # ==================== BOOKING SERIALIZERS ====================
@@ -309,9 +483,31 @@ class BookingListSerializer(serializers.ModelSerializer):
                   'status', 'booking_date']
     
     def get_seats_count(self, obj):
+        # Annotated by the booking list views
+        if hasattr(obj, 'booking_seats_count'):
+            return obj.booking_seats_count
         return obj.booking_seats.count()
 
 
+class BookingListRowSerializer(serializers.Serializer):
+    """
+    BookingListSerializer output from ``values()`` rows (customer booking
+    lists skip building model instances). Fields must stay in step with
+    BookingListSerializer.
+    """
+    
+    id = serializers.IntegerField(read_only=True)
+    booking_reference = serializers.CharField(read_only=True)
+    movie_title = serializers.CharField(read_only=True)
+    theater_name = serializers.CharField(read_only=True)
+    show_date = serializers.DateField(read_only=True)
+    show_time = serializers.TimeField(read_only=True)
+    seats_count = serializers.IntegerField(source='booking_seats_count', read_only=True)
+    total_amount = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
+    status = serializers.CharField(read_only=True)
+    booking_date = serializers.DateTimeField(read_only=True)
+
+
 class BookingDetailSerializer(serializers.ModelSerializer):
     """Serializer for detailed booking view"""
     
@@ -323,7 +519,7 @@ class BookingDetailSerializer(serializers.ModelSerializer):
     class Meta:
         model = Booking
         fields = ['id', 'booking_reference', 'user', 'show', 'seats',
-                  'total_amount', 'status', 'notes', 'payment', 
+                  'total_amount', 'status', 'notes', 'payment', 'hold_expires_at',
                   'booking_date', 'created_at', 'updated_at']
     
     def get_payment(self, obj):
@@ -357,90 +553,138 @@ class BookingCreateSerializer(serializers.Serializer):
             raise serializers.ValidationError({"show": "Show ID is required."})
         
         # Handle both 'seats' and 'seat_ids'
-        seat_values = attrs.get('seats') or attrs.get('seat_ids')
-        if not seat_values or len(seat_values) == 0:
+        seat_ids = attrs.get('seats') or attrs.get('seat_ids')
+        if not seat_ids or len(seat_ids) == 0:
             raise serializers.ValidationError({"seats": "At least one seat is required."})
         
-        # Normalize the attributes
-        attrs['show_id'] = show_value
-        attrs['seat_ids'] = seat_values
+        if len(seat_ids) != len(set(seat_ids)):
+            raise serializers.ValidationError({"seat_ids": "Duplicate seats selected."})
         
-        return attrs
-    
-    def validate_show_id(self, value):
-        if not value:
-            return value
         try:
-            show = Show.objects.get(pk=value, is_active=True)
+            show = Show.objects.get(pk=show_value, is_active=True)
         except Show.DoesNotExist:
-            raise serializers.ValidationError("Show not found or not active.")
-        return value
-    
-    def validate_seat_ids(self, value):
-        if not value:
-            return value
-        if len(value) != len(set(value)):
-            raise serializers.ValidationError("Duplicate seats selected.")
-        return value
-    
-    def validate(self, attrs):
-        show = Show.objects.get(pk=attrs['show_id'])
-        seat_ids = attrs['seat_ids']
+            raise serializers.ValidationError({"show_id": "Show not found or not active."})
         
         # Check if all seats belong to the show's theater
-        seats = Seat.objects.filter(
+        seats = list(Seat.objects.filter(
             pk__in=seat_ids, 
-            theater=show.theater, 
+            theater_id=show.theater_id, 
             is_active=True
-        )
+        ))
         
-        if seats.count() != len(seat_ids):
+        if len(seats) != len(seat_ids):
             raise serializers.ValidationError({
                 "seat_ids": "Some seats are invalid or don't belong to this theater."
             })
         
-        # Check if any seats are already booked
-        booked_seats = BookingSeat.objects.filter(
-            seat_id__in=seat_ids,
-            booking__show=show,
-            booking__status__in=['confirmed', 'pending']
-        ).values_list('seat_id', flat=True)
-        
-        if booked_seats:
+        # Fast pre-check for already booked seats; the booking commit
+        # re-checks atomically through the database constraint
+        conflicts = find_conflicting_seats(show, seat_ids)
+        if conflicts:
             raise serializers.ValidationError({
-                "seat_ids": f"Seats {list(booked_seats)} are already booked."
+                "seat_ids": str(SeatConflictError(conflicts))
             })
         
+        attrs['show_id'] = show.id
+        attrs['seat_ids'] = seat_ids
         attrs['show'] = show
         attrs['seats'] = seats
         return attrs
     
     def create(self, validated_data):
-        user = self.context['request'].user
-        show = validated_data['show']
-        seats = validated_data['seats']
-        notes = validated_data.get('notes', '')
+        try:
+            return commit_booking(
+                user=self.context['request'].user,
+                show=validated_data['show'],
+                seats=validated_data['seats'],
+                notes=validated_data.get('notes', '')
+            )
+        except SeatConflictError as exc:
+            raise serializers.ValidationError({"seat_ids": str(exc)})
+        except ShowNotActiveError:
+            raise serializers.ValidationError({"show_id": "Show not found or not active."})
+
+
+class BookingGroupItemSerializer(serializers.Serializer):
+    """One show of a group booking and the seats wanted for it"""
+    
+    show_id = serializers.IntegerField()
+    seat_ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False)
+
+
+class GroupBookingCreateSerializer(serializers.Serializer):
+    """
+    Serializer for booking seats across several shows at once.
+    Every show and seat is validated with one query each.
+    """
+    
+    MAX_SHOWS = 10
+    
+    groups = BookingGroupItemSerializer(many=True, allow_empty=False, max_length=MAX_SHOWS)
+    notes = serializers.CharField(required=False, allow_blank=True)
+    
+    def validate_groups(self, groups):
+        show_ids = [group['show_id'] for group in groups]
+        if len(show_ids) != len(set(show_ids)):
+            raise serializers.ValidationError("Each show can only appear once.")
+        for group in groups:
+            if len(group['seat_ids']) != len(set(group['seat_ids'])):
+                raise serializers.ValidationError(f"Duplicate seats selected for show {group['show_id']}.")
         
-        # Calculate total amount
-        total_amount = sum(show.base_price * seat.price_multiplier for seat in seats)
+        shows = Show.objects.in_bulk(show_ids)
+        shows = {pk: show for pk, show in shows.items() if show.is_active}
+        missing = [show_id for show_id in show_ids if show_id not in shows]
+        if missing:
+            raise serializers.ValidationError(
+                f"Shows {', '.join(map(str, missing))} not found or not active."
+            )
         
-        # Create booking
-        booking = Booking.objects.create(
-            user=user,
-            show=show,
-            total_amount=total_amount,
-            notes=notes
-        )
+        # Every seat of every group in one query, then matched to its show's theater
+        seats = Seat.objects.in_bulk({seat_id for group in groups for seat_id in group['seat_ids']})
+        resolved = []
+        for group in groups:
+            show = shows[group['show_id']]
+            group_seats = [seats.get(seat_id) for seat_id in group['seat_ids']]
+            if any(
+                seat is None or not seat.is_active or seat.theater_id != show.theater_id
+                for seat in group_seats
+            ):
+                raise serializers.ValidationError(
+                    f"Some seats are invalid or don't belong to the theater of show {show.id}."
+                )
+            resolved.append((show, group_seats))
         
-        # Create booking seats
-        for seat in seats:
-            BookingSeat.objects.create(
-                booking=booking,
-                seat=seat,
-                price=show.base_price * seat.price_multiplier
+        # Fast pre-check for taken seats across all shows; the commit
+        # re-checks atomically through the database constraint
+        conflicts = find_group_conflicts([
+            (show, [seat.id for seat in group_seats]) for show, group_seats in resolved
+        ])
+        if conflicts:
+            raise serializers.ValidationError(_group_conflict_message(conflicts))
+        return resolved
+    
+    def create(self, validated_data):
+        try:
+            return commit_group_booking(
+                user=self.context['request'].user,
+                groups=validated_data['groups'],
+                notes=validated_data.get('notes', '')
             )
-        
-        return booking
+        except SeatConflictError as exc:
+            raise serializers.ValidationError({"groups": _group_conflict_message(exc.seats)})
+        except ShowNotActiveError as exc:
+            raise serializers.ValidationError({"groups": f"Show {exc.show_id} not found or not active."})
+
+
+def _group_conflict_message(conflicts):
+    """One line per show listing its taken seats"""
+    by_show = {}
+    for seat in conflicts:
+        by_show.setdefault(seat['show_id'], []).append(seat['seat_number'])
+    return [
+        f"Show {show_id}: seats {', '.join(numbers)} are already booked."
+        for show_id, numbers in by_show.items()
+    ]
 
 
 class BookingCancelSerializer(serializers.Serializer):
@@ -459,7 +703,7 @@ class PaymentSerializer(serializers.ModelSerializer):
     class Meta:
         model = Payment
         fields = ['id', 'booking', 'booking_reference', 'payment_method', 
-                  'payment_status', 'transaction_id', 'amount', 'payment_date',
+                  'payment_status', 'failure_reason', 'transaction_id', 'amount', 'payment_date',
                   'created_at', 'updated_at']
         read_only_fields = ['id', 'booking', 'amount', 'payment_date', 'created_at', 'updated_at']
 
@@ -481,27 +725,28 @@ class PaymentCreateSerializer(serializers.Serializer):
         if booking.status == 'cancelled':
             raise serializers.ValidationError("Cannot pay for a cancelled booking.")
         
+        if booking.status == 'expired' or is_hold_expired(booking):
+            raise serializers.ValidationError("Seat hold has expired. Please book again.")
+        
         if booking.status == 'confirmed':
             raise serializers.ValidationError("Booking is already confirmed.")
         
         # Check if payment already exists
-        if hasattr(booking, 'payment') and booking.payment.payment_status == 'completed':
-            raise serializers.ValidationError("Payment has already been completed.")
+        if hasattr(booking, 'payment'):
+            if booking.payment.payment_status == 'completed':
+                raise serializers.ValidationError("Payment has already been completed.")
+            if booking.payment.payment_status in ('pending', 'processing'):
+                raise serializers.ValidationError("Payment is already being processed.")
         
         return value
     
     def create(self, validated_data):
-        booking = Booking.objects.get(pk=validated_data['booking_id'])
-        
-        # Create or update payment
-        payment, created = Payment.objects.update_or_create(
-            booking=booking,
-            defaults={
-                'payment_method': validated_data['payment_method'],
-                'transaction_id': validated_data.get('transaction_id', ''),
-                'amount': booking.total_amount,
-                'payment_status': 'completed'  # Auto-confirm for demo purposes
-            }
-        )
-        
-        return payment
+        # Accept only; the payment queue charges it (api.payments)
+        try:
+            return accept_payment(
+                validated_data['booking_id'],
+                validated_data['payment_method'],
+                validated_data.get('transaction_id', ''),
+            )
+        except PaymentNotAcceptable as error:
+            raise serializers.ValidationError({"booking_id": str(error)})
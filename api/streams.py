@@ -0,0 +1,249 @@
+"""
+Movie Ticket Booking System - Live Seat Map Stream
+
+DAR ES SALAAM INSTITUTE OF TECHNOLOGY
+MODULE CODE: COU 07503
+MODULE NAME: WEB APPLICATION DEVELOPMENT
+
+Server-Sent Events endpoint for show pages:
+
+    GET /api/shows/{id}/seats/stream/
+
+The client first receives a ``snapshot`` event with the full seat map, then
+``delta`` events listing seat IDs that were booked or released, as bookings
+are created, cancelled or their holds expire.
+
+Every worker process keeps one ShowSeatFeed per show with viewers. The feed
+loads the show's taken seat IDs once per SEAT_STREAM_POLL_INTERVAL, diffs
+them with the previous set and fans the delta out to every subscriber
+queue, so database load depends on the number of watched shows, not on
+the number of viewers. Booking changes made in the same process wake the
+feed immediately through ``notify_seats_changed``; changes from other
+processes are picked up on the next poll.
+
+Payment pages follow a payment through the background pipeline
+(api.payments) the same way:
+
+    GET /api/payments/{id}/status/stream/
+
+sends a ``status`` event whenever the payment's status changes and ends
+once it is final. It needs the same ``Authorization: Bearer`` header as the
+rest of the API.
+
+Requires an ASGI server (e.g. ``uvicorn movie_ticket_system.asgi:application``).
+"""
+
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from .availability import SeatAvailability, booked_seat_ids_query
+from .layout_cache import render_seat_map
+from .models import Payment, Show
+from .payments import payment_state
+
+
+# show_id -> ShowSeatFeed for the event loop of this worker process
+_feeds = {}
+
+
+def _sse(event, data, event_id=None):
+    """Format one Server-Sent Event"""
+    message = f"event: {event}\n"
+    if event_id is not None:
+        message += f"id: {event_id}\n"
+    return message + f"data: {json.dumps(data)}\n\n"
+
+
+class ShowSeatFeed:
+    """Single change feed for one show, shared by all of its viewers"""
+
+    def __init__(self, show):
+        self.show = show
+        self.seq = 0
+        self.taken = None
+        self.subscribers = set()
+        self.loop = asyncio.get_running_loop()
+        self.wakeup = asyncio.Event()
+        self.loaded = asyncio.Event()
+        self.task = None
+
+    def subscribe(self):
+        queue = asyncio.Queue(maxsize=settings.SEAT_STREAM_QUEUE_SIZE)
+        self.subscribers.add(queue)
+        if self.task is None or self.task.done():
+            self.task = self.loop.create_task(self.run())
+        return queue
+
+    def unsubscribe(self, queue):
+        self.subscribers.discard(queue)
+        if not self.subscribers:
+            self.wakeup.set()
+
+    async def snapshot(self):
+        """
+        Full seat map event built from the feed's current taken set, or
+        None once the show is gone. The show is read again for every
+        snapshot, so layout and price edits reach new viewers.
+        """
+        await self.loaded.wait()
+        show = await Show.objects.select_related('theater').filter(pk=self.show.pk).afirst()
+        if show is None:
+            return None
+        self.show = show
+        # Read together, with no await in between: a poll during the render
+        # must not label this seat state with a newer seq
+        seq, taken = self.seq, self.taken
+        seats = await sync_to_async(render_seat_map)(show, SeatAvailability(show, taken))
+        return _sse('snapshot', {'show': show.pk, 'seq': seq, 'seats': seats}, seq)
+
+    async def run(self):
+        try:
+            while self.subscribers:
+                taken = await sync_to_async(_load_taken)(self.show.pk)
+                if self.taken is not None and taken != self.taken:
+                    self.seq += 1
+                    self.broadcast(_sse('delta', {
+                        'show': self.show.pk,
+                        'seq': self.seq,
+                        'booked': sorted(taken - self.taken),
+                        'released': sorted(self.taken - taken),
+                    }, self.seq))
+                self.taken = taken
+                self.loaded.set()
+
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), settings.SEAT_STREAM_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                self.wakeup.clear()
+        finally:
+            if _feeds.get(self.show.pk) is self:
+                del _feeds[self.show.pk]
+
+    def broadcast(self, message):
+        for queue in list(self.subscribers):
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                # Too slow to keep up: end its stream, the client reconnects
+                # and starts again from a fresh snapshot
+                self.subscribers.discard(queue)
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(None)
+
+
+def _load_taken(show_id):
+    return frozenset(booked_seat_ids_query(show_id))
+
+
+def notify_seats_changed(show_id):
+    """
+    Wake the feed of a show in this process once the current transaction
+    commits. Safe to call from synchronous request threads.
+    """
+    def wake():
+        feed = _feeds.get(show_id)
+        if feed is not None:
+            feed.loop.call_soon_threadsafe(feed.wakeup.set)
+
+    transaction.on_commit(wake)
+
+
+async def _event_stream(feed, queue):
+    try:
+        snapshot = await feed.snapshot()
+        if snapshot is None:
+            return
+        yield snapshot
+        while True:
+            try:
+                message = await asyncio.wait_for(queue.get(), settings.SEAT_STREAM_HEARTBEAT)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            if message is None:
+                break
+            yield message
+    finally:
+        feed.unsubscribe(queue)
+
+
+async def show_seat_stream(request, pk):
+    """
+    Stream seat state changes for a show.
+    GET /api/shows/{id}/seats/stream/
+    """
+    feed = _feeds.get(pk)
+    if feed is None or feed.loop is not asyncio.get_running_loop():
+        try:
+            show = await Show.objects.select_related('theater').aget(pk=pk, is_active=True)
+        except Show.DoesNotExist:
+            raise Http404("Show not found.")
+        feed = _feeds.get(pk)
+        if feed is None or feed.loop is not asyncio.get_running_loop():
+            feed = _feeds[pk] = ShowSeatFeed(show)
+
+    response = StreamingHttpResponse(_event_stream(feed, feed.subscribe()), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+# ==================== PAYMENT STATUS ====================
+
+def _authenticate(request):
+    """The user of a request's JWT, or None"""
+    try:
+        result = JWTAuthentication().authenticate(request)
+    except AuthenticationFailed:
+        return None
+    return result[0] if result else None
+
+
+async def _payment_events(payment_id):
+    last = None
+    idle = 0.0
+    while True:
+        payment = await Payment.objects.aget(pk=payment_id)
+        state = payment_state(payment)
+        if state != last:
+            yield _sse('status', state)
+            last = state
+            idle = 0.0
+        if state['final']:
+            break
+
+        await asyncio.sleep(settings.PAYMENT_STREAM_POLL_INTERVAL)
+        idle += settings.PAYMENT_STREAM_POLL_INTERVAL
+        if idle >= settings.SEAT_STREAM_HEARTBEAT:
+            yield ": keep-alive\n\n"
+            idle = 0.0
+
+
+async def payment_status_stream(request, pk):
+    """
+    Stream status changes of a payment until it is final.
+    GET /api/payments/{id}/status/stream/
+    """
+    user = await sync_to_async(_authenticate)(request)
+    if user is None:
+        return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=401)
+
+    payments = Payment.objects.filter(pk=pk)
+    if user.role != 'admin':
+        payments = payments.filter(booking__user=user)
+    if not await payments.aexists():
+        raise Http404("Payment not found.")
+
+    response = StreamingHttpResponse(_payment_events(pk), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -1,3 +1,1671 @@
-from django.test import TestCase
+"""
+Movie Ticket Booking System - API Tests
 
-# Create your tests here.
+DAR ES SALAAM INSTITUTE OF TECHNOLOGY
+MODULE CODE: COU 07503
+MODULE NAME: WEB APPLICATION DEVELOPMENT
+
+Query budgets: every endpoint that declares ``query_budgets`` is requested
+against a dataset with several rows per list, so an N+1 query pattern
+pushes the count over the budget and fails the suite.
+
+Double booking: a seat has one active booking per show. The loser of a
+race gets the exact seats back, even past the serializer's pre-check, and
+cancelled seats can be booked again.
+
+Group bookings: seats across several shows are booked all or nothing.
+
+Seat holds: a lapsed hold frees its seats for booking straight away, and
+the sweeper expires only lapsed holds and returns their seats to the show
+counters.
+
+Seat layouts: syncing a layout keeps booked seats it drops (deactivated)
+and deletes the others; replacing the layout of a booked theater is
+refused, and the theaters a template is applied to are validated in one
+query.
+
+Seat stream: viewers get a seat map snapshot, then the seats booked or
+released as events; snapshots follow layout and price edits and carry the
+seq of the seat state they show.
+
+Idempotency keys: a retried booking or payment replays the stored result
+instead of running again, and a duplicate of a request still running is
+refused until its claim times out.
+
+Payment pipeline: payments are accepted by the API, then charged and
+committed by a worker; late or declined charges never confirm a booking,
+late charges are refunded after the commit, and a hold outlives a charge
+that is requeued while the gateway is slow.
+
+Sales rollups: the rows maintained incrementally by bookings, payments and
+refunds, and the catalog totals kept by saves and deletes, must match a
+full rebuild from the source tables.
+
+State transitions: bookings of several shows are confirmed and cancelled
+in bulk with the same seat counters and rollups as a full recompute, as
+are bookings made, paid, cancelled and deleted through the API;
+repair_show_counters restores drifted counters.
+
+Show cancellation: every booking of a theater's shows in a date range is
+cancelled and refunded in one request, and later bookings roll back; a
+list of shows is validated in one query.
+
+Booking lifecycle: confirmed bookings are completed in chunks once their
+show has ended.
+
+Show schedules: recurring shows are created in bulk with weekend prices,
+and slots already taken are reported instead of failing the request.
+
+Movie search: ranked full-text matching with prefixes and typos, and a
+language filter the trigram index can serve.
+
+Keyset pagination: cursor pages cover the same rows as the ordering, in
+both directions, without a COUNT query.
+
+Fast read serializers: the catalog serializers render the same JSON as
+DRF's regular field loop.
+
+Conditional GET: unchanged catalog and seat-map responses revalidate to a
+304 without being serialized, and any change that affects them changes
+the ETag.
+
+Catalog cache: repeated reads are served without queries until a change
+to a movie, theater, show or seat invalidates them, or a seat hold on a
+listed show lapses. Bookings only drop the lists that show their show.
+
+Dashboard snapshot: stale snapshots are served without queries while
+another request holds the rebuild lock.
+
+Run with: python manage.py test api
+"""
+
+import asyncio
+import base64
+import inspect
+import json
+import os
+import tempfile
+import time as time_module
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest.mock import Mock, patch
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, Q
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from . import catalog_cache, views
+from . import streams as streams_module
+from .bookings import SeatConflictError, ShowNotActiveError, commit_booking, with_seats_count
+from .dashboard import REBUILD_LOCK_KEY, build_dashboard_snapshot, get_dashboard_snapshot
+from .fast_serializers import drf_serializer_class
+from .holds import release_expired_holds
+from .idempotency import purge_expired_keys
+from .payments import (
+    GatewayResult, PaymentNotAcceptable, accept_payment, process_pending_payments, requeue_stale_payments,
+    retry_refunds,
+)
+from .inventory import recompute_show_counters
+from .layouts import LayoutError, apply_layout, build_layout
+from .lifecycle import complete_past_bookings
+from .middleware import query_budget_key
+from .models import User, Movie, Theater, Show, Booking, BookingSeat, Payment, SalesRollup, IdempotencyKey
+from .serializers import (
+    BookingListSerializer, MovieListSerializer, SeatLayoutApplySerializer, SeatSerializer,
+    ShowCancellationSerializer, ShowListSerializer, TheaterListSerializer,
+)
+from .rollups import catalog_totals, rebuild_catalog_totals, rebuild_sales_rollups, sales_summary
+from .search import search_movies
+from .transitions import cancel_bookings, confirm_bookings
+
+
+# The suite clears the catalog and dashboard caches: keep it on scratch
+# file caches instead of the deployment's (settings.CACHES)
+cache_dir = tempfile.TemporaryDirectory(prefix='api-tests-cache-')
+test_caches = override_settings(CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    **{
+        alias: {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.path.join(cache_dir.name, alias),
+        }
+        for alias in (settings.CATALOG_CACHE_ALIAS, settings.DASHBOARD_CACHE_ALIAS)
+    },
+})
+
+
+def setUpModule():
+    test_caches.enable()
+
+
+def tearDownModule():
+    test_caches.disable()
+    cache_dir.cleanup()
+
+
+class QueryBudgetTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('budget_admin', 'admin@example.com', 'pass', role='admin')
+        cls.customer = User.objects.create_user('budget_customer', 'customer@example.com', 'pass')
+
+        cls.movies = [
+            Movie.objects.create(
+                title=f'Budget Movie {i}', genre='action', duration=100 + i,
+                language='English', release_date=timezone.now().date()
+            )
+            for i in range(3)
+        ]
+        cls.theaters = []
+        for i in range(3):
+            theater = Theater.objects.create(name=f'Budget Hall {i}', location='Test', total_seats=0)
+            apply_layout(theater, build_layout(3, 5, vip_rows=1, premium_rows=1))
+            cls.theaters.append(theater)
+
+        tomorrow = timezone.now().date() + timedelta(days=1)
+        cls.shows = [
+            Show.objects.create(
+                movie=cls.movies[i % 3], theater=theater, show_date=tomorrow,
+                show_time=time(10 + 2 * i), base_price=Decimal('10000.00')
+            )
+            for i, theater in enumerate(cls.theaters * 2)
+        ]
+        for show in cls.shows:
+            show.refresh_from_db()
+
+        cls.bookings = []
+        for i, show in enumerate(cls.shows[:4]):
+            seats = list(show.theater.seats.order_by('id')[:2])
+            cls.bookings.append(commit_booking(cls.customer, show, seats))
+        for booking in cls.bookings[:2]:
+            Payment.objects.create(
+                booking=booking, payment_method='cash', amount=booking.total_amount,
+                payment_status='completed'
+            )
+
+    def requests(self):
+        """(method, path, user, data) for every budgeted endpoint"""
+        movie, theater, show = self.movies[0], self.theaters[0], self.shows[0]
+        free_show = self.shows[5]
+        free_seats = list(free_show.theater.seats.order_by('-id').values_list('id', flat=True)[:2])
+        group_seats = [
+            list(show.theater.seats.order_by('id').values_list('id', flat=True)[:2])
+            for show in (self.shows[4], free_show)
+        ]
+        pending, cancellable = self.bookings[2], self.bookings[3]
+        return [
+            ('get', '/api/movies/', None, None),
+            ('get', f'/api/movies/{movie.pk}/', None, None),
+            ('get', f'/api/movies/{movie.pk}/shows/', None, None),
+            ('get', '/api/movies/autocomplete/', None, {'q': 'budget'}),
+            ('get', '/api/theaters/', None, None),
+            ('get', f'/api/theaters/{theater.pk}/', None, None),
+            ('get', f'/api/theaters/{theater.pk}/shows/', None, None),
+            ('get', '/api/shows/', None, None),
+            ('get', f'/api/shows/{show.pk}/', None, None),
+            ('get', f'/api/shows/{show.pk}/seats/', None, None),
+            ('get', '/api/bookings/', self.customer, None),
+            ('get', f'/api/bookings/{self.bookings[0].pk}/', self.customer, None),
+            ('post', '/api/bookings/', self.customer, {'show_id': free_show.pk, 'seat_ids': free_seats}),
+            ('post', '/api/bookings/group/', self.customer, {'groups': [
+                {'show_id': self.shows[4].pk, 'seat_ids': group_seats[0]},
+                {'show_id': free_show.pk, 'seat_ids': group_seats[1]},
+            ]}),
+            ('post', f'/api/bookings/{cancellable.pk}/cancel/', self.customer, {}),
+            ('post', '/api/payments/process/', self.customer,
+             {'booking_id': pending.pk, 'payment_method': 'mobile_money'}),
+            ('get', '/api/payments/', self.customer, None),
+            ('get', f'/api/payments/{self.bookings[0].payment.pk}/status/', self.customer, None),
+            ('get', '/api/admin/dashboard/', self.admin, None),
+            ('post', '/api/shows/schedule/', self.admin, {
+                'movie': movie.pk, 'theaters': [theater.pk for theater in self.theaters],
+                'date_from': show.show_date + timedelta(days=30), 'date_to': show.show_date + timedelta(days=36),
+                'times': ['10:00', '14:00', '18:00'], 'base_price': '10000.00',
+            }),
+        ]
+
+    def request(self, method, path, user, data):
+        # Budgets cover the cold-cache path
+        cache.clear()
+        catalog_cache.clear()
+        client = APIClient()
+        if user is not None:
+            token = RefreshToken.for_user(user).access_token
+            client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        with CaptureQueriesContext(connection) as ctx:
+            response = getattr(client, method)(path, data, format='json')
+        return response, ctx
+
+    def test_endpoints_stay_within_query_budgets(self):
+        for method, path, user, data in self.requests():
+            with self.subTest(f'{method.upper()} {path}'):
+                view_class, key = query_budget_key(resolve(path), method)
+                budget = getattr(view_class, 'query_budgets', {}).get(key)
+                self.assertIsNotNone(budget, f'{view_class.__name__} declares no budget for {key!r}')
+
+                response, ctx = self.request(method, path, user, data)
+                self.assertLess(response.status_code, 300, response.content)
+                self.assertLessEqual(
+                    len(ctx.captured_queries), budget,
+                    f'{method.upper()} {path} ran {len(ctx.captured_queries)} queries '
+                    f'(budget {budget}):\n' + '\n'.join(q['sql'] for q in ctx.captured_queries)
+                )
+
+    def test_customer_booking_rows_match_the_model_serializer(self):
+        response, _ = self.request('get', '/api/bookings/', self.customer, None)
+        bookings = with_seats_count(Booking.objects.filter(user=self.customer)).order_by('-booking_date')
+        self.assertEqual(
+            response.content,
+            JSONRenderer().render({
+                'count': len(bookings), 'next': None, 'previous': None,
+                'results': BookingListSerializer(bookings, many=True).data,
+            })
+        )
+
+    def test_fast_read_serializers_match_drf(self):
+        movie = self.movies[0]
+        movie.poster.name = 'movie_posters/poster.jpg'
+        movie.poster_url = 'https://example.com/poster.jpg'
+        # Annotated as in the theater list, and one counting its seats itself
+        theaters = list(Theater.objects.annotate(
+            active_seats_count=Count('seats', filter=Q(seats__is_active=True))
+        ).order_by('id')) + [self.theaters[0]]
+        cases = [
+            (MovieListSerializer, self.movies),
+            (TheaterListSerializer, theaters),
+            (ShowListSerializer, Show.objects.select_related('movie', 'theater').order_by('id')),
+            (SeatSerializer, self.theaters[0].seats.order_by('id')),
+        ]
+        request = APIRequestFactory().get('/api/movies/')
+        for serializer_class, objects in cases:
+            for context in ({}, {'request': request}):
+                with self.subTest(serializer_class.__name__, context=bool(context)):
+                    self.assertEqual(
+                        JSONRenderer().render(serializer_class(objects, many=True, context=context).data),
+                        JSONRenderer().render(
+                            drf_serializer_class(serializer_class)(objects, many=True, context=context).data
+                        )
+                    )
+
+    def test_every_declared_budget_is_exercised(self):
+        exercised = {query_budget_key(resolve(path), method) for method, path, _, _ in self.requests()}
+        for name, view_class in inspect.getmembers(views, inspect.isclass):
+            for key in getattr(view_class, 'query_budgets', {}):
+                self.assertIn((view_class, key), exercised, f'{name}.query_budgets[{key!r}] is never tested')
+
+
+class DoubleBookingTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = User.objects.create_user('seat_customer', 'seat@example.com', 'pass')
+        cls.other = User.objects.create_user('seat_other', 'seat-other@example.com', 'pass')
+        movie = Movie.objects.create(
+            title='One Seat Each', genre='drama', duration=100,
+            language='English', release_date=timezone.now().date()
+        )
+        theater = Theater.objects.create(name='Seat Hall', location='Test', total_seats=0)
+        apply_layout(theater, build_layout(2, 5))
+        tomorrow = timezone.now().date() + timedelta(days=1)
+        cls.show, cls.later_show = [
+            Show.objects.create(
+                movie=movie, theater=theater, show_date=tomorrow,
+                show_time=time(hour), base_price=Decimal('10000.00')
+            )
+            for hour in (10, 14)
+        ]
+        recompute_show_counters(Show.objects.all())
+        cls.seats = list(theater.seats.order_by('id'))
+
+    def held_seats(self):
+        return Show.objects.get(pk=self.show.pk).held_seats_count
+
+    def test_taken_seats_are_rejected_with_the_exact_seats(self):
+        commit_booking(self.customer, self.show, self.seats[:3])
+        with self.assertRaises(SeatConflictError) as raised:
+            commit_booking(self.other, self.show, [self.seats[1], self.seats[2], self.seats[5]])
+        self.assertEqual(raised.exception.seat_ids, [self.seats[1].pk, self.seats[2].pk])
+        self.assertEqual({seat['show_id'] for seat in raised.exception.seats}, {self.show.pk})
+        self.assertEqual(
+            str(raised.exception), f"Seats {self.seats[1].seat_number}, {self.seats[2].seat_number} are already booked."
+        )
+        # Nothing of the losing booking is kept
+        self.assertFalse(Booking.objects.filter(user=self.other).exists())
+        self.assertEqual(self.held_seats(), 3)
+
+        # The same seats are free in another show
+        commit_booking(self.other, self.later_show, self.seats[:3])
+
+    def test_commit_reports_conflicts_the_pre_check_missed(self):
+        booking = commit_booking(self.customer, self.show, self.seats[:2])
+
+        # The partial unique index refuses a second active row for a seat
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            BookingSeat.objects.create(booking=booking, show=self.show, seat=self.seats[0], price=Decimal('1'))
+
+        # A booker racing past the serializer's pre-check gets the seats
+        # the constraint rejected
+        client = APIClient()
+        client.force_authenticate(self.other)
+        with patch('api.serializers.find_conflicting_seats', return_value=[]):
+            response = client.post(
+                '/api/bookings/', {'show_id': self.show.pk, 'seat_ids': [self.seats[1].pk, self.seats[2].pk]},
+                format='json'
+            )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['seat_ids'], f"Seats {self.seats[1].seat_number} are already booked.")
+        self.assertEqual(self.held_seats(), 2)
+
+    def test_cancelled_seats_can_be_rebooked(self):
+        booking = commit_booking(self.customer, self.show, self.seats[:2])
+        cancel_bookings(Booking.objects.filter(pk=booking.pk))
+        self.assertEqual(self.held_seats(), 0)
+
+        rebooked = commit_booking(self.other, self.show, self.seats[:2])
+        self.assertEqual(rebooked.booking_seats.filter(is_active=True).count(), 2)
+        self.assertEqual(booking.booking_seats.filter(is_active=True).count(), 0)
+        self.assertEqual(self.held_seats(), 2)
+
+
+class GroupBookingTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = User.objects.create_user('group_customer', 'group@example.com', 'pass')
+        movie = Movie.objects.create(
+            title='Field Trip', genre='drama', duration=100,
+            language='English', release_date=timezone.now().date()
+        )
+        theater = Theater.objects.create(name='Group Hall', location='Test', total_seats=0)
+        apply_layout(theater, build_layout(2, 5))
+        tomorrow = timezone.now().date() + timedelta(days=1)
+        cls.shows = [
+            Show.objects.create(
+                movie=movie, theater=theater, show_date=tomorrow,
+                show_time=time(hour), base_price=Decimal('10000.00')
+            )
+            for hour in (10, 14)
+        ]
+        recompute_show_counters(Show.objects.all())
+        cls.seats = list(theater.seats.order_by('id').values_list('id', flat=True))
+
+    def post(self, groups):
+        client = APIClient()
+        client.force_authenticate(self.customer)
+        return client.post('/api/bookings/group/', {'groups': groups}, format='json')
+
+    def test_group_is_booked_all_or_nothing(self):
+        first, second = self.shows
+        response = self.post([
+            {'show_id': first.pk, 'seat_ids': self.seats[:3]},
+            {'show_id': second.pk, 'seat_ids': self.seats[:2]},
+        ])
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual([len(booking['seats']) for booking in response.json()['bookings']], [3, 2])
+        self.assertEqual(
+            Decimal(response.json()['total_amount']),
+            sum(Decimal(booking['total_amount']) for booking in response.json()['bookings'])
+        )
+        first.refresh_from_db()
+        self.assertEqual(first.held_seats_count, 3)
+
+        # One taken seat in the second show rejects the whole group
+        response = self.post([
+            {'show_id': first.pk, 'seat_ids': self.seats[5:7]},
+            {'show_id': second.pk, 'seat_ids': self.seats[1:3]},
+        ])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(f'Show {second.pk}: seats', str(response.json()['groups']))
+        self.assertEqual(Booking.objects.filter(user=self.customer).count(), 2)
+
+        # The commit re-checks atomically when the pre-check is passed
+        with patch('api.serializers.find_group_conflicts', return_value=[]):
+            response = self.post([
+                {'show_id': first.pk, 'seat_ids': self.seats[5:7]},
+                {'show_id': second.pk, 'seat_ids': self.seats[1:3]},
+            ])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Booking.objects.filter(user=self.customer).count(), 2)
+        first.refresh_from_db()
+        self.assertEqual(first.held_seats_count, 3)
+
+        # Seats must belong to each show's theater
+        response = self.post([{'show_id': first.pk, 'seat_ids': [self.seats[0], 0]}])
+        self.assertEqual(response.status_code, 400)
+
+
+class SeatHoldTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = User.objects.create_user('hold_customer', 'hold@example.com', 'pass')
+        cls.other = User.objects.create_user('hold_other', 'hold-other@example.com', 'pass')
+        movie = Movie.objects.create(
+            title='Hold Still', genre='drama', duration=100,
+            language='English', release_date=timezone.now().date()
+        )
+        theater = Theater.objects.create(name='Hold Hall', location='Test', total_seats=0)
+        apply_layout(theater, build_layout(2, 5))
+        cls.show = Show.objects.create(
+            movie=movie, theater=theater, show_date=timezone.now().date() + timedelta(days=1),
+            show_time=time(18), base_price=Decimal('10000.00')
+        )
+        recompute_show_counters(Show.objects.all())
+        cls.seats = list(theater.seats.order_by('id'))
+
+    def lapse(self, *bookings):
+        Booking.objects.filter(pk__in=[booking.pk for booking in bookings]).update(
+            hold_expires_at=timezone.now() - timedelta(seconds=1)
+        )
+
+    def counters(self):
+        return Show.objects.values(
+            'held_seats_count', 'sold_seats_count', 'regular_seats_remaining', 'premium_seats_remaining',
+            'vip_seats_remaining'
+        ).get(pk=self.show.pk)
+
+    def test_expired_hold_frees_its_seats_for_booking(self):
+        held = commit_booking(self.customer, self.show, self.seats[:2])
+        with self.assertRaises(SeatConflictError):
+            commit_booking(self.other, self.show, self.seats[:2])
+
+        # Once the hold lapses the seats can be booked before any sweep
+        self.lapse(held)
+        client = APIClient()
+        client.force_authenticate(self.other)
+        response = client.post(
+            '/api/bookings/', {'show_id': self.show.pk, 'seat_ids': [seat.pk for seat in self.seats[:2]]},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 201, response.content)
+
+        # The lapsed booking was released on the way
+        held.refresh_from_db()
+        self.assertEqual(held.status, 'expired')
+        self.assertFalse(held.booking_seats.filter(is_active=True).exists())
+        self.assertEqual(self.counters()['held_seats_count'], 2)
+
+    def test_sweeper_releases_only_lapsed_holds(self):
+        lapsed = commit_booking(self.customer, self.show, self.seats[:2])
+        live = commit_booking(self.customer, self.show, self.seats[2:5])
+        confirmed = commit_booking(self.other, self.show, self.seats[5:6])
+        confirm_bookings(Booking.objects.filter(pk=confirmed.pk))
+        self.lapse(lapsed, confirmed)
+        self.assertEqual(self.counters()['held_seats_count'], 5)
+
+        self.assertEqual(release_expired_holds(batch_size=1), 1)
+        self.assertEqual(
+            dict(Booking.objects.values_list('pk', 'status')),
+            {lapsed.pk: 'expired', live.pk: 'pending', confirmed.pk: 'confirmed'}
+        )
+        self.assertEqual(lapsed.booking_seats.filter(is_active=True).count(), 0)
+        self.assertEqual(live.booking_seats.filter(is_active=True).count(), 3)
+
+        # The counters moved exactly as a full recompute sees them
+        incremental = self.counters()
+        self.assertEqual((incremental['held_seats_count'], incremental['sold_seats_count']), (3, 1))
+        recompute_show_counters(Show.objects.filter(pk=self.show.pk))
+        self.assertEqual(incremental, self.counters())
+
+        self.assertEqual(release_expired_holds(), 0)
+
+
+class SeatLayoutTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = User.objects.create_user('layout_customer', 'layout@example.com', 'pass')
+        cls.movie = Movie.objects.create(
+            title='Floor Plan', genre='drama', duration=100,
+            language='English', release_date=timezone.now().date()
+        )
+
+    def theater_with_booking(self, name):
+        theater = Theater.objects.create(name=name, location='Test', total_seats=0)
+        apply_layout(theater, build_layout(2, 5))
+        show = Show.objects.create(
+            movie=self.movie, theater=theater, show_date=timezone.now().date() + timedelta(days=1),
+            show_time=time(18), base_price=Decimal('10000.00')
+        )
+        recompute_show_counters(Show.objects.filter(pk=show.pk))
+        booked = list(theater.seats.filter(seat_number__in=['A5', 'B5']))
+        return theater, show, commit_booking(self.customer, show, booked)
+
+    def test_sync_keeps_booked_seats(self):
+        theater, show, booking = self.theater_with_booking('Sync Hall')
+        seat_ids = dict(theater.seats.values_list('seat_number', 'id'))
+
+        # Dropping the fifth column deactivates the booked seats; row B turns premium
+        stats = apply_layout(theater, build_layout(2, 4, vip_rows=1))
+        self.assertEqual(
+            stats, {'created': 0, 'updated': 4, 'deactivated': 2, 'deleted': 0, 'total_seats': 8}
+        )
+        seats = {seat.seat_number: seat for seat in theater.seats.all()}
+        self.assertEqual({number: seat.id for number, seat in seats.items()}, seat_ids)
+        self.assertFalse(seats['A5'].is_active or seats['B5'].is_active)
+        self.assertEqual(seats['B1'].seat_type, 'premium')
+        self.assertEqual(
+            sorted(booking.booking_seats.filter(is_active=True).values_list('seat__seat_number', flat=True)),
+            ['A5', 'B5']
+        )
+
+        # Unbooked seats are deleted outright
+        stats = apply_layout(theater, build_layout(2, 3, vip_rows=1))
+        self.assertEqual((stats['deleted'], stats['deactivated'], stats['total_seats']), (2, 0, 6))
+        self.assertEqual(theater.seats.count(), 8)
+        show.refresh_from_db()
+        self.assertEqual((show.total_seats_count, show.held_seats_count), (6, 2))
+
+    def test_replace_refuses_booked_theaters(self):
+        theater, _, _ = self.theater_with_booking('Replace Hall')
+        seat_ids = set(theater.seats.values_list('id', flat=True))
+        with self.assertRaises(LayoutError):
+            apply_layout(theater, build_layout(3, 4), mode='replace')
+        self.assertEqual(set(theater.seats.values_list('id', flat=True)), seat_ids)
+
+        empty = Theater.objects.create(name='Empty Hall', location='Test', total_seats=0)
+        apply_layout(empty, build_layout(2, 5))
+        stats = apply_layout(empty, build_layout(3, 4), mode='replace')
+        self.assertEqual((stats['deleted'], stats['created'], stats['total_seats']), (10, 12, 12))
+        empty.refresh_from_db()
+        self.assertEqual(empty.total_seats, 12)
+
+    def test_template_theaters_are_validated_in_one_query(self):
+        theaters = [
+            Theater.objects.create(name=f'Template Hall {i}', location='Test', total_seats=0)
+            for i in range(3)
+        ]
+        theater_ids = [theater.pk for theater in theaters]
+
+        serializer = SeatLayoutApplySerializer(data={'theaters': theater_ids + [theater_ids[0]]})
+        with self.assertNumQueries(1):
+            self.assertTrue(serializer.is_valid(), serializer.errors)
+        self.assertEqual(serializer.validated_data['theaters'], theaters)
+
+        serializer = SeatLayoutApplySerializer(data={'theaters': theater_ids + [0]})
+        self.assertFalse(serializer.is_valid())
+        self.assertEqual(serializer.errors['theaters'], ['Theaters 0 not found.'])
+
+
+class SeatStreamTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = User.objects.create_user('stream_customer', 'stream@example.com', 'pass')
+        movie = Movie.objects.create(
+            title='Live Seats', genre='drama', duration=100,
+            language='English', release_date=timezone.now().date()
+        )
+        cls.theater = Theater.objects.create(name='Stream Hall', location='Test', total_seats=0)
+        apply_layout(cls.theater, build_layout(2, 5))
+        cls.show = Show.objects.create(
+            movie=movie, theater=cls.theater, show_date=timezone.now().date() + timedelta(days=1),
+            show_time=time(18), base_price=Decimal('10000.00')
+        )
+        recompute_show_counters(Show.objects.all())
+        cls.seats = list(cls.theater.seats.order_by('id'))
+
+    async def open_stream(self):
+        response = await self.async_client.get(f'/api/shows/{self.show.pk}/seats/stream/')
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        return response.streaming_content
+
+    async def next_event(self, events):
+        message = (await asyncio.wait_for(anext(events), 5)).decode()
+        fields = dict(line.split(': ', 1) for line in message.strip().splitlines())
+        return fields['event'], json.loads(fields['data'])
+
+    async def close(self, *streams):
+        # Closing the client's wrapper does not reach the event generator:
+        # drop the viewers from the feed directly and let it stop
+        feed = streams_module._feeds[self.show.pk]
+        for events in streams:
+            await events.aclose()
+        for queue in list(feed.subscribers):
+            feed.unsubscribe(queue)
+        await asyncio.wait_for(feed.task, 5)
+        self.assertNotIn(self.show.pk, streams_module._feeds)
+
+    @override_settings(SEAT_STREAM_POLL_INTERVAL=30)
+    async def test_snapshot_then_booked_and_released_seats(self):
+        def book(seats):
+            # Committed bookings wake the feed straight away, long before its next poll
+            with self.captureOnCommitCallbacks(execute=True):
+                return commit_booking(self.customer, self.show, seats)
+
+        def cancel(booking):
+            with self.captureOnCommitCallbacks(execute=True):
+                cancel_bookings(Booking.objects.filter(pk=booking.pk))
+
+        events = await self.open_stream()
+        event, snapshot = await self.next_event(events)
+        self.assertEqual(event, 'snapshot')
+        self.assertEqual((snapshot['show'], snapshot['seq']), (self.show.pk, 0))
+        self.assertEqual([seat['id'] for seat in snapshot['seats']], [seat.pk for seat in self.seats])
+        self.assertTrue(all(seat['is_available'] for seat in snapshot['seats']))
+
+        booking = await sync_to_async(book)(self.seats[:2])
+        event, delta = await self.next_event(events)
+        self.assertEqual(event, 'delta')
+        self.assertEqual(delta, {
+            'show': self.show.pk, 'seq': 1, 'booked': [seat.pk for seat in self.seats[:2]], 'released': [],
+        })
+
+        await sync_to_async(cancel)(booking)
+        event, delta = await self.next_event(events)
+        self.assertEqual((event, delta['seq'], delta['booked']), ('delta', 2, []))
+        self.assertEqual(delta['released'], [seat.pk for seat in self.seats[:2]])
+        await self.close(events)
+
+    async def test_snapshots_follow_price_and_layout_edits(self):
+        first = await self.open_stream()
+        _, snapshot = await self.next_event(first)
+        self.assertEqual(len(snapshot['seats']), 10)
+        self.assertEqual(snapshot['seats'][0]['final_price'], 15000.0)
+
+        # A viewer joining the running feed after the edits sees them
+        await Show.objects.filter(pk=self.show.pk).aupdate(base_price=Decimal('20000.00'))
+        await sync_to_async(apply_layout)(self.theater, build_layout(2, 4))
+        second = await self.open_stream()
+        event, snapshot = await self.next_event(second)
+        self.assertEqual(event, 'snapshot')
+        self.assertEqual(len(snapshot['seats']), 8)
+        self.assertEqual(snapshot['seats'][0]['final_price'], 30000.0)
+        await self.close(first, second)
+
+    async def test_snapshot_seq_matches_its_seat_state(self):
+        feed = streams_module.ShowSeatFeed(self.show)
+        feed.taken = set()
+        feed.loaded.set()
+        render = streams_module.render_seat_map
+
+        def render_during_poll(show, availability):
+            # The feed's poll lands while the snapshot is being rendered
+            feed.seq, feed.taken = 1, {self.seats[0].pk}
+            return render(show, availability)
+
+        with patch.object(streams_module, 'render_seat_map', render_during_poll):
+            message = await feed.snapshot()
+        data = json.loads(message.split('data: ', 1)[1])
+        # The viewer gets delta 1 next and applies it to this state
+        self.assertEqual(data['seq'], 0)
+        self.assertTrue(all(seat['is_available'] for seat in data['seats']))
+
+
+class IdempotencyKeyTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = User.objects.create_user('retry_customer', 'retry@example.com', 'pass')
+        movie = Movie.objects.create(
+            title='Second Take', genre='comedy', duration=95,
+            language='English', release_date=timezone.now().date()
+        )
+        theater = Theater.objects.create(name='Retry Hall', location='Test', total_seats=0)
+        apply_layout(theater, build_layout(2, 5))
+        cls.show = Show.objects.create(
+            movie=movie, theater=theater, show_date=timezone.now().date() + timedelta(days=1),
+            show_time=time(18), base_price=Decimal('10000.00')
+        )
+        recompute_show_counters(Show.objects.all())
+        cls.seats = list(theater.seats.order_by('id').values_list('id', flat=True))
+
+    def post(self, path, data, key):
+        client = APIClient()
+        client.force_authenticate(self.customer)
+        return client.post(path, data, format='json', HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_retries_replay_the_stored_result(self):
+        booking_data = {'show_id': self.show.pk, 'seat_ids': self.seats[:2]}
+        first = self.post('/api/bookings/', booking_data, 'booking-1')
+        self.assertEqual(first.status_code, 201, first.content)
+
+        # Only the key lookup
+        with self.assertNumQueries(1):
+            retry = self.post('/api/bookings/', booking_data, 'booking-1')
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry.json(), first.json())
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(Booking.objects.filter(user=self.customer).count(), 1)
+
+        # The same key with another body, or on another endpoint
+        other = self.post('/api/bookings/', {'show_id': self.show.pk, 'seat_ids': self.seats[2:4]}, 'booking-1')
+        self.assertEqual(other.status_code, 422)
+
+        booking_id = first.json()['booking']['id']
+        payment_data = {'booking_id': booking_id, 'payment_method': 'cash'}
+        paid = self.post('/api/payments/process/', payment_data, 'payment-1')
+        self.assertEqual(paid.status_code, 202, paid.content)
+        # Without the key a second payment would be rejected as in progress
+        self.assertEqual(self.post('/api/payments/process/', payment_data, 'payment-1').json(), paid.json())
+        self.assertEqual(self.post('/api/payments/process/', payment_data, 'payment-2').status_code, 400)
+
+    def test_failures_are_not_stored_and_keys_expire(self):
+        taken = {'show_id': self.show.pk, 'seat_ids': self.seats[:1]}
+        self.assertEqual(self.post('/api/bookings/', taken, 'first').status_code, 201)
+        self.assertEqual(self.post('/api/bookings/', taken, 'conflict').status_code, 400)
+        self.assertFalse(IdempotencyKey.objects.filter(key='conflict').exists())
+
+        # An expired key runs the request again
+        IdempotencyKey.objects.filter(key='first').update(expires_at=timezone.now())
+        response = self.post('/api/bookings/', {'show_id': self.show.pk, 'seat_ids': self.seats[1:2]}, 'first')
+        self.assertEqual(response.status_code, 201)
+        self.assertNotIn('Idempotent-Replayed', response)
+
+        IdempotencyKey.objects.update(expires_at=timezone.now())
+        self.assertEqual(purge_expired_keys(), 1)
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+    def test_claims_in_progress_are_not_run_twice(self):
+        booking_data = {'show_id': self.show.pk, 'seat_ids': self.seats[4:5]}
+        first = self.post('/api/bookings/', booking_data, 'slow')
+        # As seen by a duplicate while the first request is still running
+        row = IdempotencyKey.objects.get(key='slow')
+        IdempotencyKey.objects.filter(pk=row.pk).update(response_status=None, response_body=None)
+        self.assertEqual(self.post('/api/bookings/', booking_data, 'slow').status_code, 409)
+
+        # A claim whose request died is freed after the claim timeout
+        IdempotencyKey.objects.filter(pk=row.pk).update(expires_at=timezone.now())
+        Booking.objects.filter(pk=first.json()['booking']['id']).update(status='cancelled')
+        BookingSeat.objects.filter(booking_id=first.json()['booking']['id']).update(is_active=False)
+        retry = self.post('/api/bookings/', booking_data, 'slow')
+        self.assertEqual(retry.status_code, 201, retry.content)
+        self.assertGreater(
+            IdempotencyKey.objects.get(key='slow').expires_at,
+            timezone.now() + settings.IDEMPOTENCY_KEY_TTL - timedelta(minutes=1)
+        )
+
+
+class PaymentPipelineTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = User.objects.create_user('paying_customer', 'pay@example.com', 'pass')
+        movie = Movie.objects.create(
+            title='Cash Flow', genre='thriller', duration=110,
+            language='English', release_date=timezone.now().date()
+        )
+        theater = Theater.objects.create(name='Pipeline Hall', location='Test', total_seats=0)
+        apply_layout(theater, build_layout(2, 5))
+        cls.show = Show.objects.create(
+            movie=movie, theater=theater, show_date=timezone.now().date() + timedelta(days=1),
+            show_time=time(20), base_price=Decimal('10000.00')
+        )
+        cls.seats = list(theater.seats.order_by('id'))
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.customer)
+
+    def pay(self, booking):
+        return self.client.post('/api/payments/process/', {
+            'booking_id': booking.pk, 'payment_method': 'mobile_money'
+        }, format='json')
+
+    def test_payment_is_accepted_then_processed(self):
+        booking = commit_booking(self.customer, self.show, self.seats[:2])
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.pay(booking)
+        self.assertEqual(response.status_code, 202, response.content)
+        self.assertEqual(len(callbacks), 1)
+        status_url = response['Location']
+
+        state = self.client.get(status_url).json()
+        self.assertEqual((state['payment_status'], state['final']), ('pending', False))
+        booking.refresh_from_db()
+        self.assertEqual(booking.status, 'pending')
+        self.assertEqual(self.pay(booking).status_code, 400)
+
+        self.assertEqual(process_pending_payments(), 1)
+        self.assertEqual(process_pending_payments(), 0)
+        state = self.client.get(status_url).json()
+        self.assertEqual((state['payment_status'], state['final']), ('completed', True))
+        booking.refresh_from_db()
+        self.assertEqual(booking.status, 'confirmed')
+
+    def test_payment_in_flight_is_not_accepted_again(self):
+        booking = commit_booking(self.customer, self.show, self.seats[3:4])
+        self.assertEqual(self.pay(booking).status_code, 202)
+        # A concurrent request that passed validation before the payment was
+        # accepted, claimed or completed must not reset it to pending
+        for status in ('processing', 'pending', 'completed'):
+            Payment.objects.filter(booking=booking).update(payment_status=status)
+            with self.subTest(status=status), self.assertRaises(PaymentNotAcceptable):
+                accept_payment(booking.pk, 'card')
+            self.assertEqual(Payment.objects.get(booking=booking).payment_status, status)
+
+        Payment.objects.filter(booking=booking).update(payment_status='failed')
+        self.assertEqual(accept_payment(booking.pk, 'card').payment_status, 'pending')
+
+    def test_declined_and_late_charges_do_not_confirm(self):
+        declined = commit_booking(self.customer, self.show, self.seats[2:3])
+        self.pay(declined)
+        gateway = Mock()
+        gateway.charge.return_value = GatewayResult(False, message='Insufficient funds')
+        self.assertEqual(process_pending_payments(gateway=gateway), 1)
+        declined.refresh_from_db()
+        self.assertEqual(declined.status, 'pending')
+        self.assertEqual(declined.payment.failure_reason, 'Insufficient funds')
+
+        # The hold lapsed while the charge was in flight: record the refund,
+        # then call the gateway once the locks are released
+        late = commit_booking(self.customer, self.show, self.seats[3:4])
+        self.pay(late)
+        Booking.objects.filter(pk=late.pk).update(hold_expires_at=timezone.now())
+        gateway.charge.return_value = GatewayResult(True, 'TX-1')
+        gateway.refund.side_effect = ConnectionError('Gateway unreachable')
+        with self.captureOnCommitCallbacks(execute=True):
+            process_pending_payments(gateway=gateway)
+            self.assertEqual(Payment.objects.get(booking=late).payment_status, 'refund_pending')
+            gateway.refund.assert_not_called()
+        gateway.refund.assert_called_once()
+        late.refresh_from_db()
+        self.assertEqual(late.status, 'pending')
+        self.assertEqual(late.payment.payment_status, 'refund_pending')
+
+        # A failed refund is retried once it has been pending for a timeout
+        gateway.refund.side_effect = None
+        gateway.refund.return_value = GatewayResult(True, 'TX-1')
+        self.assertEqual(retry_refunds(gateway=gateway), 0)
+        later = timezone.now() + settings.PAYMENT_PROCESSING_TIMEOUT
+        self.assertEqual(retry_refunds(now=later, gateway=gateway), 1)
+        self.assertEqual(retry_refunds(now=later, gateway=gateway), 0)
+        late.payment.refresh_from_db()
+        self.assertEqual(late.payment.payment_status, 'failed')
+        self.assertEqual(late.payment.transaction_id, 'TX-1')
+
+        # A declined payment can be retried
+        self.assertEqual(self.pay(declined).status_code, 202)
+
+    def test_hold_outlives_a_requeued_charge(self):
+        booking = commit_booking(self.customer, self.show, self.seats[4:5])
+        self.pay(booking)
+        meanwhile = {}
+
+        def slow_charge(payment):
+            # The worker is still waiting on the gateway when the payment is
+            # requeued, and the sweeper runs then too
+            requeue_time = timezone.now() + settings.PAYMENT_PROCESSING_TIMEOUT
+            meanwhile['expired'] = release_expired_holds(now=requeue_time)
+            meanwhile['requeued'] = requeue_stale_payments(now=requeue_time)
+            return GatewayResult(True, 'TX-SLOW')
+
+        gateway = Mock()
+        gateway.charge.side_effect = slow_charge
+        self.assertEqual(process_pending_payments(gateway=gateway), 1)
+        self.assertEqual(meanwhile, {'expired': 0, 'requeued': 1})
+
+        # The slow answer completes the requeued payment, which is not
+        # charged a second time
+        booking.refresh_from_db()
+        self.assertEqual(booking.status, 'confirmed')
+        self.assertEqual(booking.payment.payment_status, 'completed')
+        self.assertEqual(process_pending_payments(gateway=gateway), 0)
+        gateway.charge.assert_called_once()
+        gateway.refund.assert_not_called()
+
+
+class SalesRollupTests(TestCase):
+
+    def test_incremental_rollups_match_rebuild(self):
+        customer = User.objects.create_user('rollup_customer', 'rollup@example.com', 'pass')
+        movie = Movie.objects.create(
+            title='Rollup Movie', genre='drama', duration=90,
+            language='English', release_date=timezone.now().date()
+        )
+        theater = Theater.objects.create(name='Rollup Hall', location='Test', total_seats=0)
+        apply_layout(theater, build_layout(2, 5))
+        show = Show.objects.create(
+            movie=movie, theater=theater, show_date=timezone.now().date() + timedelta(days=1),
+            show_time=time(18), base_price=Decimal('8000.00')
+        )
+        seats = list(theater.seats.order_by('id'))
+
+        bookings = [commit_booking(customer, show, seats[i:i + 2]) for i in (0, 2, 4)]
+        for booking in bookings[:2]:
+            Payment.objects.create(
+                booking=booking, payment_method='cash', amount=booking.total_amount,
+                payment_status='completed'
+            )
+        client = APIClient()
+        client.force_authenticate(customer)
+        response = client.post(f'/api/bookings/{bookings[0].pk}/cancel/')
+        self.assertEqual(response.status_code, 200, response.content)
+
+        def snapshot():
+            return sorted(SalesRollup.objects.values_list(
+                'granularity', 'bucket', 'theater_id', 'movie_id',
+                'bookings', 'seats_sold', 'revenue', 'refunds', 'refunded_seats'
+            ))
+
+        incremental = snapshot()
+        rebuild_sales_rollups()
+        self.assertEqual(incremental, snapshot())
+
+        today = sales_summary()['today']
+        self.assertEqual(today['bookings'], 3)
+        self.assertEqual(today['seats_sold'], 4)
+        self.assertEqual(today['revenue'], bookings[0].total_amount + bookings[1].total_amount)
+        self.assertEqual(today['refunds'], bookings[0].total_amount)
+        self.assertEqual(today['refunded_seats'], 2)
+
+    def test_catalog_totals_match_recount(self):
+        customer = User.objects.create_user('totals_customer', 'totals@example.com', 'pass')
+        User.objects.create_user('totals_admin', 'totals_admin@example.com', 'pass', role='admin')
+        movies = [
+            Movie.objects.create(
+                title=f'Totals Movie {i}', genre='drama', duration=90,
+                language='English', release_date=timezone.now().date()
+            )
+            for i in range(3)
+        ]
+        theater = Theater.objects.create(name='Totals Hall', location='Test', total_seats=0)
+        Theater.objects.create(name='Closed Hall', location='Test', total_seats=0, is_active=False)
+
+        movies[0].is_active = False
+        movies[0].save()
+        movies[1].delete()
+        customer.last_login = timezone.now()
+        customer.save(update_fields=['last_login'])
+        theater.is_active = False
+        theater.save()
+        theater.is_active = True
+        theater.save()
+
+        self.assertEqual(catalog_totals(), {'customers': 1, 'movies': 1, 'theaters': 1})
+        rebuild_catalog_totals()
+        self.assertEqual(catalog_totals(), {'customers': 1, 'movies': 1, 'theaters': 1})
+
+        # The dashboard reads them without counting the tables
+        with CaptureQueriesContext(connection) as ctx:
+            statistics = build_dashboard_snapshot()['statistics']
+        self.assertFalse([q for q in ctx.captured_queries if 'COUNT(*)' in q['sql'].upper()])
+        self.assertEqual(
+            (statistics['total_users'], statistics['total_movies'], statistics['total_theaters']),
+            (1, 1, 1)
+        )
+        self.assertEqual(statistics['revenue_basis'], 'net_of_refunds')
+
+
+class TransitionTests(TestCase):
+
+    def test_bulk_transitions_keep_counters_and_rollups_consistent(self):
+        customer = User.objects.create_user('transition_customer', 'transition@example.com', 'pass')
+        movie = Movie.objects.create(
+            title='Transition Movie', genre='drama', duration=90,
+            language='English', release_date=timezone.now().date()
+        )
+        theater = Theater.objects.create(name='Transition Hall', location='Test', total_seats=0)
+        apply_layout(theater, build_layout(2, 5))
+        shows = [
+            Show.objects.create(
+                movie=movie, theater=theater, show_date=timezone.now().date() + timedelta(days=day),
+                show_time=time(18), base_price=Decimal('8000.00')
+            )
+            for day in (1, 2)
+        ]
+        seats = list(theater.seats.order_by('id'))
+        recompute_show_counters(Show.objects.all())
+
+        confirmed, pending, paying, other_show = (
+            commit_booking(customer, shows[0], seats[0:2]),
+            commit_booking(customer, shows[0], seats[2:4]),
+            commit_booking(customer, shows[0], seats[4:6]),
+            commit_booking(customer, shows[1], seats[0:3]),
+        )
+        Payment.objects.create(
+            booking=paying, payment_method='cash', amount=paying.total_amount, payment_status='processing'
+        )
+        for booking in (confirmed, other_show):
+            Payment.objects.create(
+                booking=booking, payment_method='cash', amount=booking.total_amount, payment_status='pending'
+            )
+        self.assertEqual(sorted(confirm_bookings(Booking.objects.filter(pk__in=[confirmed.pk, other_show.pk]))),
+                         sorted([confirmed.pk, other_show.pk]))
+
+        cancelled = cancel_bookings(Booking.objects.filter(show__in=shows), 'Show cancelled')
+        self.assertEqual(sorted(cancelled), sorted([confirmed.pk, pending.pk, paying.pk, other_show.pk]))
+        self.assertEqual(cancel_bookings(Booking.objects.filter(show__in=shows)), [])
+        self.assertEqual(
+            dict(Payment.objects.values_list('booking_id', 'payment_status')),
+            {confirmed.pk: 'refunded', other_show.pk: 'refunded', paying.pk: 'failed'}
+        )
+
+        def counters():
+            return list(Show.objects.order_by('pk').values(
+                'total_seats_count', 'held_seats_count', 'sold_seats_count', 'regular_seats_remaining'
+            ))
+
+        def rollups():
+            return sorted(SalesRollup.objects.values_list(
+                'granularity', 'bucket', 'theater_id', 'movie_id',
+                'bookings', 'seats_sold', 'revenue', 'refunds', 'refunded_seats'
+            ))
+
+        incremental = counters(), rollups()
+        recompute_show_counters(Show.objects.all())
+        rebuild_sales_rollups()
+        self.assertEqual(incremental, (counters(), rollups()))
+        self.assertEqual(incremental[0][0]['sold_seats_count'], 0)
+        self.assertEqual(incremental[0][0]['held_seats_count'], 0)
+
+    def test_booking_requests_keep_counters_and_repair_restores_them(self):
+        admin = User.objects.create_user('transition_admin', 'transition_admin@example.com', 'pass', role='admin')
+        customer = User.objects.create_user('cycle_customer', 'cycle@example.com', 'pass')
+        movie = Movie.objects.create(
+            title='Cycle Movie', genre='drama', duration=90,
+            language='English', release_date=timezone.now().date()
+        )
+        theater = Theater.objects.create(name='Cycle Hall', location='Test', total_seats=0)
+        apply_layout(theater, build_layout(2, 5))
+        show = Show.objects.create(
+            movie=movie, theater=theater, show_date=timezone.now().date() + timedelta(days=1),
+            show_time=time(18), base_price=Decimal('8000.00')
+        )
+        seat_ids = list(theater.seats.order_by('id').values_list('id', flat=True))
+        recompute_show_counters(Show.objects.filter(pk=show.pk))
+
+        client = APIClient()
+        client.force_authenticate(customer)
+        booked = []
+        for i in range(4):
+            response = client.post('/api/bookings/', {
+                'show_id': show.pk, 'seat_ids': seat_ids[2 * i:2 * i + 2]
+            }, format='json')
+            self.assertEqual(response.status_code, 201, response.content)
+            booked.append(response.data['booking']['id'])
+        paid, cancelled, deleted, held = booked
+
+        for booking_id in (paid, deleted):
+            response = client.post('/api/payments/process/', {
+                'booking_id': booking_id, 'payment_method': 'mobile_money'
+            }, format='json')
+            self.assertEqual(response.status_code, 202, response.content)
+        self.assertEqual(process_pending_payments(), 2)
+        self.assertEqual(client.post(f'/api/bookings/{cancelled}/cancel/', {}, format='json').status_code, 200)
+
+        # An admin delete cancels and refunds instead of dropping the seats
+        client.force_authenticate(admin)
+        self.assertEqual(client.delete(f'/api/bookings/{deleted}/').status_code, 204)
+        self.assertEqual(
+            dict(Booking.objects.values_list('id', 'status')),
+            {paid: 'confirmed', cancelled: 'cancelled', deleted: 'cancelled', held: 'pending'}
+        )
+        self.assertEqual(Payment.objects.get(booking_id=deleted).payment_status, 'refunded')
+
+        def counters():
+            return Show.objects.values(
+                'total_seats_count', 'held_seats_count', 'sold_seats_count', 'regular_seats_remaining'
+            ).get(pk=show.pk)
+
+        incremental = counters()
+        self.assertEqual((incremental['held_seats_count'], incremental['sold_seats_count']), (2, 2))
+        recompute_show_counters(Show.objects.all())
+        self.assertEqual(counters(), incremental)
+
+        Show.objects.filter(pk=show.pk).update(held_seats_count=7, sold_seats_count=0, regular_seats_remaining=10)
+        call_command('repair_show_counters', show_ids=[show.pk], stdout=StringIO())
+        self.assertEqual(counters(), incremental)
+
+
+class ShowCancellationTests(TestCase):
+
+    def test_theater_shows_are_cancelled_and_refunded_in_bulk(self):
+        admin = User.objects.create_user('cancel_admin', 'cancel-admin@example.com', 'pass', role='admin')
+        customer = User.objects.create_user('cancel_customer', 'cancel@example.com', 'pass')
+        movie = Movie.objects.create(
+            title='Cancel Movie', genre='drama', duration=90,
+            language='English', release_date=timezone.now().date()
+        )
+        theater = Theater.objects.create(name='Cancel Hall', location='Test', total_seats=0)
+        apply_layout(theater, build_layout(2, 5))
+        first_day = timezone.now().date() + timedelta(days=1)
+        shows = [
+            Show.objects.create(
+                movie=movie, theater=theater, show_date=first_day + timedelta(days=day),
+                show_time=time(18), base_price=Decimal('8000.00')
+            )
+            for day in (0, 1, 2)
+        ]
+        recompute_show_counters(Show.objects.all())
+        seats = list(theater.seats.order_by('id'))
+        paid, pending, kept = [commit_booking(customer, show, seats[:2]) for show in shows]
+        Payment.objects.create(
+            booking=paid, payment_method='cash', amount=paid.total_amount, payment_status='completed'
+        )
+
+        client = APIClient()
+        client.force_authenticate(admin)
+        response = client.post('/api/admin/shows/cancel/', {
+            'theater': theater.pk, 'date_from': first_day, 'date_to': first_day + timedelta(days=1),
+            'reason': 'Projector failure',
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        lines = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+
+        self.assertEqual(lines[0]['summary']['shows_cancelled'], 2)
+        self.assertEqual(lines[0]['summary']['bookings_cancelled'], 2)
+        self.assertEqual(lines[0]['summary']['payments_refunded'], 1)
+        self.assertEqual(Decimal(lines[0]['summary']['refunded_amount']), paid.total_amount)
+        self.assertEqual(
+            [(row['booking_reference'], row['email'], row['refunded']) for row in lines[1:]],
+            [(paid.booking_reference, 'cancel@example.com', True),
+             (pending.booking_reference, 'cancel@example.com', False)]
+        )
+        self.assertEqual(
+            dict(Booking.objects.values_list('pk', 'status')),
+            {paid.pk: 'cancelled', pending.pk: 'cancelled', kept.pk: 'pending'}
+        )
+        self.assertEqual(
+            list(Show.objects.order_by('show_date').values_list('is_active', flat=True)), [False, False, True]
+        )
+
+        # A booking committed for a cancelled show rolls back
+        with self.assertRaises(ShowNotActiveError):
+            commit_booking(customer, shows[0], seats[2:4])
+        self.assertEqual(Booking.objects.count(), 3)
+
+    def test_listed_shows_are_validated_in_one_query(self):
+        movie = Movie.objects.create(
+            title='Listed Movie', genre='drama', duration=90,
+            language='English', release_date=timezone.now().date()
+        )
+        theater = Theater.objects.create(name='Listed Hall', location='Test', total_seats=0)
+        shows = [
+            Show.objects.create(
+                movie=movie, theater=theater, show_date=timezone.now().date() + timedelta(days=1),
+                show_time=time(10 + hour), base_price=Decimal('8000.00')
+            )
+            for hour in range(3)
+        ]
+        show_ids = [show.pk for show in shows]
+
+        serializer = ShowCancellationSerializer(data={'shows': show_ids + [show_ids[0]]})
+        with self.assertNumQueries(1):
+            self.assertTrue(serializer.is_valid(), serializer.errors)
+        self.assertEqual(serializer.validated_data['shows'], shows)
+
+        serializer = ShowCancellationSerializer(data={'shows': show_ids + [0]})
+        self.assertFalse(serializer.is_valid())
+        self.assertEqual(serializer.errors['shows'], ['Shows 0 not found.'])
+
+
+class BookingLifecycleTests(TestCase):
+
+    def test_confirmed_bookings_of_ended_shows_are_completed_in_chunks(self):
+        customer = User.objects.create_user('lifecycle_customer', 'lifecycle@example.com', 'pass')
+        movie = Movie.objects.create(
+            title='Lifecycle Movie', genre='drama', duration=90,
+            language='English', release_date=timezone.now().date()
+        )
+        theater = Theater.objects.create(name='Lifecycle Hall', location='Test', total_seats=0)
+        apply_layout(theater, build_layout(2, 5))
+        today = timezone.localdate()
+        now = timezone.make_aware(datetime.combine(today, time(23)))
+        shows = {
+            name: Show.objects.create(
+                movie=movie, theater=theater, show_date=today + timedelta(days=days),
+                show_time=show_time, base_price=Decimal('8000.00')
+            )
+            for name, days, show_time in [
+                ('last_week', -7, time(18)), ('earlier_today', 0, time(18)),
+                ('running', 0, time(22)), ('tomorrow', 1, time(18)),
+            ]
+        }
+        seats = list(theater.seats.order_by('id'))
+        bookings = {
+            name: [commit_booking(customer, show, seats[i:i + 1]) for i in range(3)]
+            for name, show in shows.items()
+        }
+        pending = bookings['last_week'].pop()
+        confirm_bookings(Booking.objects.exclude(pk=pending.pk))
+
+        self.assertEqual(complete_past_bookings(now, batch_size=2)[0], 5)
+        self.assertEqual(complete_past_bookings(now, batch_size=2)[0], 0)
+        completed = set(Booking.objects.filter(status='completed').values_list('pk', flat=True))
+        self.assertEqual(completed, {booking.pk for booking in bookings['last_week'] + bookings['earlier_today']})
+        self.assertEqual(Booking.objects.get(pk=pending.pk).status, 'pending')
+
+
+class ShowScheduleTests(TestCase):
+
+    def test_schedule_reports_taken_slots_and_prices_weekends(self):
+        admin = User.objects.create_user('schedule_admin', 'schedule-admin@example.com', 'pass', role='admin')
+        movie = Movie.objects.create(
+            title='Schedule Movie', genre='drama', duration=90,
+            language='English', release_date=timezone.now().date()
+        )
+        theater = Theater.objects.create(name='Schedule Hall', location='Test', total_seats=0)
+        apply_layout(theater, build_layout(2, 5))
+        today = timezone.localdate()
+        monday = today + timedelta(days=7 - today.weekday())
+        taken = Show.objects.create(
+            movie=movie, theater=theater, show_date=monday, show_time=time(18), base_price=Decimal('1.00')
+        )
+        client = APIClient()
+        client.force_authenticate(admin)
+        rule = {
+            'movie': movie.pk, 'theaters': [theater.pk], 'date_from': monday,
+            'date_to': monday + timedelta(days=6), 'times': ['14:00', '18:00'],
+            'base_price': '10000.00', 'weekend_multiplier': '1.2',
+        }
+
+        response = client.post('/api/shows/schedule/', {**rule, 'dry_run': True}, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(len(response.data['shows']), 13)
+        self.assertEqual(Show.objects.count(), 1)
+
+        response = client.post('/api/shows/schedule/', rule, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(len(response.data['shows']), 13)
+        self.assertEqual(
+            [(conflict['show_date'], conflict['conflicting_show']) for conflict in response.data['conflicts']],
+            [(monday, taken.pk)]
+        )
+        prices = dict(Show.objects.filter(show_time=time(14)).values_list('show_date', 'base_price'))
+        self.assertEqual(prices[monday], Decimal('10000.00'))
+        self.assertEqual(prices[monday + timedelta(days=5)], Decimal('12000.00'))
+        self.assertFalse(Show.objects.exclude(pk=taken.pk).filter(total_seats_count=0).exists())
+
+        response = client.post('/api/shows/schedule/', rule, format='json')
+        self.assertEqual((len(response.data['shows']), len(response.data['conflicts'])), (0, 14))
+
+
+class MovieSearchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        for title, genre, description in [
+            ('Interstellar', 'sci-fi', 'Explorers travel through a wormhole in space.'),
+            ('Space Cowboys', 'adventure', 'Retired pilots return to orbit.'),
+            ('The Dark Knight', 'action', 'Batman faces the Joker in Gotham.'),
+            ('Gotham Nights', 'drama', 'A quiet story set in a big city.'),
+        ]:
+            Movie.objects.create(
+                title=title, genre=genre, description=description, duration=120,
+                language='English', release_date=timezone.now().date()
+            )
+
+    def titles(self, text):
+        return list(search_movies(Movie.objects.all(), text).values_list('title', flat=True))
+
+    def test_search_is_ranked_and_tolerant(self):
+        # Title matches outrank description matches
+        self.assertEqual(self.titles('gotham'), ['Gotham Nights', 'The Dark Knight'])
+        self.assertEqual(self.titles('space')[0], 'Space Cowboys')
+        # Prefixes and typos
+        self.assertEqual(self.titles('interst'), ['Interstellar'])
+        self.assertEqual(self.titles('interstelar'), ['Interstellar'])
+        self.assertEqual(self.titles('dark knigth'), ['The Dark Knight'])
+        self.assertEqual(self.titles('!!'), [])
+
+    def test_autocomplete(self):
+        response = APIClient().get('/api/movies/autocomplete/', {'q': 'goth'})
+        self.assertEqual([movie['title'] for movie in response.json()][:2], ['Gotham Nights', 'The Dark Knight'])
+        self.assertEqual(set(response.json()[0]), {'id', 'title', 'genre', 'release_date'})
+        self.assertEqual(APIClient().get('/api/movies/autocomplete/', {'q': 'g'}).json(), [])
+
+    def test_language_filter_can_use_trigram_index(self):
+        response = APIClient().get('/api/movies/', {'language': 'engl'})
+        self.assertEqual(response.data['count'], 4)
+        # icontains compiles to UPPER(language) LIKE UPPER(...); with plain
+        # scans disabled the only plan left is the expression index
+        queryset = Movie.objects.filter(language__icontains='engl')
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute('SET LOCAL enable_indexscan = off')
+            self.assertIn('movies_language_trgm_idx', queryset.explain())
+
+
+class KeysetPaginationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        movie = Movie.objects.create(
+            title='Paging Movie', genre='drama', duration=90,
+            language='English', release_date=timezone.now().date()
+        )
+        theaters = [
+            Theater.objects.create(name=f'Paging Hall {i}', location='Test', total_seats=0)
+            for i in range(5)
+        ]
+        start = timezone.now().date() + timedelta(days=1)
+        # Repeated dates and times, so the id tie-breaker matters
+        Show.objects.bulk_create([
+            Show(movie=movie, theater=theaters[i % 5], show_date=start + timedelta(days=i % 2),
+                 show_time=time(10 + i // 5), base_price=Decimal('5000.00'))
+            for i in range(25)
+        ])
+        cls.expected = list(Show.objects.order_by('show_date', 'show_time', 'id').values_list('id', flat=True))
+
+    def walk(self, url, link):
+        client, ids, pages = APIClient(), [], []
+        while url:
+            with CaptureQueriesContext(connection) as ctx:
+                response = client.get(url)
+            self.assertEqual(response.status_code, 200, response.content)
+            self.assertFalse(any('COUNT(' in query['sql'] for query in ctx.captured_queries))
+            pages.append(response.json())
+            ids.extend(show['id'] for show in response.json()['results'])
+            url = response.json()[link]
+        return ids, pages
+
+    def test_cursor_pages_cover_the_ordering_both_ways(self):
+        ids, pages = self.walk('/api/shows/?pagination=cursor', 'next')
+        self.assertEqual(ids, self.expected)
+        self.assertEqual(len(pages), 3)
+        self.assertIsNone(pages[0]['previous'])
+
+        # Walking back from the last page returns the earlier pages unchanged
+        _, back_pages = self.walk(pages[-1]['previous'], 'previous')
+        self.assertEqual(
+            [page['results'] for page in back_pages],
+            [page['results'] for page in reversed(pages[:-1])]
+        )
+
+    def test_counts_and_invalid_cursor(self):
+        client = APIClient()
+        page = client.get('/api/shows/').json()
+        self.assertEqual(page['count'], 25)
+        self.assertNotIn('count_is_approximate', page)
+
+        page = client.get('/api/shows/', {'count': 'approximate'}).json()
+        self.assertTrue(page['count_is_approximate'])
+        self.assertEqual(len(page['results']), 10)
+
+        page = client.get('/api/shows/', {'pagination': 'cursor', 'count': 'exact'}).json()
+        self.assertEqual(page['count'], 25)
+        self.assertEqual(client.get('/api/shows/', {'cursor': 'not-a-cursor'}).status_code, 404)
+
+    def test_low_estimates_do_not_hide_rows(self):
+        client = APIClient()
+        ids = []
+        with patch('api.pagination.estimated_count', return_value=3):
+            for number in (1, 2, 3):
+                page = client.get('/api/shows/', {'count': 'approximate', 'page': number}).json()
+                self.assertEqual(page['count'], 3)
+                ids.extend(show['id'] for show in page['results'])
+            self.assertIsNone(page['next'])
+            self.assertIsNotNone(page['previous'])
+            self.assertEqual(client.get('/api/shows/', {'count': 'approximate', 'page': 4}).status_code, 404)
+        self.assertEqual(sorted(ids), sorted(self.expected))
+
+    def test_tampered_cursor_values_are_not_found(self):
+        def cursor(position):
+            return base64.urlsafe_b64encode(json.dumps({'p': position}).encode()).decode()
+
+        customer = User.objects.create_user('paging_customer', 'paging@example.com', 'pass')
+        client = APIClient()
+        client.force_authenticate(customer)
+        for position in (['not-a-date', 1], [None, None], [{'a': 1}, 2], ['2026-01-01T00:00:00', 'abc']):
+            with self.subTest(position=position):
+                response = client.get('/api/bookings/', {'cursor': cursor(position)})
+                self.assertEqual(response.status_code, 404)
+        for position in (['2026-01-01', '25:99', 1], ['2026-01-01', [1], 1], ['2026-01-01', '10:00', None]):
+            with self.subTest(position=position):
+                self.assertEqual(client.get('/api/shows/', {'cursor': cursor(position)}).status_code, 404)
+        valid = cursor(['2026-01-01', '10:00:00', 1])
+        self.assertEqual(client.get('/api/shows/', {'cursor': valid}).status_code, 200)
+
+
+class ConditionalGetTests(TestCase):
+
+    def setUp(self):
+        catalog_cache.clear()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = User.objects.create_user('etag_customer', 'etag@example.com', 'pass')
+        cls.movie = Movie.objects.create(
+            title='Validator', genre='drama', duration=100,
+            language='English', release_date=timezone.now().date()
+        )
+        cls.theater = Theater.objects.create(name='ETag Hall', location='Test', total_seats=0)
+        apply_layout(cls.theater, build_layout(2, 5))
+        cls.show = Show.objects.create(
+            movie=cls.movie, theater=cls.theater, show_date=timezone.now().date() + timedelta(days=1),
+            show_time=time(18), base_price=Decimal('10000.00')
+        )
+
+    def revalidate(self, path, response, **headers):
+        with CaptureQueriesContext(connection) as ctx:
+            revalidated = APIClient().get(path, HTTP_IF_NONE_MATCH=response['ETag'], **headers)
+        return revalidated, ctx
+
+    def test_unchanged_responses_are_not_modified(self):
+        for path in ['/api/movies/', f'/api/movies/{self.movie.pk}/', '/api/shows/',
+                     f'/api/theaters/{self.theater.pk}/shows/', f'/api/shows/{self.show.pk}/']:
+            with self.subTest(path):
+                response = APIClient().get(path)
+                self.assertEqual(response.status_code, 200)
+                self.assertIn('Last-Modified', response)
+                revalidated, _ = self.revalidate(path, response)
+                self.assertEqual(revalidated.status_code, 304)
+                self.assertEqual(revalidated.content, b'')
+                self.assertEqual(revalidated['ETag'], response['ETag'])
+
+        # Admins see inactive rows, so they get their own validators
+        admin = User.objects.create_user('etag_admin', 'etag-admin@example.com', 'pass', role='admin')
+        client = APIClient()
+        client.force_authenticate(admin)
+        self.assertNotEqual(client.get('/api/movies/')['ETag'], APIClient().get('/api/movies/')['ETag'])
+
+    def test_changes_invalidate_validators(self):
+        response = APIClient().get('/api/shows/')
+        self.movie.title = 'Validator Returns'
+        self.movie.save()
+        self.assertEqual(self.revalidate('/api/shows/', response)[0].status_code, 200)
+
+        path = f'/api/theaters/{self.theater.pk}/'
+        response = APIClient().get(path)
+        modified_since = {'HTTP_IF_MODIFIED_SINCE': response['Last-Modified']}
+        self.assertEqual(APIClient().get(path, **modified_since).status_code, 304)
+        apply_layout(self.theater, build_layout(3, 5))
+        self.assertEqual(self.revalidate(path, response)[0].status_code, 200)
+
+    def test_seat_map_revalidates_until_bookings_change(self):
+        path = f'/api/shows/{self.show.pk}/seats/'
+        response = APIClient().get(path)
+        revalidated, ctx = self.revalidate(path, response)
+        self.assertEqual(revalidated.status_code, 304)
+        # The show and its taken seats; the cached layout is not read
+        self.assertEqual(len(ctx.captured_queries), 2)
+
+        booking = commit_booking(self.customer, self.show, list(self.theater.seats.order_by('id')[:2]))
+        response = self.revalidate(path, response)[0]
+        self.assertEqual(response.status_code, 200)
+
+        # A lapsed hold frees its seats without any write
+        Booking.objects.filter(pk=booking.pk).update(hold_expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(self.revalidate(path, response)[0].status_code, 200)
+
+
+class CatalogCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = User.objects.create_user('cache_customer', 'cache@example.com', 'pass')
+        cls.admin = User.objects.create_user('cache_admin', 'cache-admin@example.com', 'pass', role='admin')
+        cls.movie = Movie.objects.create(
+            title='Cached', genre='drama', duration=100,
+            language='English', release_date=timezone.now().date()
+        )
+        cls.theater = Theater.objects.create(name='Cache Hall', location='Test', total_seats=0)
+        apply_layout(cls.theater, build_layout(2, 5))
+        cls.show = Show.objects.create(
+            movie=cls.movie, theater=cls.theater, show_date=timezone.now().date() + timedelta(days=1),
+            show_time=time(18), base_price=Decimal('10000.00')
+        )
+        recompute_show_counters(Show.objects.filter(pk=cls.show.pk))
+        cls.show.refresh_from_db()
+
+    def setUp(self):
+        catalog_cache.clear()
+
+    def get(self, path, user=None):
+        client = APIClient()
+        if user is not None:
+            client.force_authenticate(user)
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.get(path)
+        return response, len(ctx.captured_queries)
+
+    def test_hits_are_served_without_queries(self):
+        response, _ = self.get('/api/shows/')
+        self.assertEqual(response['X-Catalog-Cache'], 'miss')
+
+        catalog_cache.local_cache.clear()
+        hit, queries = self.get('/api/shows/')
+        self.assertEqual((hit['X-Catalog-Cache'], queries), ('hit-shared', 0))
+        hit, queries = self.get('/api/shows/')
+        self.assertEqual((hit['X-Catalog-Cache'], queries), ('hit-local', 0))
+        self.assertEqual(hit.content, response.content)
+
+        # Hits revalidate like fresh responses
+        revalidated = APIClient().get('/api/shows/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(revalidated.status_code, 304)
+
+        # Admins see inactive rows: separate entries
+        self.assertEqual(self.get('/api/shows/', self.admin)[0]['X-Catalog-Cache'], 'miss')
+        stats = catalog_cache.cache_stats()
+        self.assertEqual((stats['local_hits'], stats['shared_hits'], stats['misses']), (2, 1, 2))
+
+    def test_changes_invalidate_dependent_entries(self):
+        paths = ['/api/movies/', f'/api/movies/{self.movie.pk}/', '/api/theaters/',
+                 f'/api/theaters/{self.theater.pk}/', '/api/shows/']
+        for path in paths:
+            self.get(path)
+
+        # A booking moves the show counters through a queryset update
+        commit_booking(self.customer, self.show, list(self.theater.seats.order_by('id')[:2]))
+        response, queries = self.get('/api/shows/')
+        self.assertEqual(response['X-Catalog-Cache'], 'miss')
+        self.assertEqual(response.json()['results'][0]['available_seats'], 8)
+        self.assertEqual(self.get('/api/movies/')[0]['X-Catalog-Cache'], 'hit-local')
+
+        self.movie.title = 'Cached Again'
+        self.movie.save()
+        for path in ['/api/movies/', f'/api/movies/{self.movie.pk}/', '/api/shows/']:
+            self.assertEqual(self.get(path)[0]['X-Catalog-Cache'], 'miss', path)
+        self.assertEqual(self.get('/api/theaters/')[0]['X-Catalog-Cache'], 'hit-local')
+
+        self.theater.seats.order_by('id').last().delete()
+        self.assertEqual(self.get(f'/api/theaters/{self.theater.pk}/')[0]['X-Catalog-Cache'], 'miss')
+        response = self.get('/api/theaters/')[0]
+        self.assertEqual(response['X-Catalog-Cache'], 'miss')
+        self.assertEqual(response.json()['results'][0]['seats_count'], 9)
+
+        response = self.get('/api/admin/cache/metrics/', self.admin)[0]
+        self.assertGreater(response.json()['invalidations'], 0)
+
+    def test_bookings_drop_only_the_lists_showing_their_show(self):
+        other_movie = Movie.objects.create(
+            title='Cached Elsewhere', genre='drama', duration=100,
+            language='English', release_date=timezone.now().date()
+        )
+        other_show = Show.objects.create(
+            movie=other_movie, theater=self.theater, show_date=self.show.show_date,
+            show_time=time(10), base_price=Decimal('10000.00')
+        )
+        recompute_show_counters(Show.objects.filter(pk=other_show.pk))
+        untouched = [f'/api/shows/?movie={self.movie.pk}', f'/api/movies/{self.movie.pk}/shows/']
+        dropped = [
+            f'/api/shows/?movie={other_movie.pk}', f'/api/movies/{other_movie.pk}/shows/',
+            f'/api/theaters/{self.theater.pk}/shows/', '/api/shows/',
+        ]
+        for path in untouched + dropped:
+            self.assertEqual(self.get(path)[0]['X-Catalog-Cache'], 'miss', path)
+
+        commit_booking(self.customer, other_show, list(self.theater.seats.order_by('id')[:1]))
+        for path in untouched:
+            self.assertEqual(self.get(path)[0]['X-Catalog-Cache'], 'hit-local', path)
+        for path in dropped:
+            self.assertEqual(self.get(path)[0]['X-Catalog-Cache'], 'miss', path)
+        self.assertEqual(self.get('/api/shows/')[0]['X-Catalog-Cache'], 'hit-local')
+
+    @override_settings(SEAT_HOLD_TTL=timedelta(minutes=1))
+    def test_lapsed_holds_count_as_available_before_the_sweep(self):
+        booking = commit_booking(self.customer, self.show, list(self.theater.seats.order_by('id')[:2]))
+        held = self.get('/api/shows/')[0]
+        self.assertEqual(held.json()['results'][0]['available_seats'], 8)
+        # The entry expires with the hold, not after the full timeout
+        expires, _ = next(iter(catalog_cache.local_cache.entries.values()))
+        self.assertLessEqual(expires - time_module.monotonic(), 60)
+
+        Booking.objects.filter(pk=booking.pk).update(hold_expires_at=timezone.now() - timedelta(seconds=1))
+        catalog_cache.clear()
+        paths = ['/api/shows/', f'/api/movies/{self.movie.pk}/shows/', f'/api/theaters/{self.theater.pk}/shows/']
+        for path in paths:
+            response = self.get(path)[0]
+            results = response.json()['results'] if path == '/api/shows/' else response.json()
+            self.assertEqual(results[0]['available_seats'], 10, path)
+        # The show row is unchanged, yet the list's ETag moves
+        self.assertNotEqual(self.get('/api/shows/')[0]['ETag'], held['ETag'])
+        self.show.refresh_from_db()
+        self.assertEqual(self.show.held_seats_count, 2)
+
+
+class DashboardSnapshotTests(TestCase):
+
+    def setUp(self):
+        self.shared = caches[settings.DASHBOARD_CACHE_ALIAS]
+        self.shared.clear()
+
+    def test_fresh_snapshot_is_served_from_cache(self):
+        snapshot = get_dashboard_snapshot()
+        self.assertIn('generated_at', snapshot)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_dashboard_snapshot(), snapshot)
+
+    @override_settings(DASHBOARD_SNAPSHOT_TTL=0)
+    def test_stale_snapshot_is_rebuilt_by_one_request(self):
+        stale = get_dashboard_snapshot()
+
+        # A lock in a per-process cache does not stop the rebuild
+        cache.add(REBUILD_LOCK_KEY, True)
+        self.assertGreater(get_dashboard_snapshot()['generated_at'], stale['generated_at'])
+        cache.delete(REBUILD_LOCK_KEY)
+        stale = get_dashboard_snapshot()
+
+        # Another worker is rebuilding: keep serving the stale snapshot
+        self.shared.add(REBUILD_LOCK_KEY, True)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_dashboard_snapshot()['generated_at'], stale['generated_at'])
+
+        self.shared.delete(REBUILD_LOCK_KEY)
+        self.assertGreater(get_dashboard_snapshot()['generated_at'], stale['generated_at'])
+        self.assertIsNone(self.shared.get(REBUILD_LOCK_KEY))
+
+
+class QueryCountMiddlewareTests(TestCase):
+
+    def setUp(self):
+        catalog_cache.clear()
+
+    @override_settings(QUERY_COUNT_HEADERS=True)
+    def test_headers_report_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = APIClient().get('/api/movies/')
+        self.assertEqual(response['X-Query-Count'], str(len(ctx.captured_queries)))
+        self.assertIn('X-DB-Time-Ms', response)
+        self.assertIn('SELECT', response['X-DB-Slowest'])
+
+    @override_settings(QUERY_STATS_LOG_INTERVAL=1)
+    def test_budget_overrun_is_logged(self):
+        with patch.dict(views.MovieViewSet.query_budgets, {'list': 0}):
+            with self.assertLogs('api.queries', 'WARNING') as logs:
+                response = APIClient().get('/api/movies/')
+        self.assertNotIn('X-Query-Count', response)
+        self.assertIn('(budget 0)', logs.output[0])
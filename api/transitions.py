@@ -0,0 +1,178 @@
+"""
+Movie Ticket Booking System - Booking and Payment Transitions
+
+DAR ES SALAAM INSTITUTE OF TECHNOLOGY
+MODULE CODE: COU 07503
+MODULE NAME: WEB APPLICATION DEVELOPMENT
+
+Every status change of bookings and payments goes through this module.
+A transition takes a Booking or Payment queryset, so the same call handles
+one booking from a request or every booking of a show from an operational
+job, and runs as one transaction of set-based statements:
+
+1. lock the affected rows in ID order and read their current status
+2. one UPDATE per table for the new status
+3. one UPDATE per show for the seat counters (api.inventory)
+4. one upsert for the sales rollups (api.rollups)
+
+    confirm   pending bookings -> confirmed, their payments -> completed
+    cancel    pending/confirmed bookings -> cancelled and their seats freed;
+              completed payments are refunded, payments in flight failed
+    refund    completed payments -> refunded; the booking is left as is
+    complete  confirmed bookings -> completed
+
+Rows not in a transition's source status are skipped, so repeating a
+transition changes nothing. Each returns the IDs of the bookings it
+changed.
+"""
+
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Case, Count, F, Q, Value, When
+from django.utils import timezone
+
+from .inventory import adjust_show_counters, counter_bucket
+from .models import Booking, BookingSeat, Payment
+from .rollups import record_refunds, record_sales
+from .streams import notify_seats_changed
+
+
+# Booking statuses each transition starts from
+CONFIRMABLE_STATUSES = ['pending']
+CANCELLABLE_STATUSES = ['pending', 'confirmed']
+COMPLETABLE_STATUSES = ['confirmed']
+
+# Payments still waiting for the provider (api.payments)
+IN_FLIGHT_PAYMENT_STATUSES = ['pending', 'processing']
+
+
+def _lock(bookings, statuses, skip_locked=False):
+    """(id, show_id, status) of the bookings in ``statuses``, locked in ID order"""
+    return list(
+        bookings.filter(status__in=statuses)
+        .select_for_update(of=('self',), skip_locked=skip_locked)
+        .order_by('pk')
+        .values_list('id', 'show_id', 'status')
+    )
+
+
+def _move_counters(rows, new_status):
+    """
+    Move the seats of locked bookings to the counter bucket of
+    ``new_status``: one query for their seat types, then one UPDATE per
+    show and old bucket, in show order.
+    """
+    new_bucket = counter_bucket(new_status)
+    moving = [booking_id for booking_id, _, status in rows if counter_bucket(status) != new_bucket]
+    if not moving:
+        return
+
+    seats = (
+        BookingSeat.objects.filter(booking_id__in=moving, is_active=True)
+        .values_list('show_id', 'booking__status', 'seat__seat_type')
+        .annotate(count=Count('id'))
+        .order_by()
+    )
+    seat_types = defaultdict(list)
+    for show_id, status, seat_type, count in seats:
+        seat_types[show_id, counter_bucket(status)].extend([seat_type] * count)
+    for (show_id, old_bucket), types in sorted(seat_types.items(), key=lambda item: item[0][0]):
+        adjust_show_counters(show_id, types, old_bucket, new_bucket)
+
+
+def confirm_bookings(bookings, now=None):
+    """Confirm pending bookings and complete their payments"""
+    now = now or timezone.now()
+    with transaction.atomic():
+        rows = _lock(bookings, CONFIRMABLE_STATUSES)
+        booking_ids = [booking_id for booking_id, _, _ in rows]
+        if not booking_ids:
+            return []
+
+        _move_counters(rows, 'confirmed')
+        Booking.objects.filter(pk__in=booking_ids).update(status='confirmed', updated_at=now)
+        Payment.objects.filter(booking_id__in=booking_ids).exclude(payment_status='completed').update(
+            payment_status='completed', payment_date=now, failure_reason='', updated_at=now
+        )
+        record_sales(booking_ids, now)
+    return booking_ids
+
+
+def payment_completed(payment):
+    """
+    Confirm the booking of a payment saved as completed directly (admin,
+    fixtures); the sale is counted whatever the booking's status.
+    """
+    with transaction.atomic():
+        rows = _lock(Booking.objects.filter(pk=payment.booking_id), CONFIRMABLE_STATUSES)
+        if rows:
+            _move_counters(rows, 'confirmed')
+            Booking.objects.filter(pk=payment.booking_id).update(status='confirmed', updated_at=payment.payment_date)
+        record_sales([payment.booking_id], payment.payment_date)
+
+
+def cancel_bookings(bookings, reason='', now=None):
+    """
+    Cancel pending and confirmed bookings: free their seats, refund
+    completed payments and fail payments still in flight.
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        rows = _lock(bookings, CANCELLABLE_STATUSES)
+        booking_ids = [booking_id for booking_id, _, _ in rows]
+        if not booking_ids:
+            return []
+
+        _move_counters(rows, 'cancelled')
+        Booking.objects.filter(pk__in=booking_ids).update(
+            status='cancelled', notes=f"Cancelled: {reason or 'No reason provided'}", updated_at=now
+        )
+        BookingSeat.objects.filter(booking_id__in=booking_ids, is_active=True).update(is_active=False)
+
+        # Refund completed payments and fail those in flight in one UPDATE;
+        # the locked bookings keep them from completing meanwhile
+        record_refunds(booking_ids, now)
+        completed = Q(payment_status='completed')
+        Payment.objects.filter(
+            booking_id__in=booking_ids, payment_status__in=['completed'] + IN_FLIGHT_PAYMENT_STATUSES
+        ).update(
+            payment_status=Case(When(completed, then=Value('refunded')), default=Value('failed')),
+            failure_reason=Case(When(completed, then=F('failure_reason')), default=Value('The booking was cancelled.')),
+            updated_at=now,
+        )
+        for show_id in sorted({show_id for _, show_id, _ in rows}):
+            notify_seats_changed(show_id)
+    return booking_ids
+
+
+def refund_payments(payments, now=None):
+    """Refund completed payments"""
+    now = now or timezone.now()
+    with transaction.atomic():
+        booking_ids = list(
+            payments.filter(payment_status='completed')
+            .select_for_update(of=('self',))
+            .order_by('pk')
+            .values_list('booking_id', flat=True)
+        )
+        if not booking_ids:
+            return []
+
+        record_refunds(booking_ids, now)
+        Payment.objects.filter(booking_id__in=booking_ids).update(payment_status='refunded', updated_at=now)
+    return booking_ids
+
+
+def complete_bookings(bookings, now=None, skip_locked=False):
+    """
+    Mark confirmed bookings completed (their seats stay sold). With
+    ``skip_locked``, bookings other transactions hold are left alone.
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        rows = _lock(bookings, COMPLETABLE_STATUSES, skip_locked)
+        booking_ids = [booking_id for booking_id, _, _ in rows]
+        if booking_ids:
+            Booking.objects.filter(pk__in=booking_ids).update(status='completed', updated_at=now)
+    return booking_ids
@@ -8,12 +8,14 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView, TokenVerifyView
 from . import views
+from .streams import payment_status_stream, show_seat_stream
 
 # Create a router and register viewsets
 router = DefaultRouter()
 router.register(r'movies', views.MovieViewSet, basename='movie')
 router.register(r'theaters', views.TheaterViewSet, basename='theater')
 router.register(r'seats', views.SeatViewSet, basename='seat')
+router.register(r'seat-layouts', views.SeatLayoutTemplateViewSet, basename='seat-layout')
 router.register(r'shows', views.ShowViewSet, basename='show')
 router.register(r'bookings', views.BookingViewSet, basename='booking')
 router.register(r'payments', views.PaymentViewSet, basename='payment')
@@ -39,8 +41,15 @@ urlpatterns = [
     # Payment processing
     path('payments/process/', views.ProcessPaymentView.as_view(), name='process-payment'),
     
+    # Live seat map and payment status (Server-Sent Events)
+    path('shows/<int:pk>/seats/stream/', show_seat_stream, name='show-seat-stream'),
+    path('payments/<int:pk>/status/stream/', payment_status_stream, name='payment-status-stream'),
+    
     # Admin dashboard
     path('admin/dashboard/', views.AdminDashboardView.as_view(), name='admin-dashboard'),
+    path('admin/holds/metrics/', views.SeatHoldMetricsView.as_view(), name='admin-hold-metrics'),
+    path('admin/cache/metrics/', views.CatalogCacheMetricsView.as_view(), name='admin-cache-metrics'),
+    path('admin/shows/cancel/', views.ShowCancellationView.as_view(), name='admin-show-cancel'),
     
     # Router URLs (CRUD operations for all models)
     path('', include(router.urls)),
@@ -12,22 +12,46 @@ Implements CRUD operations for all entities and business logic.
 from rest_framework import viewsets, generics, status, permissions
 from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
+from rest_framework.reverse import reverse
 from rest_framework.views import APIView
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import authenticate, login, logout
-from django.db.models import Q, Count
-from django.db import models
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q, Count, F, Max
 from django.utils import timezone
+from django.conf import settings
+from django.http import StreamingHttpResponse
 from datetime import datetime, timedelta
+import json
 
-from .models import User, Movie, Theater, Seat, Show, Booking, BookingSeat, Payment
+from .models import User, Movie, Theater, Seat, SeatLayoutTemplate, Show, Booking, BookingSeat, Payment
+from .availability import SeatAvailability
+from .catalog_cache import cache_stats, catalog_cached, entry_key, generations, get_or_set
+from .conditional import ConditionalListMixin, Validators, conditional_get, latest, rows_validators
+from .layout_cache import layout_changed, render_seat_map
+from .bookings import with_booking_details, with_seats_count
+from .holds import hold_metrics
+from .inventory import lapsed_holds
+from .payments import payment_state
+from .idempotency import idempotent
+from .transitions import cancel_bookings
+from .cancellations import cancel_shows, notification_rows, select_shows
+from .schedules import create_schedule, plan_shows
+from .dashboard import get_dashboard_snapshot
+from .search import autocomplete_movies, search_movies
+from .layouts import (
+    LayoutError, apply_layout, apply_layout_to_theaters, build_layout, build_template_layout, seats_changed
+)
 from .serializers import (
     UserSerializer, UserRegistrationSerializer, ChangePasswordSerializer, LoginSerializer,
     MovieListSerializer, MovieDetailSerializer, MovieCreateUpdateSerializer,
     TheaterListSerializer, TheaterDetailSerializer, TheaterCreateUpdateSerializer,
-    SeatSerializer, SeatCreateSerializer, SeatAvailabilitySerializer,
+    SeatSerializer, SeatCreateSerializer,
+    SeatLayoutTemplateSerializer, SeatGenerationSerializer, SeatLayoutApplySerializer,
     ShowListSerializer, ShowDetailSerializer, ShowCreateUpdateSerializer,
-    BookingListSerializer, BookingDetailSerializer, BookingCreateSerializer, BookingCancelSerializer,
+    ShowScheduleSerializer, ShowCancellationSerializer,
+    BookingListSerializer, BookingListRowSerializer, BookingDetailSerializer, BookingCreateSerializer, BookingCancelSerializer,
+    GroupBookingCreateSerializer,
     PaymentSerializer, PaymentCreateSerializer
 )
 
@@ -168,20 +192,50 @@ class ChangePasswordView(APIView):
         }, status=status.HTTP_200_OK)
 
 
+# ==================== SHOW LISTS ====================
+
+def show_list_state(shows):
+    """
+    (rows_validators keyword arguments, serializer context) for a list of
+    shows: the seats of lapsed holds count as available before the sweeper
+    releases them, and cached lists depend on the seat counters of exactly
+    the shows they render
+    """
+    lapsed = lapsed_holds(shows)
+    options = {
+        'extra': sorted(lapsed.seats.items()),
+        'expires_at': lapsed.next_expiry,
+        'tags': generations([f'show:{show.pk}' for show in shows]),
+    }
+    return options, {'lapsed_holds': lapsed}
+
+
+def show_list_response(request, shows):
+    """Conditional response for a list of shows (see show_list_state)"""
+    options, context = show_list_state(shows)
+    validators = rows_validators(request, shows, related=('movie', 'theater'), **options)
+    return conditional_get(
+        request, validators, lambda: Response(ShowListSerializer(shows, many=True, context=context).data)
+    )
+
+
 # ==================== MOVIE VIEWS ====================
 
-class MovieViewSet(viewsets.ModelViewSet):
+class MovieViewSet(ConditionalListMixin, viewsets.ModelViewSet):
     """
     API endpoint for movies.
     
-    list: GET /api/movies/ - List all active movies
+    list: GET /api/movies/ - List all active movies (?search= for ranked search)
+    autocomplete: GET /api/movies/autocomplete/?q= - Title suggestions
     retrieve: GET /api/movies/{id}/ - Get movie details
     create: POST /api/movies/ - Create movie (Admin only)
     update: PUT /api/movies/{id}/ - Update movie (Admin only)
     partial_update: PATCH /api/movies/{id}/ - Partial update (Admin only)
     destroy: DELETE /api/movies/{id}/ - Delete movie (Admin only)
     """
-    queryset = Movie.objects.all()
+    # Maximum queries per request, enforced by api.tests.QueryBudgetTests
+    query_budgets = {'list': 2, 'retrieve': 1, 'shows': 3, 'autocomplete': 1}
+    queryset = Movie.objects.defer('search_vector')
     
     def get_serializer_class(self):
         if self.action == 'list':
@@ -196,7 +250,8 @@ class MovieViewSet(viewsets.ModelViewSet):
         return [permissions.AllowAny()]
     
     def get_queryset(self):
-        queryset = Movie.objects.all()
+        # The search vector is only read by the database (api.search)
+        queryset = Movie.objects.defer('search_vector')
         
         # Filter only active movies for non-admin users
         if not self.request.user.is_authenticated or self.request.user.role != 'admin':
@@ -207,33 +262,67 @@ class MovieViewSet(viewsets.ModelViewSet):
         if genre:
             queryset = queryset.filter(genre=genre)
         
-        # Filter by language
+        # Filter by language (UPPER(language) LIKE ..., served by the
+        # trigram index on UPPER(language))
         language = self.request.query_params.get('language', None)
         if language:
             queryset = queryset.filter(language__icontains=language)
         
-        # Search by title
+        # Ranked full-text search over title, genre, description and language
         search = self.request.query_params.get('search', None)
         if search:
-            queryset = queryset.filter(title__icontains=search)
+            queryset = search_movies(queryset, search)
+        
+        # Detail views read the shows count (and its validators) in the same query
+        if self.action == 'retrieve':
+            queryset = queryset.annotate(
+                active_shows_count=Count('shows', filter=Q(shows__is_active=True)),
+                shows_updated_at=Max('shows__updated_at')
+            )
         
         return queryset
     
+    @catalog_cached('movies')
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+    
+    @catalog_cached('movie:{pk}', 'shows')
+    def retrieve(self, request, *args, **kwargs):
+        movie = self.get_object()
+        validators = Validators(
+            request,
+            [movie.pk, movie.updated_at, movie.active_shows_count, movie.shows_updated_at],
+            last_modified=latest(movie.updated_at, movie.shows_updated_at)
+        )
+        return conditional_get(request, validators, lambda: Response(self.get_serializer(movie).data))
+    
+    @action(detail=False, methods=['get'])
+    def autocomplete(self, request):
+        """
+        Title suggestions for a partially typed search.
+        GET /api/movies/autocomplete/?q=inter
+        """
+        suggestions, _ = get_or_set(
+            entry_key(request, ['movies']),
+            lambda: autocomplete_movies(self.get_queryset(), request.query_params.get('q', ''))
+        )
+        return Response(suggestions)
+    
     @action(detail=True, methods=['get'])
+    @catalog_cached('movie:{pk}', 'shows', 'seat-counts')
     def shows(self, request, pk=None):
         """Get all shows for a specific movie"""
         movie = self.get_object()
-        shows = movie.shows.filter(
+        shows = list(movie.shows.filter(
             is_active=True,
             show_date__gte=timezone.now().date()
-        )
-        serializer = ShowListSerializer(shows, many=True)
-        return Response(serializer.data)
+        ).select_related('movie', 'theater').defer('movie__search_vector'))
+        return show_list_response(request, shows)
 
 
 # ==================== THEATER VIEWS ====================
 
-class TheaterViewSet(viewsets.ModelViewSet):
+class TheaterViewSet(ConditionalListMixin, viewsets.ModelViewSet):
     """
     API endpoint for theaters.
     
@@ -244,6 +333,8 @@ class TheaterViewSet(viewsets.ModelViewSet):
     partial_update: PATCH /api/theaters/{id}/ - Partial update (Admin only)
     destroy: DELETE /api/theaters/{id}/ - Delete theater (Admin only)
     """
+    # Maximum queries per request, enforced by api.tests.QueryBudgetTests
+    query_budgets = {'list': 2, 'retrieve': 2, 'shows': 3}
     queryset = Theater.objects.all()
     
     def get_serializer_class(self):
@@ -264,71 +355,122 @@ class TheaterViewSet(viewsets.ModelViewSet):
         if not self.request.user.is_authenticated or self.request.user.role != 'admin':
             queryset = queryset.filter(is_active=True)
         
+        if self.action == 'list':
+            queryset = queryset.annotate(
+                active_seats_count=Count('seats', filter=Q(seats__is_active=True))
+            ).order_by('name')
+        
         return queryset
     
+    @catalog_cached('theaters')
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+    
+    @catalog_cached('theater:{pk}')
+    def retrieve(self, request, *args, **kwargs):
+        theater = self.get_object()
+        # Seat layout changes stamp updated_at, so it covers the whole body
+        validators = Validators(
+            request, [theater.pk, theater.updated_at, theater.layout_version],
+            last_modified=theater.updated_at, exact_last_modified=True
+        )
+        return conditional_get(request, validators, lambda: Response(self.get_serializer(theater).data))
+    
+    def perform_update(self, serializer):
+        theater = serializer.save()
+        layout_changed(theater)
+    
     @action(detail=True, methods=['post'], permission_classes=[IsAdminUser])
     def generate_seats(self, request, pk=None):
         """
         Generate seats for a theater.
         POST /api/theaters/{id}/generate_seats/
         
-        Body: { "rows": 10, "seats_per_row": 10 }
+        Body: { "rows": 10, "seats_per_row": 10, "aisles": [5], "vip_rows": 2,
+                "premium_rows": 3, "disabled_seats": ["A1"], "mode": "sync" }
+        or:   { "template": 1, "mode": "sync" }
+        
+        mode "sync" (default) diffs against the existing seats and keeps
+        seats referenced by bookings; "replace" recreates every seat.
         """
         theater = self.get_object()
-        rows = request.data.get('rows', 10)
-        seats_per_row = request.data.get('seats_per_row', 10)
-        
-        # Delete existing seats
-        theater.seats.all().delete()
-        
-        # Generate new seats
-        row_labels = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
-        seats_created = []
-        
-        for i in range(min(rows, 26)):
-            row_label = row_labels[i]
-            for j in range(1, seats_per_row + 1):
-                seat_number = f"{row_label}{j}"
-                
-                # Determine seat type based on row
-                if i < 2:
-                    seat_type = 'vip'
-                    price_multiplier = 1.5
-                elif i < 5:
-                    seat_type = 'premium'
-                    price_multiplier = 1.25
-                else:
-                    seat_type = 'regular'
-                    price_multiplier = 1.0
-                
-                seat = Seat.objects.create(
-                    theater=theater,
-                    seat_number=seat_number,
-                    row=row_label,
-                    seat_type=seat_type,
-                    price_multiplier=price_multiplier
-                )
-                seats_created.append(seat)
+        serializer = SeatGenerationSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        
+        if data.get('template'):
+            layout = build_template_layout(data['template'])
+        else:
+            layout = build_layout(
+                rows=data['rows'],
+                seats_per_row=data['seats_per_row'],
+                aisles=data['aisles'],
+                vip_rows=data['vip_rows'],
+                premium_rows=data['premium_rows'],
+                disabled_seats=data['disabled_seats'],
+            )
         
-        # Update total seats count
-        theater.total_seats = len(seats_created)
-        theater.save()
+        try:
+            stats = apply_layout(theater, layout, mode=data['mode'])
+        except LayoutError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
         
         return Response({
-            'message': f'{len(seats_created)} seats generated successfully',
-            'seats': SeatSerializer(seats_created, many=True).data
+            'message': f"{stats['total_seats']} seats generated successfully",
+            **stats
         }, status=status.HTTP_201_CREATED)
     
     @action(detail=True, methods=['get'])
+    @catalog_cached('theater:{pk}', 'shows', 'seat-counts')
     def shows(self, request, pk=None):
         """Get all shows for a specific theater"""
         theater = self.get_object()
-        shows = theater.shows.filter(
+        shows = list(theater.shows.filter(
             is_active=True,
             show_date__gte=timezone.now().date()
-        )
-        serializer = ShowListSerializer(shows, many=True)
-        return Response(serializer.data)
+        ).select_related('movie', 'theater').defer('movie__search_vector'))
+        return show_list_response(request, shows)
+
+
+# ==================== SEAT LAYOUT VIEWS ====================
+
+class SeatLayoutTemplateViewSet(viewsets.ModelViewSet):
+    """
+    API endpoint for reusable seat layout templates (Admin only).
+    
+    list/create: GET/POST /api/seat-layouts/
+    retrieve/update/destroy: /api/seat-layouts/{id}/
+    apply: POST /api/seat-layouts/{id}/apply/ - Apply to several theaters
+    """
+    queryset = SeatLayoutTemplate.objects.all()
+    serializer_class = SeatLayoutTemplateSerializer
+    permission_classes = [IsAdminUser]
+    
+    @action(detail=True, methods=['post'])
+    def apply(self, request, pk=None):
+        """
+        Apply a layout template to several theaters in one transaction.
+        POST /api/seat-layouts/{id}/apply/
+        
+        Body: { "theaters": [1, 2, 3], "mode": "sync" }
+        """
+        template = self.get_object()
+        serializer = SeatLayoutApplySerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        try:
+            results = apply_layout_to_theaters(
+                serializer.validated_data['theaters'],
+                build_template_layout(template),
+                mode=serializer.validated_data['mode']
+            )
+        except LayoutError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response({
+            'message': f"Layout '{template.name}' applied to {len(results)} theaters",
+            'theaters': results
+        }, status=status.HTTP_200_OK)
 
 
 # ==================== SEAT VIEWS ====================
@@ -358,11 +500,27 @@ class SeatViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(theater_id=theater_id)
         
         return queryset
+    
+    def perform_create(self, serializer):
+        seat = serializer.save()
+        seats_changed(seat.theater)
+    
+    def perform_update(self, serializer):
+        old_theater = serializer.instance.theater
+        seat = serializer.save()
+        seats_changed(seat.theater)
+        if old_theater != seat.theater:
+            seats_changed(old_theater)
+    
+    def perform_destroy(self, instance):
+        theater = instance.theater
+        instance.delete()
+        seats_changed(theater)
 
 
 # ==================== SHOW VIEWS ====================
 
-class ShowViewSet(viewsets.ModelViewSet):
+class ShowViewSet(ConditionalListMixin, viewsets.ModelViewSet):
     """
     API endpoint for shows (movie showtimes).
     
@@ -372,7 +530,14 @@ class ShowViewSet(viewsets.ModelViewSet):
     update: PUT /api/shows/{id}/ - Update show (Admin only)
     partial_update: PATCH /api/shows/{id}/ - Partial update (Admin only)
     destroy: DELETE /api/shows/{id}/ - Delete show (Admin only)
+    schedule: POST /api/shows/schedule/ - Create recurring shows (Admin only)
     """
+    # Maximum queries per request, enforced by api.tests.QueryBudgetTests
+    query_budgets = {'list': 3, 'retrieve': 4, 'seats': 3, 'schedule': 8}
+    # Keyset pages with ?pagination=cursor (api.pagination)
+    cursor_ordering = ('show_date', 'show_time', 'id')
+    # Rendered with each show in lists (ConditionalListMixin)
+    conditional_related = ('movie', 'theater')
     queryset = Show.objects.all()
     
     def get_serializer_class(self):
@@ -388,7 +553,7 @@ class ShowViewSet(viewsets.ModelViewSet):
         return [permissions.AllowAny()]
     
     def get_queryset(self):
-        queryset = Show.objects.select_related('movie', 'theater')
+        queryset = Show.objects.select_related('movie', 'theater').defer('movie__search_vector')
         
         # Filter only active and future shows for non-admin users
         if not self.request.user.is_authenticated or self.request.user.role != 'admin':
@@ -414,13 +579,74 @@ class ShowViewSet(viewsets.ModelViewSet):
         
         return queryset
     
+    # Show details and seat maps change with every booking and are not cached
+    @catalog_cached('shows', 'seat-counts')
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+    
+    def list_state(self, rows):
+        return show_list_state(rows)
+    
+    def retrieve(self, request, *args, **kwargs):
+        show = self.get_object()
+        availability = SeatAvailability.for_show(show)
+        validators = self.seat_map_validators(request, show, availability)
+        context = {**self.get_serializer_context(), 'availability': availability}
+        return conditional_get(
+            request, validators, lambda: Response(ShowDetailSerializer(show, context=context).data)
+        )
+    
     @action(detail=True, methods=['get'])
     def seats(self, request, pk=None):
         """Get seat availability for a show"""
         show = self.get_object()
-        seats = show.theater.seats.filter(is_active=True)
-        serializer = SeatAvailabilitySerializer(seats, many=True, context={'show': show})
-        return Response(serializer.data)
+        availability = SeatAvailability.for_show(show)
+        validators = self.seat_map_validators(request, show, availability)
+        return conditional_get(request, validators, lambda: Response(render_seat_map(show, availability)))
+    
+    @action(detail=False, methods=['post'], permission_classes=[IsAdminUser])
+    def schedule(self, request):
+        """
+        Create shows from a recurrence rule; taken slots are reported in
+        ``conflicts`` instead of failing the request.
+        POST /api/shows/schedule/
+        
+        Body: { "movie": 1, "theaters": [1, 2], "date_from": "2025-01-06",
+                "date_to": "2025-01-12", "times": ["14:00", "18:00"],
+                "weekdays": [0, 1, 2, 3, 4, 5, 6], "base_price": "15000.00",
+                "weekend_multiplier": "1.2", "dry_run": false }
+        """
+        serializer = ShowScheduleSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        
+        planned = plan_shows(
+            data['movie'], data['theaters'], data['date_from'], data['date_to'], data['times'],
+            data['base_price'], data['weekend_multiplier'], data.get('weekdays'),
+        )
+        schedule = create_schedule(planned, dry_run=data['dry_run'])
+        
+        verb = 'can be created' if data['dry_run'] else 'created'
+        return Response({
+            'message': f"{len(schedule.shows)} shows {verb}, {len(schedule.conflicts)} slots already taken",
+            'dry_run': data['dry_run'],
+            'shows': [
+                {
+                    'id': show.pk, 'theater': show.theater_id, 'show_date': show.show_date,
+                    'show_time': show.show_time, 'base_price': show.base_price,
+                }
+                for show in schedule.shows
+            ],
+            'conflicts': schedule.conflicts,
+        }, status=status.HTTP_200_OK if data['dry_run'] else status.HTTP_201_CREATED)
+    
+    def seat_map_validators(self, request, show, availability):
+        """Show, movie and theater stamps plus the booked state of the show"""
+        return Validators(
+            request,
+            [show.pk, show.updated_at, show.movie.updated_at, show.theater.updated_at, availability.version],
+            last_modified=latest(show.updated_at, show.movie.updated_at, show.theater.updated_at)
+        )
 
 
 # ==================== BOOKING VIEWS ====================
@@ -432,15 +658,27 @@ class BookingViewSet(viewsets.ModelViewSet):
     list: GET /api/bookings/ - List user's bookings (or all for admin)
     retrieve: GET /api/bookings/{id}/ - Get booking details
     create: POST /api/bookings/ - Create a new booking
+    group: POST /api/bookings/group/ - Book seats across several shows at once
+    destroy: DELETE /api/bookings/{id}/ - Cancel a booking for good (admin)
+    
+    create and group accept an Idempotency-Key header (api.idempotency).
     """
+    # Maximum queries per request, enforced by api.tests.QueryBudgetTests
+    query_budgets = {'list': 3, 'retrieve': 3, 'create': 12, 'group': 14, 'cancel': 14}
+    # Keyset pages with ?pagination=cursor (api.pagination)
+    cursor_ordering = ('-booking_date', '-id')
     
     def get_serializer_class(self):
         if self.action == 'list':
+            if self.request.user.role != 'admin':
+                return BookingListRowSerializer
             return BookingListSerializer
         elif self.action == 'retrieve':
             return BookingDetailSerializer
         elif self.action == 'create':
             return BookingCreateSerializer
+        elif self.action == 'group':
+            return GroupBookingCreateSerializer
         return BookingListSerializer
     
     def get_permissions(self):
@@ -462,18 +700,64 @@ class BookingViewSet(viewsets.ModelViewSet):
         if status_filter:
             queryset = queryset.filter(status=status_filter)
         
-        return queryset.select_related('user', 'show', 'show__movie', 'show__theater')
+        if self.action == 'list':
+            queryset = with_seats_count(queryset).order_by('-booking_date')
+            if user.role != 'admin':
+                # "My bookings": plain rows for BookingListRowSerializer,
+                # no model instances
+                return queryset.values(
+                    'id', 'booking_reference', 'total_amount', 'status', 'booking_date',
+                    'booking_seats_count',
+                    movie_title=F('show__movie__title'),
+                    theater_name=F('show__theater__name'),
+                    show_date=F('show__show_date'),
+                    show_time=F('show__show_time'),
+                )
+            return queryset.select_related('user', 'show__movie', 'show__theater').defer(
+                'show__movie__search_vector'
+            )
+        
+        if self.action == 'cancel':
+            # Checked and cancelled first; the details are loaded afterwards
+            return queryset
+        
+        return with_booking_details(queryset)
     
+    @idempotent('bookings.create')
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data, context={'request': request})
         serializer.is_valid(raise_exception=True)
-        booking = serializer.save()
+        booking = with_booking_details(Booking.objects).get(pk=serializer.save().pk)
         
         return Response({
             'message': 'Booking created successfully',
             'booking': BookingDetailSerializer(booking).data
         }, status=status.HTTP_201_CREATED)
     
+    @action(detail=False, methods=['post'])
+    @idempotent('bookings.group')
+    def group(self, request):
+        """
+        Book seats in several shows in one all-or-nothing request.
+        POST /api/bookings/group/
+        
+        Body: { "groups": [{"show_id": 1, "seat_ids": [10, 11]},
+                           {"show_id": 2, "seat_ids": [40, 41]}],
+                "notes": "School trip" }
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        created = serializer.save()
+        bookings = list(
+            with_booking_details(Booking.objects).filter(pk__in=[booking.pk for booking in created]).order_by('pk')
+        )
+        
+        return Response({
+            'message': f'{len(bookings)} bookings created successfully',
+            'total_amount': str(sum(booking.total_amount for booking in bookings)),
+            'bookings': BookingDetailSerializer(bookings, many=True).data
+        }, status=status.HTTP_201_CREATED)
+    
     @action(detail=True, methods=['post'])
     def cancel(self, request, pk=None):
         """
@@ -499,23 +783,41 @@ class BookingViewSet(viewsets.ModelViewSet):
                 'error': 'Cannot cancel a completed booking.'
             }, status=status.HTTP_400_BAD_REQUEST)
         
+        if booking.status == 'expired':
+            return Response({
+                'error': 'Booking has already expired.'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
         serializer = BookingCancelSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         
-        # Cancel the booking
-        booking.status = 'cancelled'
-        booking.notes = f"Cancelled: {serializer.validated_data.get('reason', 'No reason provided')}"
-        booking.save()
-        
-        # If payment exists, mark as refunded
-        if hasattr(booking, 'payment'):
-            booking.payment.payment_status = 'refunded'
-            booking.payment.save()
+        cancelled = cancel_bookings(Booking.objects.filter(pk=booking.pk), serializer.validated_data.get('reason'))
+        if not cancelled:
+            # Paid, expired or cancelled by another request meanwhile
+            return Response({
+                'error': 'Booking can no longer be cancelled.'
+            }, status=status.HTTP_409_CONFLICT)
+        booking = with_booking_details(Booking.objects).get(pk=booking.pk)
         
         return Response({
             'message': 'Booking cancelled successfully',
             'booking': BookingDetailSerializer(booking).data
         }, status=status.HTTP_200_OK)
+    
+    def destroy(self, request, *args, **kwargs):
+        """
+        Remove a booking (admin). The row is kept for the sales rollups and
+        an active booking is cancelled through api.transitions, so its
+        seats go back to the show counters and its payment is refunded.
+        """
+        booking = self.get_object()
+        if booking.status == 'completed':
+            return Response({
+                'error': 'Cannot delete a completed booking.'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        cancel_bookings(Booking.objects.filter(pk=booking.pk), 'Deleted by an administrator')
+        return Response(status=status.HTTP_204_NO_CONTENT)
 
 
 # ==================== PAYMENT VIEWS ====================
@@ -523,7 +825,13 @@ class BookingViewSet(viewsets.ModelViewSet):
 class PaymentViewSet(viewsets.ModelViewSet):
     """
     API endpoint for payments.
+    
+    status: GET /api/payments/{id}/status/ - Processing status, for polling
     """
+    # Maximum queries per request, enforced by api.tests.QueryBudgetTests
+    query_budgets = {'list': 3, 'processing_status': 2}
+    # Keyset pages with ?pagination=cursor (api.pagination)
+    cursor_ordering = ('-created_at', '-id')
     serializer_class = PaymentSerializer
     
     def get_permissions(self):
@@ -532,29 +840,52 @@ class PaymentViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         user = self.request.user
         
+        queryset = Payment.objects.select_related('booking')
         if user.role == 'admin':
-            return Payment.objects.all()
+            return queryset
         
-        return Payment.objects.filter(booking__user=user)
+        return queryset.filter(booking__user=user)
+    
+    @action(detail=True, methods=['get'], url_path='status')
+    def processing_status(self, request, pk=None):
+        """
+        Get the processing status of a payment.
+        GET /api/payments/{id}/status/
+        
+        Poll until ``final`` is true, or follow
+        GET /api/payments/{id}/status/stream/ instead.
+        """
+        payment = self.get_object()
+        validators = Validators(request, [(payment.pk, payment.updated_at)], last_modified=payment.updated_at)
+        return conditional_get(request, validators, lambda: Response(payment_state(payment)))
 
 
 class ProcessPaymentView(APIView):
     """
     API endpoint for processing payments.
     POST /api/payments/process/
+    
+    The payment is accepted and charged in the background (api.payments);
+    the response links to its status. Accepts an Idempotency-Key header
+    (api.idempotency).
     """
+    # Maximum queries per request, enforced by api.tests.QueryBudgetTests
+    query_budgets = {'post': 12}
     permission_classes = [permissions.IsAuthenticated]
     
+    @idempotent('payments.process')
     def post(self, request):
         serializer = PaymentCreateSerializer(data=request.data, context={'request': request})
         serializer.is_valid(raise_exception=True)
         payment = serializer.save()
+        status_url = reverse('payment-processing-status', args=[payment.pk], request=request)
         
         return Response({
-            'message': 'Payment processed successfully',
+            'message': 'Payment accepted for processing',
             'payment': PaymentSerializer(payment).data,
-            'booking': BookingDetailSerializer(payment.booking).data
-        }, status=status.HTTP_200_OK)
+            'status_url': status_url,
+            'stream_url': f'{status_url}stream/',
+        }, status=status.HTTP_202_ACCEPTED, headers={'Location': status_url})
 
 
 # ==================== ADMIN DASHBOARD VIEWS ====================
@@ -563,50 +894,87 @@ class AdminDashboardView(APIView):
     """
     API endpoint for admin dashboard statistics.
     GET /api/admin/dashboard/
+    
+    Served from a cached snapshot; ``generated_at`` tells how old it is.
     """
+    # Maximum queries per request, enforced by api.tests.QueryBudgetTests
+    query_budgets = {'get': 8}
     permission_classes = [IsAdminUser]
     
     def get(self, request):
-        today = timezone.now().date()
-        
-        # Basic statistics
-        total_users = User.objects.filter(role='customer').count()
-        total_movies = Movie.objects.filter(is_active=True).count()
-        total_theaters = Theater.objects.filter(is_active=True).count()
-        total_bookings = Booking.objects.count()
-        
-        # Today's statistics
-        today_bookings = Booking.objects.filter(booking_date__date=today).count()
-        today_revenue = Payment.objects.filter(
-            payment_status='completed',
-            payment_date__date=today
-        ).aggregate(total=models.Sum('amount'))['total'] or 0
-        
-        # Recent bookings
-        recent_bookings = Booking.objects.select_related(
-            'user', 'show__movie'
-        ).order_by('-booking_date')[:10]
-        
-        # Upcoming shows
-        upcoming_shows = Show.objects.filter(
-            is_active=True,
-            show_date__gte=today
-        ).select_related('movie', 'theater').order_by('show_date', 'show_time')[:10]
+        # Shared snapshot, rebuilt by one request at a time (see api.dashboard)
+        return Response(get_dashboard_snapshot())
+
+
+class SeatHoldMetricsView(APIView):
+    """
+    API endpoint for seat hold statistics.
+    GET /api/admin/holds/metrics/?hours=24
+    """
+    permission_classes = [IsAdminUser]
+    
+    def get(self, request):
+        try:
+            hours = int(request.query_params.get('hours', 24))
+        except ValueError:
+            return Response({
+                'error': 'hours must be an integer'
+            }, status=status.HTTP_400_BAD_REQUEST)
         
+        since = timezone.now() - timedelta(hours=hours)
         return Response({
-            'statistics': {
-                'total_users': total_users,
-                'total_movies': total_movies,
-                'total_theaters': total_theaters,
-                'total_bookings': total_bookings,
-                'today_bookings': today_bookings,
-                'today_revenue': float(today_revenue),
-            },
-            'recent_bookings': BookingListSerializer(recent_bookings, many=True).data,
-            'upcoming_shows': ShowListSerializer(upcoming_shows, many=True).data,
+            'window_hours': hours,
+            'hold_ttl_seconds': int(settings.SEAT_HOLD_TTL.total_seconds()),
+            'holds': hold_metrics(since=since),
         })
 
 
+class CatalogCacheMetricsView(APIView):
+    """
+    API endpoint for catalog response cache statistics of the worker
+    process that serves the request.
+    GET /api/admin/cache/metrics/
+    """
+    permission_classes = [IsAdminUser]
+    
+    def get(self, request):
+        return Response(cache_stats())
+
+
+class ShowCancellationView(APIView):
+    """
+    API endpoint for cancelling whole shows (Admin only).
+    POST /api/admin/shows/cancel/
+    
+    Body: { "shows": [1, 2], "reason": "Projector failure" }
+    or:   { "theater": 1, "date_from": "2025-01-10", "date_to": "2025-01-12" }
+    
+    Cancels every booking of the shows, refunds completed payments and
+    deactivates the shows in one transaction (api.cancellations). The
+    response streams newline-delimited JSON: a summary line, then one line
+    per cancelled booking with the customer's contact details.
+    """
+    permission_classes = [IsAdminUser]
+    
+    def post(self, request):
+        serializer = ShowCancellationSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        
+        if data.get('shows'):
+            shows = select_shows(show_ids=[show.pk for show in data['shows']])
+        else:
+            shows = select_shows(theater_id=data['theater'].pk, date_from=data['date_from'], date_to=data['date_to'])
+        cancellation = cancel_shows(shows, data.get('reason', ''))
+        
+        def lines():
+            yield json.dumps({'summary': cancellation.summary()}) + '\n'
+            for row in notification_rows(cancellation):
+                yield json.dumps(row, cls=DjangoJSONEncoder) + '\n'
+        
+        return StreamingHttpResponse(lines(), content_type='application/x-ndjson')
+
+
 class AdminUserManagementViewSet(viewsets.ModelViewSet):
     """
     API endpoint for admin to manage users.
@@ -663,9 +1031,13 @@ def api_root(request):
             },
             'movies': '/api/movies/',
             'theaters': '/api/theaters/',
+            'seat_layouts': '/api/seat-layouts/',
             'shows': '/api/shows/',
+            'show_seat_stream': '/api/shows/{id}/seats/stream/',
             'bookings': '/api/bookings/',
             'payments': '/api/payments/',
             'admin_dashboard': '/api/admin/dashboard/',
+            'admin_hold_metrics': '/api/admin/holds/metrics/',
+            'admin_show_cancel': '/api/admin/shows/cancel/',
         }
     })
@@ -64,6 +64,11 @@ export const movieService = {
     const response = await api.get('/movies/', { params: { search: query } });
     return response.data;
   },
+  
+  autocomplete: async (query) => {
+    const response = await api.get('/movies/autocomplete/', { params: { q: query } });
+    return response.data;
+  },
 };
 
 // Theater Services
@@ -117,9 +122,20 @@ export const seatService = {
 };
 
 // Booking Services
+// Reuse the same key when retrying a booking or payment, so the server
+// replays the first result instead of running it twice
+const idempotent = (idempotencyKey) =>
+  idempotencyKey ? { headers: { 'Idempotency-Key': idempotencyKey } } : undefined;
+
 export const bookingService = {
-  create: async (bookingData) => {
-    const response = await api.post('/bookings/', bookingData);
+  create: async (bookingData, idempotencyKey) => {
+    const response = await api.post('/bookings/', bookingData, idempotent(idempotencyKey));
+    return response.data;
+  },
+
+  // groups: [{ show_id, seat_ids }]; every show is booked or none is
+  createGroup: async (groups, notes = '', idempotencyKey) => {
+    const response = await api.post('/bookings/group/', { groups, notes }, idempotent(idempotencyKey));
     return response.data;
   },
   
@@ -142,10 +158,28 @@ export const bookingService = {
 
 // Payment Services
 export const paymentService = {
-  process: async (paymentData) => {
-    const response = await api.post('/payments/process/', paymentData);
+  // Accepts the payment; it is charged in the background (see waitForResult)
+  process: async (paymentData, idempotencyKey) => {
+    const response = await api.post('/payments/process/', paymentData, idempotent(idempotencyKey));
+    return response.data;
+  },
+
+  getStatus: async (id) => {
+    const response = await api.get(`/payments/${id}/status/`);
     return response.data;
   },
+
+  // Polls the payment's status until it is completed, failed or refunded
+  waitForResult: async (id, { interval = 1000, timeout = 120000 } = {}) => {
+    const deadline = Date.now() + timeout;
+    for (;;) {
+      const state = await paymentService.getStatus(id);
+      if (state.final || Date.now() >= deadline) {
+        return state;
+      }
+      await new Promise((resolve) => setTimeout(resolve, interval));
+    }
+  },
   
   getByBooking: async (bookingId) => {
     const response = await api.get('/payments/', { params: { booking: bookingId } });
@@ -195,6 +229,21 @@ export const adminService = {
     return response.data;
   },
   
+  // { movie, theaters, date_from, date_to, times, base_price, weekend_multiplier, weekdays, dry_run }.
+  // Resolves to { shows, conflicts }: the created shows and the slots already taken.
+  scheduleShows: async (rule) => {
+    const response = await api.post('/shows/schedule/', rule);
+    return response.data;
+  },
+  
+  // { shows: [ids] } or { theater, date_from, date_to }, plus an optional reason.
+  // Resolves to { summary, bookings } from the JSON lines response.
+  cancelShows: async (data) => {
+    const response = await api.post('/admin/shows/cancel/', data, { responseType: 'text' });
+    const [first, ...rows] = response.data.split('\n').filter(Boolean).map((line) => JSON.parse(line));
+    return { summary: first.summary, bookings: rows };
+  },
+  
   updateShow: async (id, showData) => {
     const response = await api.put(`/shows/${id}/`, showData);
     return response.data;
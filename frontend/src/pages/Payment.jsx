@@ -87,7 +87,12 @@ const Payment = () => {
         phone_number: paymentMethod !== 'CARD' ? phoneNumber : undefined,
       };
 
-      await paymentService.process(paymentData);
+      const accepted = await paymentService.process(paymentData);
+      const result = await paymentService.waitForResult(accepted.payment.id);
+      if (result.payment_status !== 'completed') {
+        toast.error(result.failure_reason || 'Payment is still processing. Please check your bookings shortly.');
+        return;
+      }
       toast.success('Payment successful! Your tickets are confirmed.');
       resetBooking();
       navigate(`/booking-confirmation/${bookingId}`);
@@ -3,6 +3,9 @@ ASGI config for movie_ticket_system project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serve it with an ASGI server (e.g. ``uvicorn movie_ticket_system.asgi:application``)
+to enable the live seat map stream at /api/shows/{id}/seats/stream/.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/6.0/howto/deployment/asgi/
 """
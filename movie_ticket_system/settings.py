@@ -44,6 +44,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     
     # Third-party apps
     'rest_framework',
@@ -54,6 +55,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.QueryCountMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -80,11 +82,17 @@ CORS_ALLOW_HEADERS = [
     'authorization',
     'content-type',
     'dnt',
+    'idempotency-key',
+    'if-modified-since',
+    'if-none-match',
     'origin',
     'user-agent',
     'x-csrftoken',
     'x-requested-with',
 ]
+# Conditional GET validators (api.conditional) and idempotent replays
+# (api.idempotency), readable by browser clients
+CORS_EXPOSE_HEADERS = ['etag', 'last-modified', 'idempotent-replayed']
 
 ROOT_URLCONF = 'movie_ticket_system.urls'
 
@@ -180,7 +188,8 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ],
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    # Page numbers, plus keyset pages on views with cursor_ordering (api.pagination)
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.DefaultPagination',
     'PAGE_SIZE': 10,
 }
 
@@ -196,3 +205,99 @@ SIMPLE_JWT = {
     'USER_ID_FIELD': 'id',
     'USER_ID_CLAIM': 'user_id',
 }
+
+# Seat Hold Configuration
+# Pending bookings hold their seats for this long before the
+# release_expired_holds sweeper returns them to sale.
+SEAT_HOLD_TTL = timedelta(minutes=int(os.environ.get('SEAT_HOLD_TTL_MINUTES', '15')))
+
+# Idempotency Keys (api.idempotency)
+# Results of booking and payment requests sent with an Idempotency-Key
+# header are replayed to retries for this long.
+IDEMPOTENCY_KEY_TTL = timedelta(hours=int(os.environ.get('IDEMPOTENCY_KEY_TTL_HOURS', '24')))
+# A key claimed by a request that never stored its result (the process
+# died) can be claimed again after this long.
+IDEMPOTENCY_CLAIM_TIMEOUT = timedelta(minutes=1)
+
+# Payment Pipeline (api.payments)
+# Payments are accepted by the API and charged in the background.
+# PAYMENT_QUEUE: 'local' processes them in a thread of the accepting
+# process; 'database' leaves them to `manage.py process_payments --loop`.
+# A payment in flight keeps its booking's seats held, and one stuck in
+# processing for PAYMENT_PROCESSING_TIMEOUT is retried.
+PAYMENT_QUEUE = os.environ.get('PAYMENT_QUEUE', 'local')
+PAYMENT_GATEWAY = os.environ.get('PAYMENT_GATEWAY', 'api.payments.DemoGateway')
+PAYMENT_DEMO_GATEWAY_DELAY = float(os.environ.get('PAYMENT_DEMO_GATEWAY_DELAY', '0'))
+PAYMENT_PROCESSING_TIMEOUT = timedelta(minutes=5)
+PAYMENT_STREAM_POLL_INTERVAL = 1.0  # seconds between status polls per stream
+
+# Caches
+# "catalog" holds the shared tier of the catalog response cache
+# (api.catalog_cache) and "dashboard" the admin dashboard snapshot and its
+# rebuild lock (api.dashboard). Both must be shared by all worker
+# processes: file caches by default, or e.g. CATALOG_CACHE_BACKEND=
+# django.core.cache.backends.redis.RedisCache with
+# CATALOG_CACHE_LOCATION=redis://127.0.0.1:6379/1 and
+# DASHBOARD_CACHE_LOCATION=redis://127.0.0.1:6379/2
+CATALOG_CACHE_BACKEND = os.environ.get(
+    'CATALOG_CACHE_BACKEND', 'django.core.cache.backends.filebased.FileBasedCache'
+)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'catalog': {
+        'BACKEND': CATALOG_CACHE_BACKEND,
+        'LOCATION': os.environ.get('CATALOG_CACHE_LOCATION', str(BASE_DIR / 'cache' / 'catalog')),
+    },
+    'dashboard': {
+        'BACKEND': CATALOG_CACHE_BACKEND,
+        'LOCATION': os.environ.get('DASHBOARD_CACHE_LOCATION', str(BASE_DIR / 'cache' / 'dashboard')),
+    },
+}
+if CATALOG_CACHE_BACKEND.endswith('FileBasedCache'):
+    CACHES['catalog']['OPTIONS'] = {'MAX_ENTRIES': 10000}
+
+# Catalog Response Cache (api.catalog_cache)
+# Seconds an entry is kept (0 turns the cache off) and in-process LRU size.
+CATALOG_CACHE_ALIAS = 'catalog'
+CATALOG_CACHE_TIMEOUT = int(os.environ.get('CATALOG_CACHE_TIMEOUT', '300'))
+CATALOG_CACHE_LOCAL_SIZE = 512
+
+# Seat Layout Cache
+# Serialized theater seat layouts are cached per layout version.
+SEAT_LAYOUT_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Admin Dashboard Snapshot (api.dashboard)
+# The dashboard payload is shared by all admins. It is served as is for
+# DASHBOARD_SNAPSHOT_TTL seconds, then served stale while one request
+# rebuilds it; it is dropped after DASHBOARD_SNAPSHOT_MAX_AGE seconds.
+DASHBOARD_CACHE_ALIAS = 'dashboard'
+DASHBOARD_SNAPSHOT_TTL = int(os.environ.get('DASHBOARD_SNAPSHOT_TTL', '15'))
+DASHBOARD_SNAPSHOT_MAX_AGE = 60 * 5
+DASHBOARD_REBUILD_LOCK_TIMEOUT = 30  # seconds before a crashed rebuild's lock lapses
+
+# Live Seat Map Stream (Server-Sent Events, served through ASGI)
+SEAT_STREAM_POLL_INTERVAL = 1.0  # seconds between taken-seat polls per show
+SEAT_STREAM_HEARTBEAT = 15  # seconds between keep-alive comments
+SEAT_STREAM_QUEUE_SIZE = 100  # pending events before a slow viewer is dropped
+
+# Request Instrumentation (api.middleware.QueryCountMiddleware)
+# QUERY_COUNT_HEADERS adds X-Query-Count / X-DB-Time-Ms / X-DB-Slowest
+# headers to every response. QUERY_STATS_LOG_INTERVAL > 0 logs per-endpoint
+# query totals (and query budget overruns) every that many seconds.
+QUERY_COUNT_HEADERS = os.environ.get('QUERY_COUNT_HEADERS', '') == '1'
+QUERY_STATS_LOG_INTERVAL = int(os.environ.get('QUERY_STATS_LOG_INTERVAL', '0'))
+QUERY_STATS_SLOWEST = 3  # statements reported per request
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'api.queries': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+        'api.payments': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
+}